@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+from datetime import timedelta
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -70,13 +72,17 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Sent by clients that retry bookings, cancellations and signups (see doctorAppointment/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson-backed JSONRenderer; `manage.py bench_renderers` compares the two
+        'doctorAppointment.renderers.ORJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
@@ -95,11 +101,14 @@ REST_FRAMEWORK = {
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'doctorAppointment.staticfiles.FrontendWhiteNoiseMiddleware',
+    # After WhiteNoise, which answers static file requests (with its precompressed copies) itself
+    'doctorAppointment.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'doctorAppointment.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,6 +145,15 @@ DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_HOST = os.getenv('DB_HOST')
 DB_PORT = os.getenv('DB_PORT')
 
+# Connection pooling (Postgres, psycopg 3): set DB_POOL_MAX_SIZE to give every
+# web/Celery process a pool of at most that many connections per database.
+# Size it so processes x DB_POOL_MAX_SIZE stays below the server's
+# max_connections. Pooled connections replace CONN_MAX_AGE persistence.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+
+# Read replicas: comma-separated host[:port] list, same name/credentials as the primary
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+
 if DB_NAME:
     DATABASES = {
         'default': {
@@ -146,14 +164,65 @@ if DB_NAME:
             'HOST': DB_HOST,
             'PORT': DB_PORT or '5432',
             # optionally tune connection persistence
-            'CONN_MAX_AGE': 60,
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else 60,
         }
     }
+    if DB_POOL_MAX_SIZE:
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                'max_size': DB_POOL_MAX_SIZE,
+                # Seconds a request waits for a free connection before failing
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            },
+        }
+    for index, replica in enumerate(DB_REPLICA_HOSTS):
+        host, _, port = replica.partition(':')
+        DATABASES[f'replica_{index}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
 else:
+    # Hardened SQLite for single-server clinics: WAL lets readers run while a
+    # write commits, NORMAL sync is durable across app crashes in WAL mode,
+    # and write transactions take the write lock up front (BEGIN IMMEDIATE)
+    # so they wait out busy_timeout instead of failing on lock upgrade.
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    f"PRAGMA synchronous={os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')};"
+                    f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};"
+                    'PRAGMA journal_size_limit=67108864;'
+                ),
+            },
+        }
+    }
+
+# Login audit rows go through one background writer per process (batched
+# transactions) instead of the request; on by default for SQLite. The test
+# settings (backend.test_settings) turn it off.
+AUDIT_LOG_QUEUE = os.getenv('AUDIT_LOG_QUEUE', '0' if DB_NAME else '1') == '1'
+
+# Views decorated with doctorAppointment.replicas.use_replica read from these;
+# users who just wrote stay on the primary for DB_REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['doctorAppointment.replicas.ReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '15'))
+
+# Shared cache (replica pins, cached endpoints); per-process memory cache if unset
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
         }
     }
 
@@ -176,6 +245,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Bulk-imported accounts use a cheap hash that is upgraded to the first entry on login
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'doctorAppointment.hashers.ImportedPBKDF2PasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -196,6 +275,24 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# The built React app (build.sh), served from / with precompressed .br/.gz
+# files; hashed /assets/ files are cached as immutable
+FRONTEND_DIST = Path(os.getenv('FRONTEND_DIST', BASE_DIR.parent / 'frontend' / 'dist'))
+if FRONTEND_DIST.is_dir():
+    WHITENOISE_ROOT = FRONTEND_DIST
+    WHITENOISE_INDEX_FILE = True
+
+# Dynamic responses: smallest body worth compressing, and compressor effort
+# (levels above these cost CPU per request for a few percent smaller JSON)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+# BREACH mitigation, as in GZipMiddleware: up to this many random bytes in
+# each gzip header. Brotli cannot carry the padding, so it is opt-in for
+# deployments whose compressed responses never mix secrets with user input.
+COMPRESSION_MAX_RANDOM_BYTES = int(os.getenv('COMPRESSION_MAX_RANDOM_BYTES', '100'))
+COMPRESSION_BROTLI = os.getenv('COMPRESSION_BROTLI', '0') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -213,6 +310,13 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = 30
+
+# Email outbox: messages per SMTP connection, and retry policy for failures
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '100'))
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_BASE_SECONDS = 60
+EMAIL_CLAIM_LEASE_SECONDS = 600
 
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
@@ -222,3 +326,108 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Kolkata'
 CELERY_ENABLE_UTC = False
+
+# Results: only tasks that don't set ignore_result=True (the periodic rollup)
+# write a TaskResult row, and purge_task_results drops rows past this age.
+CELERY_RESULT_EXPIRES = timedelta(hours=int(os.getenv('CELERY_RESULT_EXPIRES_HOURS', '24')))
+
+# Routing: email delivery and audit logging get their own queues so a slow
+# SMTP provider never delays login/registration logging. Run one worker per
+# queue, e.g. `celery -A backend worker -Q email` and `-Q logging,default`.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'doctorAppointment.tasks.send_welcome_email_and_log_registration': {'queue': 'email'},
+    'doctorAppointment.tasks.send_queued_emails': {'queue': 'email'},
+    'doctorAppointment.tasks.sweep_appointment_reminders': {'queue': 'email'},
+    'doctorAppointment.tasks.send_appointment_reminders': {'queue': 'email'},
+    'doctorAppointment.tasks.log_login_info': {'queue': 'logging'},
+}
+
+# Prefetch and acks: email tasks hold an SMTP connection for a whole batch,
+# so each worker process reserves one message at a time instead of hoarding
+# a queue behind a slow batch. The outbox and reminder tasks are idempotent
+# and set acks_late, so a worker that dies mid-batch has its message
+# redelivered; the Redis visibility timeout must outlast the longest of them.
+# The logging tasks are short and ack on receipt; give their worker a larger
+# prefetch on the command line (--prefetch-multiplier 8).
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}
+
+CELERY_BEAT_SCHEDULE = {
+    'rollup-stats': {
+        'task': 'doctorAppointment.tasks.rollup_stats',
+        'schedule': timedelta(minutes=5),
+    },
+    'send-queued-emails': {
+        'task': 'doctorAppointment.tasks.send_queued_emails',
+        'schedule': timedelta(minutes=1),
+    },
+    'expire-waitlist-offers': {
+        'task': 'doctorAppointment.tasks.expire_waitlist_offers',
+        'schedule': timedelta(minutes=1),
+    },
+    'sweep-appointment-reminders': {
+        'task': 'doctorAppointment.tasks.sweep_appointment_reminders',
+        'schedule': timedelta(minutes=5),
+    },
+    'purge-task-results': {
+        'task': 'doctorAppointment.tasks.purge_task_results',
+        'schedule': timedelta(hours=1),
+    },
+    'ensure-login-partitions': {
+        'task': 'doctorAppointment.tasks.ensure_login_partitions',
+        'schedule': timedelta(days=1),
+    },
+    'purge-idempotency-keys': {
+        'task': 'doctorAppointment.tasks.purge_idempotency_keys',
+        'schedule': timedelta(hours=1),
+    },
+}
+
+# Statistics rollups: how far back each periodic run recomputes buckets
+STATS_ROLLUP_LOOKBACK_HOURS = int(os.getenv('STATS_ROLLUP_LOOKBACK_HOURS', '2'))
+
+# Slot dates and times are wall-clock times in the clinic's time zone
+APPOINTMENT_TIME_ZONE = os.getenv('APPOINTMENT_TIME_ZONE', CELERY_TIMEZONE)
+
+# Reminders: appointments handled per sweeper page (and per notification task)
+REMINDER_PAGE_SIZE = int(os.getenv('REMINDER_PAGE_SIZE', '500'))
+
+# Most slots one POST /api/appointments/book/batch/ may book at once
+BOOKING_BATCH_MAX_SLOTS = int(os.getenv('BOOKING_BATCH_MAX_SLOTS', '12'))
+
+# How long GET /api/specializations/ may serve cached doctor and free-slot counts
+SPECIALIZATION_FACETS_TTL = int(os.getenv('SPECIALIZATION_FACETS_TTL', '60'))
+
+# How long a stored Idempotency-Key response is replayed to retries of the same request
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24')))
+
+# Chatbot prompts: hard input-token budget per LLM call, history messages sent
+# verbatim (older ones are kept as a rolling summary of at most
+# CHATBOT_SUMMARY_TOKENS), and least retrieval score for a chunk to be used
+CHATBOT_PROMPT_TOKEN_BUDGET = int(os.getenv('CHATBOT_PROMPT_TOKEN_BUDGET', '800'))
+CHATBOT_HISTORY_MESSAGES = int(os.getenv('CHATBOT_HISTORY_MESSAGES', '4'))
+CHATBOT_SUMMARY_TOKENS = int(os.getenv('CHATBOT_SUMMARY_TOKENS', '200'))
+CHATBOT_MIN_CHUNK_SCORE = float(os.getenv('CHATBOT_MIN_CHUNK_SCORE', '0.2'))
+
+# Retention: Log/LoginInfo rows older than this are moved to gzipped NDJSON
+# files in RETENTION_ARCHIVE_DIR by `manage.py archive_logs`
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '90'))
+LOGIN_INFO_RETENTION_DAYS = int(os.getenv('LOGIN_INFO_RETENTION_DAYS', '365'))
+RETENTION_ARCHIVE_DIR = os.getenv('RETENTION_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Waitlist: how long a freed slot is held for the patient it is offered to
+WAITLIST_OFFER_MINUTES = int(os.getenv('WAITLIST_OFFER_MINUTES', '15'))
+
+# Live updates: 'memory' fans out within one process, 'redis' across nodes
+EVENTS_BROKER = os.getenv('EVENTS_BROKER', 'memory')
+EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL', CELERY_BROKER_URL)
+EVENTS_QUEUE_SIZE = 100
+EVENTS_HEARTBEAT_SECONDS = 15
+
+# Chatbot knowledge bases (one per hospital, see doctorAppointment/knowledge.py):
+# the one used when a chat request names none, and how many MB of loaded
+# indexes stay in memory before the least recently used are dropped
+CHATBOT_DEFAULT_KNOWLEDGE_BASE = os.getenv('CHATBOT_DEFAULT_KNOWLEDGE_BASE', 'default')
+CHATBOT_KNOWLEDGE_BASE_CACHE_MB = int(os.getenv('CHATBOT_KNOWLEDGE_BASE_CACHE_MB', '256'))
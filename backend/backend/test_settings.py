@@ -0,0 +1,11 @@
+"""
+Settings for running the test suite.
+
+`manage.py test` picks this module by default; other runners should set
+DJANGO_SETTINGS_MODULE=backend.test_settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+# Login audit rows must land inside each test's transaction.
+AUDIT_LOG_QUEUE = False
@@ -15,14 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from doctorAppointment.staticfiles import frontend_index
+
 from .views import home
 
 urlpatterns = [
+    # Client-side routes of the React app; /admin/dashboard is the app's, the rest of /admin/ is Django's
+    re_path(r'^admin/dashboard/?$', frontend_index),
     path('admin/', admin.site.urls),
     path('api/', include('doctorAppointment.urls')),
     path('', home, name='home'),
+    re_path(r'^(?!api/|admin/|static/|media/)[\w/-]+$', frontend_index, name='frontend'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
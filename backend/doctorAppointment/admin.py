@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 from .models import User
-from .models import Doctor, Patient, Appointment, AppointmentSlot, LoginInfo
+from .models import (Doctor, Patient, Appointment, AppointmentSlot, LoginInfo, WaitlistEntry, EmailNotification,
+                     AppointmentReminder)
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -16,10 +20,40 @@ admin.site.register(Doctor)
 admin.site.register(Patient)
 admin.site.register(Appointment)
 admin.site.register(AppointmentSlot)
+admin.site.register(WaitlistEntry)
+admin.site.register(EmailNotification)
+admin.site.register(AppointmentReminder)
+
+class EstimatedCountPaginator(Paginator):
+    """
+    On PostgreSQL, an unfiltered changelist uses the planner's row estimate
+    (summed over partitions) instead of COUNT(*) over the whole table.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if connection.vendor == 'postgresql' and query is not None and not query.where:
+            table = self.object_list.model._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT sum(greatest(reltuples, 0))::bigint FROM pg_class WHERE oid = to_regclass(%s) '
+                    'OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))',
+                    [table, table]
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate and estimate > 10000:
+                return estimate
+        return super().count
+
 
 @admin.register(LoginInfo)
 class LoginInfoAdmin(admin.ModelAdmin):
     list_display = ['user', 'login_type', 'login_time', 'ip_address']
     list_filter = ['login_type', 'login_time']
-    search_fields = ['user__username', 'ip_address']
+    list_select_related = ['user']
+    # Exact matches instead of '%term%' scans over every login row
+    search_fields = ['=user__username', '=ip_address']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['user', 'login_time', 'ip_address', 'user_agent', 'login_type']
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DoctorappointmentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'doctorAppointment'
+
+    def ready(self):
+        from .overlaps import reinstall_guards
+        from .search import reinstall_search
+        post_migrate.connect(reinstall_guards, sender=self)
+        post_migrate.connect(reinstall_search, sender=self)
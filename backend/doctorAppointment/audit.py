@@ -0,0 +1,113 @@
+"""
+Single-writer queue for audit rows (Log, LoginInfo).
+
+On SQLite every write transaction takes the database-wide write lock, so
+logging a login competes with bookings for it. With ``AUDIT_LOG_QUEUE`` on
+(the default when running on SQLite) request threads only enqueue the rows;
+one background thread per process drains the queue and writes whatever has
+accumulated in a single transaction. Rows still queued when the process is
+killed are lost, which is acceptable for audit data; a clean exit flushes
+them. A batch that still fails after ``WRITE_ATTEMPTS`` is written to the
+application log instead, row by row. When the queue is off, or full, rows
+are written immediately.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+from .models import Log, LoginInfo
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+WRITE_ATTEMPTS = 3
+
+
+def describe(row):
+    """One-line rendering of an audit row for the log, used when it cannot be stored."""
+    if isinstance(row, LoginInfo):
+        return (f'LoginInfo user_id={row.user_id} login_type={row.login_type} '
+                f'ip_address={row.ip_address} user_agent={row.user_agent!r}')
+    return f'Log level={row.level} user_id={row.user_id} message={row.message!r}'
+
+
+class AuditWriter:
+    def __init__(self, maxsize=10000):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, row):
+        if not settings.AUDIT_LOG_QUEUE:
+            row.save()
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            row.save()
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far has been written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None:
+                atexit.register(self.flush)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if isinstance(item, (Log, LoginInfo))]
+            if rows:
+                self._write(rows)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, rows):
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                close_old_connections()
+                with transaction.atomic():
+                    LoginInfo.objects.bulk_create([row for row in rows if isinstance(row, LoginInfo)])
+                    Log.objects.bulk_create([row for row in rows if isinstance(row, Log)])
+                return True
+            except DatabaseError:
+                logger.exception('Writing %d audit rows failed (attempt %d)', len(rows), attempt)
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(0.5 * 2 ** (attempt - 1))
+        for row in rows:
+            logger.error('Dropped audit row: %s', describe(row))
+        return False
+
+
+writer = AuditWriter()
+
+
+def record_login(user, ip_address, user_agent, login_type='login'):
+    writer.submit(LoginInfo(user=user, ip_address=ip_address, user_agent=user_agent, login_type=login_type))
+
+
+def record_log(level, message, user=None):
+    writer.submit(Log(level=level, message=message, user=user))
@@ -0,0 +1,60 @@
+"""
+All-or-nothing booking of several slots for one patient (e.g. a series of
+follow-up visits).
+
+The requested slots are locked with SELECT ... FOR UPDATE in primary-key
+order, so two overlapping batches always contend for their shared slots in
+the same order and one simply waits for the other instead of deadlocking
+(on SQLite, BEGIN IMMEDIATE already serializes writers). Every slot is
+validated under the lock, then all appointments are inserted with one
+``bulk_create`` and all slots flagged with one UPDATE. Any failure,
+including the database's overlap and one-active-appointment-per-slot
+constraints, rolls the whole batch back.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_slot_event
+from .models import Appointment, AppointmentSlot, appointment_start
+from .notifications import queue_batch_confirmation
+
+
+def book_slots(patient, slot_ids):
+    """
+    Book every slot in ``slot_ids`` for ``patient`` in one transaction.
+    Returns (appointments, unavailable_ids); when ``unavailable_ids`` is
+    non-empty nothing was booked. IntegrityError propagates (see overlaps.py).
+    """
+    with transaction.atomic():
+        slots = list(
+            AppointmentSlot.objects.select_for_update(of=('self',))
+            .select_related('doctor')
+            .filter(id__in=slot_ids)
+            .order_by('id')
+        )
+        found = {slot.id for slot in slots}
+        unavailable = sorted(set(slot_ids) - found) + [slot.id for slot in slots if slot.is_booked]
+        if unavailable:
+            return [], sorted(unavailable)
+
+        now = timezone.now()
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                patient=patient, doctor=slot.doctor, slot=slot,
+                appointment_date=slot.date, start_time=slot.start_time, end_time=slot.end_time,
+                # bulk_create skips Appointment.save()
+                starts_at=appointment_start(slot.date, slot.start_time),
+            )
+            for slot in slots
+        ])
+        AppointmentSlot.objects.filter(id__in=found).update(is_booked=True, updated_at=now)
+        if appointments[0].pk is None:
+            # Backends that don't return ids from bulk inserts
+            by_slot = dict(Appointment.objects.filter(slot_id__in=found, status='Booked')
+                           .values_list('slot_id', 'id'))
+            for appointment in appointments:
+                appointment.pk = by_slot[appointment.slot_id]
+        queue_batch_confirmation(patient, appointments)
+        for slot in slots:
+            publish_slot_event('slot.booked', slot)
+    return appointments, []
@@ -0,0 +1,239 @@
+"""
+Bulk import and export of doctor and patient accounts.
+
+Rows are read lazily from CSV or JSON-lines input, validated a batch at a
+time (one query per batch for username clashes) and written with
+``bulk_create`` inside one transaction per batch, so a bad batch never
+rolls back the batches before it. Imported passwords are hashed with the
+cheap ``ImportedPBKDF2PasswordHasher``; Django re-hashes them with the
+default hasher on the user's first login.
+"""
+import csv
+import io
+import json
+import logging
+import re
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .hashers import ImportedPBKDF2PasswordHasher
+from .models import Doctor, Patient, User
+from .specializations import resolve
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+# Digits plus the separators the admin search index strips ("+1 (555) 010-0100")
+PHONE_NUMBER = re.compile(r'^\+?[\d\s().-]*\d[\d\s().-]*$')
+
+PROFILE_SPECS = {
+    'doctor': {
+        'model': Doctor,
+        'fields': {'specialization': 100},
+        'export': ('id', 'user__username', 'user__email', 'user__first_name', 'name', 'specialization__name'),
+    },
+    'patient': {
+        'model': Patient,
+        'fields': {'phone_number': 15},
+        'required': ('phone_number',),
+        'export': ('id', 'user__username', 'user__email', 'user__first_name', 'name', 'phone_number'),
+    },
+}
+EXPORT_HEADERS = {
+    'user__username': 'username',
+    'user__email': 'email',
+    'user__first_name': 'first_name',
+    'specialization__name': 'specialization',
+}
+
+
+def read_rows(lines, fmt):
+    """Yield dicts from an iterable of text lines in 'csv' or 'jsonl' format."""
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else {'__invalid__': line[:200]}
+
+
+def decode_lines(chunks, encoding='utf-8'):
+    """Turn an iterable of byte chunks into text lines without buffering it all."""
+    reader = io.TextIOWrapper(io.BufferedReader(_ChunkStream(chunks)), encoding=encoding, newline='')
+    yield from reader
+
+
+class _ChunkStream(io.RawIOBase):
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _validate(row, role, seen):
+    if '__invalid__' in row:
+        return None, ['Row is not a JSON object']
+    errors = []
+    username = _clean(row.get('username'))
+    email = _clean(row.get('email'))
+    if not username:
+        errors.append('username is required')
+    elif len(username) > 150:
+        errors.append('username must be at most 150 characters')
+    elif username in seen:
+        errors.append('duplicate username in import')
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append('invalid email')
+    first_name = _clean(row.get('first_name'))
+    name = _clean(row.get('name')) or first_name or username
+    if len(name) > 100:
+        errors.append('name must be at most 100 characters')
+    profile = {'name': name}
+    for field, max_length in PROFILE_SPECS[role]['fields'].items():
+        value = _clean(row.get(field))
+        if not value and field in PROFILE_SPECS[role].get('required', ()):
+            errors.append(f'{field} is required')
+        elif len(value) > max_length:
+            errors.append(f'{field} must be at most {max_length} characters')
+        elif field == 'phone_number' and not PHONE_NUMBER.match(value):
+            errors.append('invalid phone_number')
+        profile[field] = value
+    if errors:
+        return None, errors
+    seen.add(username)
+    return {
+        'username': username,
+        'email': email,
+        'first_name': first_name[:150],
+        'password': _clean(row.get('password')),
+        'profile': profile,
+    }, []
+
+
+def _write_batch(batch, role, report):
+    """Insert one validated batch; ``batch`` is a list of (row_number, data)."""
+    usernames = [data['username'] for _, data in batch]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    for row_number, data in batch:
+        if data['username'] in taken:
+            report['errors'].append({'row': row_number, 'errors': ['username already exists']})
+    batch = [(row_number, data) for row_number, data in batch if data['username'] not in taken]
+    if not batch:
+        return
+
+    hasher = ImportedPBKDF2PasswordHasher()
+    users = [
+        User(
+            username=data['username'],
+            email=data['email'],
+            first_name=data['first_name'],
+            role=role,
+            # No password: the account must go through password reset before logging in
+            password=make_password(data['password'] or None, hasher=hasher),
+        )
+        for _, data in batch
+    ]
+    model = PROFILE_SPECS[role]['model']
+    if role == 'doctor':
+        # One catalog lookup per distinct spelling in the batch
+        catalog = {text: resolve(text) for text in {data['profile']['specialization'] for _, data in batch}}
+        for _, data in batch:
+            data['profile']['specialization'] = catalog[data['profile']['specialization']]
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            if users[0].pk is None:
+                ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+            model.objects.bulk_create([
+                model(user_id=user.pk, **data['profile']) for user, (_, data) in zip(users, batch)
+            ])
+    except IntegrityError:
+        # A concurrent writer took one of the usernames; the database error stays in the log
+        logger.warning('Import batch of %d %ss rejected', len(batch), role, exc_info=True)
+        taken = set(User.objects.filter(username__in=[data['username'] for _, data in batch])
+                    .values_list('username', flat=True))
+        for row_number, data in batch:
+            errors = ['username already exists'] if data['username'] in taken else \
+                ['not imported: another row in its batch was rejected; import it again']
+            report['errors'].append({'row': row_number, 'errors': errors})
+        return
+    report['created'] += len(batch)
+
+
+def import_accounts(rows, role, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create ``role`` users plus their profiles from an iterable of dicts.
+    Returns {'created': int, 'failed': int, 'errors': [{'row': n, 'errors': [...]}]},
+    where row numbers are 1-based data rows.
+    """
+    report = {'created': 0, 'failed': 0, 'errors': []}
+    seen = set()
+    batch = []
+    for row_number, row in enumerate(rows, start=1):
+        data, errors = _validate(row, role, seen)
+        if errors:
+            report['errors'].append({'row': row_number, 'errors': errors})
+            continue
+        batch.append((row_number, data))
+        if len(batch) >= batch_size:
+            _write_batch(batch, role, report)
+            batch = []
+    if batch:
+        _write_batch(batch, role, report)
+    report['failed'] = len(report['errors'])
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_accounts(role, fmt, chunk_size=2000):
+    """Yield the ``role`` profiles as CSV or JSON-lines text, streaming from the DB."""
+    columns = PROFILE_SPECS[role]['export']
+    headers = [EXPORT_HEADERS.get(column, column) for column in columns]
+    rows = (
+        PROFILE_SPECS[role]['model'].objects.order_by('id')
+        .values_list(*columns).iterator(chunk_size=chunk_size)
+    )
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(headers, row))) + '\n'
@@ -1,11 +1,13 @@
 import os
 import json
-import pickle
+import logging
+import threading
 import time
 from pathlib import Path
 from typing import List, Tuple, Dict, Any
 
 import numpy as np
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
@@ -13,37 +15,38 @@ from rest_framework.request import Request
 
 # Lazy import heavy deps to speed up Django startup when not used
 from dotenv import load_dotenv
-from collections import deque
 import uuid
 from typing import Optional
 
+from . import knowledge
+from .intents import IntentRouter
+from .knowledge import KnowledgeBase, KnowledgeBaseCache
+from .prompting import ChatSession, build_messages
+
+logger = logging.getLogger(__name__)
+
 
 class RAGChatbot:
     """
     Retrieval-Augmented Generation chatbot for hospital-specific Q&A.
 
-    - Loads/creates FAISS index from a hospital.txt knowledge file
-    - Retrieves relevant chunks
+    - Serves several named knowledge bases (one per hospital, see knowledge.py),
+      loaded on demand into an LRU and all embedded with one shared model
+    - Retrieves relevant chunks from the knowledge base a request names
     - Sends prompt to Groq LLM and returns an answer constrained to hospital domain
     """
 
     def __init__(self,
                  data_dir: Path,
-                 knowledge_file: Path,
-                 index_file: Path,
-                 store_file: Path,
                  embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
-                 top_k: int = 5):
+                 top_k: int = 5,
+                 cache_bytes: Optional[int] = None):
         self.data_dir = data_dir
-        self.knowledge_file = knowledge_file
-        self.index_file = index_file
-        self.store_file = store_file
         self.embedding_model_name = embedding_model_name
         self.top_k = top_k
         self._embedding_model = None
+        self._embedding_lock = threading.Lock()
         self._faiss = None
-        self._index = None
-        self._doc_store: List[str] = []
 
         # Ensure data directory exists
         self.data_dir.mkdir(parents=True, exist_ok=True)
@@ -61,29 +64,37 @@ class RAGChatbot:
             # Still allow running retrieval without generation for health check
             pass
 
-        # Try load index, otherwise build
-        if self.index_file.exists() and self.store_file.exists():
-            try:
-                self._load_index()
-            except Exception as e:
-                print(f"Failed to load existing index, rebuilding: {e}")
-                self._build_index_from_knowledge()
-        else:
-            self._build_index_from_knowledge()
+        # Load tests: answer with a canned reply after a fixed delay instead of calling Groq
+        self.fake_llm = os.getenv("CHATBOT_FAKE_LLM", "0") == "1"
+        self.fake_llm_latency = float(os.getenv("CHATBOT_FAKE_LLM_LATENCY_MS", "300")) / 1000
+
+        # Without FAISS no knowledge base can load: fail here, as before, so the view reports it
+        self._ensure_faiss()
+        if cache_bytes is None:
+            cache_bytes = settings.CHATBOT_KNOWLEDGE_BASE_CACHE_MB * 1024 * 1024
+        self.knowledge_bases = KnowledgeBaseCache(self._load_knowledge_base, cache_bytes)
+
+        # Warm the default knowledge base so the first question doesn't wait for it
+        try:
+            self.knowledge_bases.get(settings.CHATBOT_DEFAULT_KNOWLEDGE_BASE)
+        except Exception:
+            logger.warning('Failed to load default knowledge base', exc_info=True)
 
     # ------------------------ Embeddings & FAISS ------------------------
     def _ensure_embedding_model(self):
-        if self._embedding_model is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._embedding_model = SentenceTransformer(self.embedding_model_name, trust_remote_code=True)
-            except ImportError:
-                raise ImportError(
-                    "sentence-transformers is not installed. Please install it with: pip install sentence-transformers"
-                )
-            except Exception as e:
-                # Handle memory issues or other loading errors
-                raise RuntimeError(f"Failed to load embedding model '{self.embedding_model_name}': {str(e)}. This might be due to memory constraints in the deployment environment.")
+        # Shared by every knowledge base (and the intent router); concurrent first requests load it once
+        with self._embedding_lock:
+            if self._embedding_model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedding_model = SentenceTransformer(self.embedding_model_name, trust_remote_code=True)
+                except ImportError:
+                    raise ImportError(
+                        "sentence-transformers is not installed. Please install it with: pip install sentence-transformers"
+                    )
+                except Exception as e:
+                    # Handle memory issues or other loading errors
+                    raise RuntimeError(f"Failed to load embedding model '{self.embedding_model_name}': {str(e)}. This might be due to memory constraints in the deployment environment.")
         return self._embedding_model
 
     def _ensure_faiss(self):
@@ -97,58 +108,16 @@ class RAGChatbot:
         embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True)
         return np.array(embeddings).astype("float32")
 
-    def _chunk_text(self, text: str, chunk_size: int = 700, overlap: int = 120) -> List[str]:
-        words = text.split()
-        chunks = []
-        i = 0
-        while i < len(words):
-            chunk_words = words[i:i + chunk_size]
-            chunks.append(" ".join(chunk_words))
-            i += chunk_size - overlap
-            if i <= 0:
-                break
-        # also ensure unique and non-empty
-        return [c.strip() for c in chunks if c and c.strip()]
-
-    def _build_index_from_knowledge(self):
-        if not self.knowledge_file.exists():
-            raise FileNotFoundError(
-                f"Knowledge file not found: {self.knowledge_file}. Please add hospital.txt with the hospital information."
-            )
+    def _load_knowledge_base(self, name: str) -> KnowledgeBase:
+        knowledge_base = knowledge.find(self.data_dir, name)
+        if knowledge_base is None:
+            raise KeyError(f"Unknown knowledge base '{name}'")
+        return knowledge_base.load(self._ensure_faiss(), self._embed)
 
-        text = self.knowledge_file.read_text(encoding="utf-8")
-        if not text.strip():
-            raise ValueError(
-                f"Knowledge file is empty: {self.knowledge_file}. Please add hospital information."
-            )
-        chunks = self._chunk_text(text)
-        if not chunks:
-            chunks = [text]
-
-        vectors = self._embed(chunks)
-        faiss = self._ensure_faiss()
-        index = faiss.IndexFlatIP(vectors.shape[1])  # cosine via normalized vectors => inner product
-        index.add(vectors)
-
-        self._index = index
-        self._doc_store = chunks
-
-        # Persist
-        faiss.write_index(index, str(self.index_file))
-        with open(self.store_file, "wb") as f:
-            pickle.dump(self._doc_store, f)
-
-    def _load_index(self):
-        faiss = self._ensure_faiss()
-        self._index = faiss.read_index(str(self.index_file))
-        with open(self.store_file, "rb") as f:
-            self._doc_store = pickle.load(f)
-
-    def retrieve(self, query: str, k: int = None) -> List[Tuple[str, float]]:
+    def retrieve(self, query: str, k: int = None, knowledge_base: Optional[str] = None) -> List[Tuple[str, float]]:
         if not query or not query.strip():
             return []
-        if self._index is None:
-            self._load_index()
+        loaded = self.knowledge_bases.get(knowledge_base or settings.CHATBOT_DEFAULT_KNOWLEDGE_BASE)
         k = k or self.top_k
         try:
             qv = self._embed([query])
@@ -156,54 +125,27 @@ class RAGChatbot:
             # Return empty results if embedding fails
             print(f"Embedding error: {e}")
             return []
-        scores, idxs = self._index.search(qv, k)
-        results = []
-        for score, idx in zip(scores[0], idxs[0]):
-            if 0 <= idx < len(self._doc_store):
-                results.append((self._doc_store[idx], float(score)))
-        return results
+        return loaded.search(qv, k)
 
     # ------------------------ Generation ------------------------
-    def generate(self, query: str, context_chunks: List[str], history: Optional[List[Dict[str, str]]] = None) -> str:
+    def generate(self, query: str, retrieved: List[Tuple[str, float]],
+                 session: Optional[ChatSession] = None) -> Tuple[str, Dict[str, Any]]:
+        """Answer and prompt stats ({'prompt_tokens', 'chunks_used'}) for ``query``."""
+        messages, stats = build_messages(query, retrieved, session)
+        if self.fake_llm:
+            return self._fake_generate(query, [retrieved[i][0] for i in stats["chunks_used"]]), stats
         if not self.groq_api_key:
             return (
                 "The language model API key is not configured on the server. "
                 "Please set GROQ_API_KEY in backend/.env."
-            )
+            ), stats
 
         try:
             from groq import Groq
         except Exception:
-            return "Groq SDK is not installed on the server. Add 'groq' to requirements.txt and install."
+            return "Groq SDK is not installed on the server. Add 'groq' to requirements.txt and install.", stats
 
         client = Groq(api_key=self.groq_api_key)
-        system_prompt = (
-            "You are a hospital information assistant for a single specific hospital."
-            "\n- For factual questions about the hospital (services, hours, contacts, policies), rely ONLY on the provided 'Hospital knowledge base'."
-            "\n- If the required hospital fact is not present in the knowledge base, say: 'I can only answer questions about this hospital based on available information.'"
-            "\n- You may use the prior chat messages to maintain conversation context or to answer questions about the conversation itself (e.g., 'what was my first question?')."
-            "\n- Keep answers concise and accurate."
-        )
-        context_text = "\n\n".join([f"- {c}" for c in context_chunks]) if context_chunks else "(No hospital knowledge provided.)"
-        context_system = (
-            "Hospital knowledge base (authoritative for hospital facts; do NOT invent facts beyond this):\n" + context_text
-        )
-
-        messages: List[Dict[str, str]] = [
-            {"role": "system", "content": system_prompt},
-            {"role": "system", "content": context_system},
-        ]
-        if history:
-            # Cap to last 12 messages for brevity
-            hist = history[-12:]
-            for m in hist:
-                role = m.get("role")
-                content = m.get("content")
-                if role in ("user", "assistant") and isinstance(content, str):
-                    messages.append({"role": role, "content": content})
-        # Current user query last
-        messages.append({"role": "user", "content": query})
-
         try:
             completion = client.chat.completions.create(
                 model="llama-3.1-8b-instant",
@@ -212,27 +154,32 @@ class RAGChatbot:
                 max_tokens=512,
                 top_p=0.9,
             )
-            return completion.choices[0].message.content.strip()
+            return completion.choices[0].message.content.strip(), stats
         except Exception as e:
-            return f"Failed to generate answer: {e}"
+            return f"Failed to generate answer: {e}", stats
 
-    def answer(self, query: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    def _fake_generate(self, query: str, context_chunks: List[str]) -> str:
+        time.sleep(self.fake_llm_latency)
+        source = context_chunks[0][:200] if context_chunks else "(no context retrieved)"
+        return f"[fake LLM] {query.strip()} -> {source}"
+
+    def answer(self, query: str, session: Optional[ChatSession] = None,
+               knowledge_base: Optional[str] = None) -> Dict[str, Any]:
         try:
-            retrieved = self.retrieve(query)
-            chunks = [c for c, _ in retrieved]
+            retrieved = self.retrieve(query, knowledge_base=knowledge_base)
         except Exception as e:
             print(f"Retrieval error: {e}")
-            chunks = []
-        answer = self.generate(query, chunks, history=history)
+            retrieved = []
+        answer, stats = self.generate(query, retrieved, session=session)
         return {
             "response": answer,
-            "context": chunks,
+            "context": [retrieved[i][0] for i in stats["chunks_used"]],
+            "prompt_tokens": stats["prompt_tokens"],
         }
 
 
-# In-memory chat histories (per-session), bounded for short-term memory
-_CHAT_HISTORY_LIMIT = 12
-_chat_histories: Dict[str, Any] = {}
+# In-memory chat sessions: recent messages plus a rolling summary of older ones
+_chat_histories: Dict[str, ChatSession] = {}
 
 # Default session ID for when session management fails
 DEFAULT_SESSION_ID = "default_session"
@@ -240,16 +187,15 @@ DEFAULT_SESSION_ID = "default_session"
 # Singleton chatbot instance
 _data_dir = Path(__file__).resolve().parent / "data"
 try:
-    _chatbot = RAGChatbot(
-        data_dir=_data_dir,
-        knowledge_file=_data_dir / "hospital.txt",
-        index_file=_data_dir / "faiss.index",
-        store_file=_data_dir / "chunks.pkl",
-    )
+    _chatbot = RAGChatbot(data_dir=_data_dir)
 except Exception as e:
     print(f"Failed to initialize chatbot: {e}")
     _chatbot = None
 
+# Availability, doctor and my-appointment questions are answered from the database without the LLM;
+# its embedding fallback shares the chatbot's model
+_intent_router = IntentRouter(embed=_chatbot._embed if _chatbot is not None else None)
+
 
 class ChatbotAPIView(APIView):
     permission_classes = [AllowAny]
@@ -263,9 +209,12 @@ class ChatbotAPIView(APIView):
             query = body.get("query", "")
             session_id = body.get("session_id")
             reset = bool(body.get("reset", False))
+            knowledge_base = body.get("knowledge_base") or settings.CHATBOT_DEFAULT_KNOWLEDGE_BASE
 
             if not query or not isinstance(query, str):
                 return JsonResponse({"error": "Field 'query' is required."}, status=400)
+            if knowledge.find(_data_dir, knowledge_base) is None:
+                return JsonResponse({"error": f"Unknown knowledge base: {knowledge_base}"}, status=400)
 
             if not session_id or not isinstance(session_id, str):
                 try:
@@ -275,16 +224,17 @@ class ChatbotAPIView(APIView):
                     session_id = f"session_{int(time.time())}"
 
             # Initialize or reset history
-            history = _chat_histories.get(session_id)
-            if reset or history is None:
-                history = deque(maxlen=_CHAT_HISTORY_LIMIT)
-                _chat_histories[session_id] = history
-
-            # Prepare plain list for the model
-            history_list = list(history)
-
+            session = _chat_histories.get(session_id)
+            if reset or session is None:
+                session = ChatSession()
+                _chat_histories[session_id] = session
+
+            routed = _intent_router.route(query, request.user)
+            if routed is not None:
+                result = {"response": routed["response"], "context": [], "intent": routed["intent"],
+                          "session_id": session_id}
             # Check if chatbot is available
-            if _chatbot is None:
+            elif _chatbot is None:
                 result = {
                     "response": "Chatbot is not available. The model failed to initialize due to missing dependencies or memory constraints.",
                     "context": [],
@@ -292,14 +242,12 @@ class ChatbotAPIView(APIView):
                 }
             else:
                 # Get answer with history-aware generation
-                result = _chatbot.answer(query, history=history_list)
+                result = _chatbot.answer(query, session=session, knowledge_base=knowledge_base)
                 # Append session_id to result
                 result["session_id"] = session_id
 
-            # Append this turn to history
-            history.append({"role": "user", "content": query})
-            history.append({"role": "assistant", "content": result.get("response", "")})
-            _chat_histories[session_id] = history
+            # Append this turn to history; older turns fold into the session's summary
+            session.add_turn(query, result.get("response", ""))
 
             # Return session id so client can persist it
             print(f"Returning result: {result}")
@@ -311,4 +259,8 @@ class ChatbotAPIView(APIView):
     def get(self, request: Request):
         # Simple health check
         is_ready = _chatbot is not None
-        return JsonResponse({"status": "ok", "ready": is_ready}, status=200 if is_ready else 503)
+        payload = {"status": "ok", "ready": is_ready, "knowledge_bases": knowledge.names(_data_dir)}
+        if is_ready:
+            # Per-knowledge-base hits, misses, evictions and load times of the index cache
+            payload["cache"] = _chatbot.knowledge_bases.stats()
+        return JsonResponse(payload, status=200 if is_ready else 503)
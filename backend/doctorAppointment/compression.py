@@ -0,0 +1,165 @@
+"""
+Compression of dynamic responses (API JSON, CSV/JSON-lines exports).
+
+Responses are gzipped for clients that accept it. Like Django's
+GZipMiddleware, each gzip body carries a random-length (0 to
+``COMPRESSION_MAX_RANDOM_BYTES``) filename field in its header, so the
+compressed size no longer leaks how well a secret in the body (a JWT, a CSRF
+token) compresses against attacker-reflected input (BREACH). Brotli has no
+such field and is only used when ``COMPRESSION_BROTLI`` is on and the
+optional ``brotli`` package is installed.
+
+Responses smaller than ``COMPRESSION_MIN_SIZE`` bytes are sent as they are:
+below roughly one packet the header overhead and CPU cost outweigh the
+saving. Streaming responses are compressed chunk by chunk as they are
+produced, so exports still start immediately and never sit in memory whole.
+Server-Sent Events are never compressed, since the compressor would hold
+events back until its buffer fills.
+
+Static files are not handled here: WhiteNoise serves the ``.br``/``.gz``
+files that collectstatic and build.sh write next to them, and it sits above
+this middleware, so its file responses never reach it.
+"""
+import gzip
+import re
+import secrets
+import struct
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+_CODING = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def preferred_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header; br wins ties when available."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = _CODING.match(part)
+        if not match:
+            continue
+        try:
+            weights[match.group(1).lower()] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+    wildcard = weights.get('*', 0)
+    candidates = ['br', 'gzip'] if brotli is not None and settings.COMPRESSION_BROTLI else ['gzip']
+    best = max(candidates, key=lambda coding: weights.get(coding, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+def _gzip_header(max_random_bytes):
+    """gzip member header; with ``max_random_bytes`` its FNAME field holds 0 to max - 1 random bytes."""
+    if not max_random_bytes:
+        return b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+    padding = b'a' * secrets.randbelow(max_random_bytes)
+    return b'\x1f\x8b\x08' + bytes([gzip.FNAME]) + b'\x00\x00\x00\x00\x00\xff' + padding + b'\x00'
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._stream = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self.compress, self._finish = self._stream.process, self._stream.finish
+        else:
+            # Raw deflate inside a gzip container written here, so the header can carry the padding
+            self._stream = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._header = _gzip_header(settings.COMPRESSION_MAX_RANDOM_BYTES)
+            self._crc = self._size = 0
+            self.compress, self._finish = self._gzip_compress, self._gzip_finish
+
+    def _gzip_compress(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        data, self._header = self._header + self._stream.compress(data), b''
+        return data
+
+    def _gzip_finish(self):
+        data, self._header = self._header + self._stream.flush(), b''
+        return data + struct.pack('<II', self._crc, self._size & 0xffffffff)
+
+    def finish(self):
+        return self._finish()
+
+
+def compress_bytes(data, encoding):
+    compressor = _Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _compress_async_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress text responses for clients that accept br or gzip; see the module docstring."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # Caches must key on Accept-Encoding whether or not this client gets a compressed body
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _compress_async_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = _compress_stream(response.streaming_content, encoding)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is a different representation of the same resource
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,58 @@
+"""
+Conditional GET for polled list endpoints.
+
+Appointments and slots carry an ``updated_at`` timestamp. A list's row count
+plus its latest ``updated_at`` change whenever a row in it is created,
+updated or deleted, so that pair (one aggregate query, no rows loaded)
+becomes the response's ETag and Last-Modified. Responses are marked
+``Cache-Control: private, no-cache``, which makes browsers revalidate with
+If-None-Match on every poll and turn the 304 back into the cached body.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def conditional_list(get_queryset):
+    """
+    Decorator for an APIView ``get``. ``get_queryset(request, *args, **kwargs)``
+    returns the queryset behind the response, or None when the view is going
+    to reject the request (the view then runs without preconditions).
+    """
+    def version(request, *args, **kwargs):
+        # Computed once per request; both condition callbacks need it
+        if not hasattr(request, '_list_version'):
+            queryset = get_queryset(request, *args, **kwargs)
+            request._list_version = None if queryset is None else queryset.aggregate(
+                count=Count('id'), latest=Max('updated_at')
+            )
+        return request._list_version
+
+    def etag(request, *args, **kwargs):
+        current = version(request, *args, **kwargs)
+        if current is None:
+            return None
+        latest = current['latest'].isoformat() if current['latest'] else ''
+        key = f'{request.path}:{request.user.pk}:{current["count"]}:{latest}'
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        current = version(request, *args, **kwargs)
+        return current['latest'] if current else None
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            view = condition(etag_func=etag, last_modified_func=last_modified)(
+                lambda request, *args, **kwargs: view_method(self, request, *args, **kwargs)
+            )
+            response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+
+    return decorator
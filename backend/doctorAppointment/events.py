@@ -0,0 +1,198 @@
+"""
+Change feed for slot and appointment updates.
+
+Writers call ``publish_event`` (or ``publish_slot_event``); the event is sent
+after the surrounding transaction commits, to every subscriber of the
+doctor's channel, the doctor's specialization channel and the ``all``
+channel. Events are small JSON objects carrying ids; slot events also carry
+the slot's doctor name and times, so clients patch their slot lists in place
+instead of refetching or polling them.
+
+Two brokers are available, selected with ``EVENTS_BROKER``:
+
+- ``memory``: in-process fan-out, for single-node deployments.
+- ``redis``: events go through one Redis pub/sub channel and each process
+  keeps a single subscription that fans out to its local clients.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+ALL_CHANNEL = 'all'
+
+
+def doctor_channel(doctor_id):
+    return f'doctor:{doctor_id}'
+
+
+def specialization_channel(specialization_id):
+    return f'specialization:{specialization_id}'
+
+
+def format_sse(event_type, data):
+    return f'event: {event_type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """A client's view of the feed: a bounded queue bound to its event loop."""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Runs on the subscriber's loop; a slow client loses its oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Next SSE frame, or None if nothing arrived within ``timeout``."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channels):
+        """Must be called from the subscriber's running event loop."""
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._channels.values())) if self._channels else 0
+
+    def fan_out(self, channels, message):
+        """Deliver an encoded SSE frame once to every subscriber of any channel."""
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return len(targets)
+
+    def publish(self, channels, message):
+        return self.fan_out(channels, message)
+
+
+class RedisBroker(InProcessBroker):
+    def __init__(self, url, channel='doctorAppointment:events', queue_size=100):
+        super().__init__(queue_size)
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.channel = channel
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return super().subscribe(channels)
+
+    def publish(self, channels, message):
+        self._redis.publish(self.channel, json.dumps({'channels': list(channels), 'message': message}))
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='events-redis-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for item in pubsub.listen():
+                    envelope = json.loads(item['data'])
+                    self.fan_out(envelope['channels'], envelope['message'])
+            except Exception as e:
+                logger.warning('Event listener lost Redis connection, retrying: %s', e)
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            queue_size = getattr(settings, 'EVENTS_QUEUE_SIZE', 100)
+            if getattr(settings, 'EVENTS_BROKER', 'memory') == 'redis':
+                _broker = RedisBroker(settings.EVENTS_REDIS_URL, queue_size=queue_size)
+            else:
+                _broker = InProcessBroker(queue_size=queue_size)
+        return _broker
+
+
+def publish_event(event_type, doctor_id, specialization_id=None, **fields):
+    """Queue an event for the doctor's subscribers once the current transaction commits."""
+    payload = {'type': event_type, 'doctor_id': doctor_id, **fields}
+    if specialization_id:
+        payload['specialization_id'] = specialization_id
+    data = json.dumps(payload, default=str)
+    message = format_sse(event_type, data)
+    channels = [ALL_CHANNEL, doctor_channel(doctor_id)]
+    if specialization_id:
+        channels.append(specialization_channel(specialization_id))
+
+    def send():
+        try:
+            get_broker().publish(channels, message)
+        except Exception:
+            # The change feed is best effort; never fail the write that triggered it
+            logger.exception('Failed to publish %s event', event_type)
+
+    transaction.on_commit(send)
+
+
+def publish_slot_event(event_type, slot, **fields):
+    """``slot`` should come with its doctor loaded (select_related), which supplies the specialization."""
+    publish_event(
+        event_type,
+        doctor_id=slot.doctor_id,
+        specialization_id=slot.doctor.specialization_id,
+        slot_id=slot.id,
+        doctor_name=slot.doctor.name,
+        date=slot.date,
+        start_time=slot.start_time,
+        end_time=slot.end_time,
+        **fields,
+    )
@@ -0,0 +1,11 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ImportedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Low-iteration PBKDF2 used only for bulk-imported accounts. It is listed
+    after the default hasher in PASSWORD_HASHERS, so a successful login
+    upgrades the stored hash to the default.
+    """
+    algorithm = 'pbkdf2_sha256_import'
+    iterations = 10000
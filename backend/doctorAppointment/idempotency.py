@@ -0,0 +1,144 @@
+"""
+Idempotency-Key handling for POSTs that clients retry (booking, cancel,
+signup).
+
+A request carrying an ``Idempotency-Key`` header is recorded together with a
+fingerprint of its method, path and body, and the response it got. A retry
+with the same key is answered from that row with one indexed read, without
+running the view again or touching the business tables; a retry with the
+same key but a different request is rejected with 422.
+
+The key row is inserted in the same transaction as the view's own writes.
+A concurrent duplicate therefore blocks on the unique (scope, key) index
+(or on SQLite's write lock) until the first request commits, then finds the
+row and replays it, so two copies of the same request are never processed
+at once. Side effects (emails, events) already run on commit, so they
+happen exactly once. 5xx responses are rolled back with the view's writes
+and not stored: the retry runs again.
+
+Keys are scoped to the authenticated user; anonymous requests (signup)
+share one scope, which is safe because the fingerprint covers the whole body.
+Rows live for ``IDEMPOTENCY_KEY_TTL`` and are purged by Celery beat.
+
+Response bodies are stored in plain text, so credentials must not be: a view
+lists them in ``secret_fields`` and they are left out of the stored row; a
+successful replay gets fresh ones from its ``reissue(request)`` instead.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+class _Rollback(Exception):
+    """Carries a 5xx response out of the transaction so the key row is rolled back with it."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def fingerprint(request):
+    # Keyed hash: signup bodies contain passwords
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac('idempotency-key', f'{request.method} {request.path}\n{body}').hexdigest()
+
+
+def _scope(request):
+    return f'user:{request.user.pk}' if request.user.is_authenticated else 'anonymous'
+
+
+def _replay(record, request, request_fingerprint, reissue):
+    if record.fingerprint != request_fingerprint:
+        return Response({'error': 'Idempotency-Key was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    body = record.response_body
+    if reissue is not None and status.is_success(record.response_status):
+        body = {**body, **reissue(request)}
+    response = Response(body, status=record.response_status)
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def _live(scope, key):
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    return IdempotencyKey.objects.filter(scope=scope, key=key, created_at__gte=cutoff).first()
+
+
+def idempotent(view_method=None, *, secret_fields=(), reissue=None):
+    """
+    Decorator for an APIView ``post``; requests without the header run unchanged.
+    Use as ``@idempotent``, or ``@idempotent(secret_fields=..., reissue=...)``
+    for responses that carry credentials (see the module docstring).
+    """
+    if view_method is None:
+        return lambda view_method: idempotent(view_method, secret_fields=secret_fields, reissue=reissue)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({'error': f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        scope, request_fingerprint = _scope(request), fingerprint(request)
+        record = _live(scope, key)
+        if record is not None:
+            return _replay(record, request, request_fingerprint, reissue)
+
+        try:
+            with transaction.atomic():
+                # An expired row for this key may not have been purged yet
+                IdempotencyKey.objects.filter(scope=scope, key=key,
+                                              created_at__lt=timezone.now() - settings.IDEMPOTENCY_KEY_TTL).delete()
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(scope=scope, key=key,
+                                                               fingerprint=request_fingerprint)
+                except IntegrityError:
+                    # A duplicate committed first (we waited on its row); replay it below
+                    record = None
+                if record is not None:
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code >= 500:
+                        raise _Rollback(response)
+                    record.response_status = response.status_code
+                    record.response_body = response.data
+                    if secret_fields and isinstance(response.data, dict):
+                        record.response_body = {field: value for field, value in response.data.items()
+                                                if field not in secret_fields}
+                    record.save(update_fields=['response_status', 'response_body'])
+                    return response
+        except _Rollback as rollback:
+            return rollback.response
+        record = _live(scope, key)
+        if record is None:
+            return Response({'error': 'A request with this Idempotency-Key is still being processed'},
+                            status=status.HTTP_409_CONFLICT)
+        return _replay(record, request, request_fingerprint, reissue)
+
+    return wrapper
+
+
+def purge_expired(batch_size=5000):
+    """Deletes keys older than IDEMPOTENCY_KEY_TTL in batches; returns how many were deleted."""
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    expired = IdempotencyKey.objects.filter(created_at__lt=cutoff).order_by('id').values_list('id', flat=True)
+    deleted = 0
+    while True:
+        ids = list(expired[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
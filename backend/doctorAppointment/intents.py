@@ -0,0 +1,292 @@
+"""
+Structured-intent routing in front of the RAG chatbot.
+
+Questions about live data ("which cardiologists are available tomorrow?",
+"when is my next appointment?") can't be answered from hospital.txt, and
+sending them through retrieval and a Groq round trip costs a second or more
+for a wrong answer. ``IntentRouter.route`` recognizes three intents and
+answers them with one or two ORM queries and a templated reply:
+
+- ``availability``: open slots, optionally for a specialization, doctor and day
+- ``doctor_lookup``: doctors of a specialization, or by name
+- ``my_appointments``: the signed-in patient's upcoming appointments
+
+Keyword rules catch the unmistakable phrasings. Questions are also embedded
+with the chatbot's own model and compared with one centroid per intent,
+averaged from the example questions below; an ``info`` centroid built from
+hospital-information questions competes with them, so those still reach the
+LLM, even when a keyword rule matched too. ``route`` returns None for everything it doesn't handle.
+"""
+import logging
+import re
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment, AppointmentSlot, Doctor, Specialization
+from .specializations import facets, normalize
+
+logger = logging.getLogger(__name__)
+
+INTENT_EXAMPLES = {
+    'availability': [
+        'Which cardiologists are available tomorrow?',
+        'Are there any free slots on Monday?',
+        'Can I see a dermatologist today?',
+        'When is the earliest opening with Dr. Rao?',
+        'Is anyone free to see me this week?',
+        'What times can I get with a pediatrician on Friday?',
+    ],
+    'doctor_lookup': [
+        'Which doctors do you have?',
+        'Who are your neurologists?',
+        'List the orthopedic specialists',
+        'Is there a doctor called Mehta?',
+        'What does Dr. Shah specialize in?',
+        'Do you have a skin specialist?',
+    ],
+    'my_appointments': [
+        'When is my next appointment?',
+        'Do I have any appointments coming up?',
+        'Show my bookings',
+        'What time is my visit with the doctor?',
+        'Remind me of my upcoming appointment',
+    ],
+    'info': [
+        'What are the visiting hours?',
+        'Which departments do you have?',
+        'How do I book an appointment?',
+        'Is there an emergency ward?',
+        'What is the phone number for the cardiology department?',
+        'Where is the hospital located?',
+        'Do you accept health insurance?',
+        'How do I cancel or reschedule my appointment?',
+        'What should I bring to my first visit?',
+        'Is there parking for patients?',
+        'How much is the consultation fee?',
+    ],
+}
+# Least cosine similarity to the best centroid for the embedding fallback to route at all
+INTENT_THRESHOLD = 0.5
+
+PROVIDER = r'\b(slots?|appointments?|doctors?|dr|specialists?|anyone|someone|\w+(ologists?|icians?|iatrists?))\b'
+AVAILABLE = r'\b(available|availability|free|openings?|vacan(t|cy|cies)|earliest)\b'
+SPECIALISTS = r'(doctors?|specialists?|\w+(ologists?|icians?|iatrists?))\b'
+BOOKINGS = r'(appointments?|bookings?|visits?)\b'
+# Each rule is a list of patterns that must all match; checked in order, the first match wins.
+# They only take the unmistakable phrasings: "what do I bring to my visit?", "free parking for
+# patients with appointments?" or "the fee for a cardiologist?" are for the knowledge base.
+KEYWORD_RULES = [
+    ('my_appointments', [re.compile(
+        r'\bmy\s+(next|upcoming|future|scheduled)\s+' + BOOKINGS +
+        r"|\b(show|list|see|view)\s+(me\s+)?(all\s+)?my\s+" + BOOKINGS +
+        r"|\b(when|what time|what day|what date)\s+(is|are|'s)\s+my\s+(next\s+)?" + BOOKINGS +
+        r'|\bdo i have\s+(any\s+)?' + BOOKINGS + r'|\bwhat\s+(appointments?|bookings?)\s+do i have\b')]),
+    # A provider/slot word and an availability word, about a day or time or asking for slots:
+    # "is parking free today?" and "free parking for patients with appointments?" are not ours
+    ('availability', [
+        re.compile(AVAILABLE + '.*' + PROVIDER + '|' + PROVIDER + '.*' + AVAILABLE),
+        re.compile(r'\b(slots?|openings?|earliest|today|tonight|tomorrow|week|weekend|morning|afternoon|evening'
+                   r'|(mon|tues|wednes|thurs|fri|satur|sun)days?|\d{4}-\d{2}-\d{2}|\d{1,2}(:\d{2})?\s*[ap]m)\b'),
+    ]),
+    ('doctor_lookup', [re.compile(
+        r'\b(which|what|who are|list|show( me)?|any|have (a|an|any)|is there (a|an)|are there( any)?)'
+        r'(\s+(your|the|all|of))*\s+(\w+\s+)?' + SPECIALISTS +
+        r'|\bdr\b\.?\s+\w+|\bdoctor\s+(called|named)\s+\w+')]),
+]
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+# "Dr. Rao", "doctor called Rao", "doctor named Rao"; not "the doctor called me"
+DOCTOR_NAME = re.compile(r'\b(?:dr\.?|doctor\s+(?:called|named))\s+(?!(?:me|us|you|him|her|them)\b)([a-z][\w-]*)',
+                         re.IGNORECASE)
+# How far ahead availability looks when the question names no day
+DEFAULT_DAYS = 7
+MAX_DOCTORS_LISTED = 5
+MAX_TIMES_PER_DOCTOR = 3
+
+
+def clinic_now():
+    return timezone.localtime(timezone=ZoneInfo(settings.APPOINTMENT_TIME_ZONE))
+
+
+def date_range(text, today):
+    """(first, last) day a question asks about, or None if it names no day."""
+    words = set(re.findall(r'[a-z]+', text))
+    match = ISO_DATE.search(text)
+    if match:
+        try:
+            day = today.replace(*map(int, match.groups()))
+        except ValueError:
+            return None
+        return day, day
+    if 'day after tomorrow' in text:
+        return today + timedelta(days=2), today + timedelta(days=2)
+    if 'tomorrow' in words:
+        return today + timedelta(days=1), today + timedelta(days=1)
+    if 'today' in words or 'tonight' in words:
+        return today, today
+    for number, name in enumerate(WEEKDAYS):
+        if name in words or f'{name}s' in words:
+            day = today + timedelta(days=(number - today.weekday()) % 7)
+            return day, day
+    if 'week' in words:
+        start = today + timedelta(days=7) if 'next' in words else today
+        return start, start + timedelta(days=6 - start.weekday())
+    return None
+
+
+def find_specialization(text):
+    """The Specialization a question mentions ("cardiologists", "dermatology"), or None."""
+    names = {name.casefold(): (pk, name) for pk, name in Specialization.objects.values_list('id', 'name')}
+    words = re.findall(r'[a-z]+', text)
+    # Longest phrases first, so "general practitioner" wins over "general"
+    for size in (3, 2, 1):
+        for i in range(len(words) - size + 1):
+            phrase = ' '.join(words[i:i + size])
+            for candidate in (phrase, phrase[:-1] if phrase.endswith('s') else None):
+                found = candidate and names.get(normalize(candidate).casefold())
+                if found:
+                    return found
+    return None
+
+
+def _when(first, last, today):
+    if first == last:
+        if first == today:
+            return 'today'
+        if first == today + timedelta(days=1):
+            return 'tomorrow'
+        return f'on {first:%A %d %B}'
+    return f'between {first:%d %B} and {last:%d %B}'
+
+
+def answer_availability(text, user):
+    now = clinic_now()
+    today = now.date()
+    first, last = date_range(text, today) or (today, today + timedelta(days=DEFAULT_DAYS - 1))
+    slots = AppointmentSlot.objects.filter(is_booked=False, date__range=(max(first, today), last))
+    specialization = find_specialization(text)
+    if specialization:
+        slots = slots.filter(doctor__specialization_id=specialization[0])
+    doctor_name = DOCTOR_NAME.search(text)
+    if doctor_name:
+        slots = slots.filter(doctor__name__icontains=doctor_name.group(1))
+    if first <= today:
+        slots = slots.exclude(date=today, start_time__lte=now.time())
+
+    what = f'{specialization[1]} ' if specialization else ''
+    who = f' with Dr. {doctor_name.group(1).title()}' if doctor_name else ''
+    when = _when(first, last, today)
+    by_doctor = {}
+    rows = slots.order_by('date', 'start_time').values_list('doctor__name', 'date', 'start_time')
+    # Enough rows to fill the listing even if one doctor has many slots
+    for name, day, start in rows[:MAX_DOCTORS_LISTED * 20]:
+        times = by_doctor.setdefault(name, [])
+        if len(by_doctor) > MAX_DOCTORS_LISTED:
+            del by_doctor[name]
+            break
+        if len(times) < MAX_TIMES_PER_DOCTOR:
+            times.append(f'{start:%H:%M}' if first == last else f'{day:%a %d %b} {start:%H:%M}')
+    if not by_doctor:
+        return f'There are no open {what}slots{who} {when}.'
+    lines = [f'- Dr. {name}: {", ".join(times)}' for name, times in by_doctor.items()]
+    return f'Open {what}slots{who} {when}:\n' + '\n'.join(lines) + '\nYou can book them under "Book Appointment".'
+
+
+def answer_doctor_lookup(text, user):
+    specialization = find_specialization(text)
+    doctor_name = DOCTOR_NAME.search(text)
+    if not specialization and not doctor_name:
+        listed = [f'{row["name"]} ({row["doctors"]})' for row in facets() if row['doctors']]
+        if not listed:
+            return 'No doctors are registered yet.'
+        return 'Our doctors by specialization: ' + ', '.join(listed) + '.'
+
+    doctors = Doctor.objects.order_by('name')
+    if specialization:
+        doctors = doctors.filter(specialization_id=specialization[0])
+    if doctor_name:
+        doctors = doctors.filter(name__icontains=doctor_name.group(1))
+    rows = list(doctors.values_list('name', 'specialization__name')[:MAX_DOCTORS_LISTED + 1])
+    if not rows:
+        return f'We have no {specialization[1]} doctors.' if specialization else \
+            f'We have no doctor called {doctor_name.group(1).title()}.'
+    more = ' and others' if len(rows) > MAX_DOCTORS_LISTED else ''
+    listed = ', '.join(f'Dr. {name}' + ('' if specialization else f' ({field or "General"})')
+                       for name, field in rows[:MAX_DOCTORS_LISTED])
+    return (f'Our {specialization[1]} doctors: ' if specialization else 'Matching doctors: ') + listed + more + '.'
+
+
+def answer_my_appointments(text, user):
+    if not user or not user.is_authenticated or user.role != 'patient':
+        return 'Please log in as a patient to see your appointments.'
+    upcoming = list(
+        Appointment.objects.filter(patient__user=user, status='Booked', starts_at__gte=timezone.now())
+        .order_by('starts_at')
+        .values_list('doctor__name', 'doctor__specialization__name', 'appointment_date', 'start_time')[:4]
+    )
+    if not upcoming:
+        return 'You have no upcoming appointments.'
+    name, field, day, start = upcoming[0]
+    reply = f'Your next appointment is with Dr. {name}' + (f' ({field})' if field else '') + \
+        f' on {day:%A %d %B} at {start:%H:%M}.'
+    if len(upcoming) > 1:
+        later = ', '.join(f'Dr. {name} on {day:%d %B} at {start:%H:%M}' for name, _, day, start in upcoming[1:])
+        reply += f' After that: {later}.'
+    return reply
+
+
+HANDLERS = {
+    'availability': answer_availability,
+    'doctor_lookup': answer_doctor_lookup,
+    'my_appointments': answer_my_appointments,
+}
+
+
+class IntentRouter:
+    """Answers data questions from the database; see the module docstring."""
+
+    def __init__(self, embed=None):
+        # embed(texts) -> L2-normalized float32 matrix; the chatbot's model, loaded on first use
+        self._embed = embed
+        self._intents = list(INTENT_EXAMPLES)
+        self._centroids = None
+
+    def _centroid_matrix(self):
+        if self._centroids is None:
+            rows = []
+            for intent in self._intents:
+                centroid = self._embed(INTENT_EXAMPLES[intent]).mean(axis=0)
+                rows.append(centroid / np.linalg.norm(centroid))
+            self._centroids = np.vstack(rows).astype('float32')
+        return self._centroids
+
+    def classify(self, text):
+        """An intent in HANDLERS, or None (including for hospital-information questions)."""
+        text = ' '.join(text.casefold().split())
+        matched = next((intent for intent, patterns in KEYWORD_RULES
+                        if all(pattern.search(text) for pattern in patterns)), None)
+        if self._embed is None:
+            return matched
+        try:
+            scores = self._centroid_matrix() @ self._embed([text])[0]
+        except Exception:
+            logger.exception('Intent embedding failed; not routing this question')
+            return matched
+        best = int(np.argmax(scores))
+        intent = self._intents[best]
+        if matched:
+            # A keyword hit still goes to the LLM if it reads most like a hospital-information question
+            return None if intent == 'info' else matched
+        return intent if intent in HANDLERS and scores[best] >= INTENT_THRESHOLD else None
+
+    def route(self, text, user=None):
+        """{'intent', 'response'} answered from the database, or None to fall through to RAG."""
+        intent = self.classify(text)
+        if intent is None:
+            return None
+        return {'intent': intent, 'response': HANDLERS[intent](' '.join(text.casefold().split()), user)}
@@ -0,0 +1,206 @@
+"""
+Named knowledge bases for the RAG chatbot, loaded on demand into an LRU.
+
+One deployment answers for several hospitals, each with its own knowledge
+base, picked per chat request by name:
+
+- ``default`` is the original data/hospital.txt, with faiss.index and
+  chunks.pkl next to it;
+- any other name is a directory data/knowledge_bases/<name>/ holding a
+  hospital.txt and, once built, its faiss.index and chunks.pkl.
+
+A knowledge base is read (or built and persisted, the first time) when a
+request first needs it and kept in a ``KnowledgeBaseCache``. Once the
+estimated size of the loaded ones passes ``CHATBOT_KNOWLEDGE_BASE_CACHE_MB``,
+the least recently used are dropped. All of them are embedded with the
+chatbot's one SentenceTransformer, so another hospital costs its index, not
+another model. The cache counts hits, misses, evictions and load times per
+knowledge base; the chatbot's health check reports them.
+"""
+import logging
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT = 'default'
+SUBDIRECTORY = 'knowledge_bases'
+KNOWLEDGE_FILE = 'hospital.txt'
+INDEX_FILE = 'faiss.index'
+STORE_FILE = 'chunks.pkl'
+# Also keeps names from walking out of the data directory
+NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_text(text, chunk_size=700, overlap=120):
+    words = text.split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append(' '.join(words[i:i + chunk_size]))
+        i += chunk_size - overlap
+    return [c.strip() for c in chunks if c and c.strip()]
+
+
+class KnowledgeBase:
+    """One hospital's chunks and FAISS index."""
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.knowledge_file = directory / KNOWLEDGE_FILE
+        self.index_file = directory / INDEX_FILE
+        self.store_file = directory / STORE_FILE
+        self.index = None
+        self.chunks = []
+        self.nbytes = 0
+
+    def load(self, faiss, embed):
+        """Reads the persisted index, or builds it from hospital.txt; returns self."""
+        if self.index_file.exists() and self.store_file.exists():
+            try:
+                self.index = faiss.read_index(str(self.index_file))
+                with open(self.store_file, 'rb') as f:
+                    self.chunks = pickle.load(f)
+            except Exception:
+                logger.warning("Failed to load index for knowledge base '%s', rebuilding", self.name, exc_info=True)
+                self.build(faiss, embed)
+        else:
+            self.build(faiss, embed)
+        # A flat index holds one float32 vector per chunk
+        self.nbytes = self.index.ntotal * self.index.d * 4 + sum(len(chunk.encode()) for chunk in self.chunks)
+        return self
+
+    def build(self, faiss, embed):
+        if not self.knowledge_file.exists():
+            raise FileNotFoundError(
+                f'Knowledge file not found: {self.knowledge_file}. Please add hospital.txt with the hospital information.'
+            )
+        text = self.knowledge_file.read_text(encoding='utf-8')
+        if not text.strip():
+            raise ValueError(f'Knowledge file is empty: {self.knowledge_file}. Please add hospital information.')
+        chunks = chunk_text(text) or [text]
+
+        vectors = embed(chunks)
+        index = faiss.IndexFlatIP(vectors.shape[1])  # cosine via normalized vectors => inner product
+        index.add(vectors)
+        self.index, self.chunks = index, chunks
+
+        faiss.write_index(index, str(self.index_file))
+        with open(self.store_file, 'wb') as f:
+            pickle.dump(chunks, f)
+
+    def search(self, vectors, k):
+        """[(chunk, score)] nearest to the first of ``vectors``."""
+        scores, idxs = self.index.search(vectors, k)
+        return [(self.chunks[idx], float(score)) for score, idx in zip(scores[0], idxs[0])
+                if 0 <= idx < len(self.chunks)]
+
+
+def find(data_dir, name):
+    """The (unloaded) KnowledgeBase called ``name`` under ``data_dir``, or None if there is none."""
+    if not isinstance(name, str) or not NAME.match(name):
+        return None
+    directory = Path(data_dir) if name == DEFAULT else Path(data_dir) / SUBDIRECTORY / name
+    if not (directory / KNOWLEDGE_FILE).exists() and not (directory / INDEX_FILE).exists():
+        return None
+    return KnowledgeBase(name, directory)
+
+
+def names(data_dir):
+    """Names of the knowledge bases under ``data_dir``."""
+    found = [DEFAULT] if find(data_dir, DEFAULT) else []
+    subdirectory = Path(data_dir) / SUBDIRECTORY
+    if subdirectory.is_dir():
+        found += sorted(path.name for path in subdirectory.iterdir()
+                        if path.name != DEFAULT and find(data_dir, path.name))
+    return found
+
+
+class KnowledgeBaseCache:
+    """Loaded knowledge bases, least recently used evicted first once they pass ``max_bytes`` together."""
+
+    def __init__(self, load, max_bytes):
+        # load(name) -> a loaded KnowledgeBase (anything with ``nbytes``)
+        self._load = load
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _counters(self, name):
+        return self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'evictions': 0, 'errors': 0,
+                                             'load_ms_total': 0.0, 'load_ms_last': None})
+
+    def _hit(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                self._counters(name)['hits'] += 1
+            return entry
+
+    def get(self, name):
+        entry = self._hit(name)
+        if entry is not None:
+            return entry
+        with self._lock:
+            loading = self._loading.setdefault(name, threading.Lock())
+        # One load per name at a time: requests arriving meanwhile wait for it and then hit
+        with loading:
+            entry = self._hit(name)
+            if entry is not None:
+                return entry
+            started = time.perf_counter()
+            try:
+                entry = self._load(name)
+            except Exception:
+                with self._lock:
+                    self._counters(name)['errors'] += 1
+                raise
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                counters = self._counters(name)
+                counters['misses'] += 1
+                counters['load_ms_total'] += elapsed_ms
+                counters['load_ms_last'] = round(elapsed_ms, 1)
+                self._entries[name] = entry
+                self._evict(keep=name)
+        return entry
+
+    def _evict(self, keep):
+        # The one just loaded stays even if it alone exceeds the cap
+        while len(self._entries) > 1 and sum(e.nbytes for e in self._entries.values()) > self.max_bytes:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            del self._entries[oldest]
+            self._counters(oldest)['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            per_base = {}
+            for name, counters in sorted(self._stats.items()):
+                lookups = counters['hits'] + counters['misses']
+                entry = self._entries.get(name)
+                per_base[name] = {
+                    'loaded': entry is not None,
+                    'bytes': entry.nbytes if entry is not None else 0,
+                    'hits': counters['hits'],
+                    'misses': counters['misses'],
+                    'hit_rate': round(counters['hits'] / lookups, 3) if lookups else None,
+                    'evictions': counters['evictions'],
+                    'errors': counters['errors'],
+                    'load_ms_last': counters['load_ms_last'],
+                    'load_ms_mean': round(counters['load_ms_total'] / counters['misses'], 1)
+                    if counters['misses'] else None,
+                }
+            return {
+                'bytes': sum(e.nbytes for e in self._entries.values()),
+                'max_bytes': self.max_bytes,
+                'knowledge_bases': per_base,
+            }
@@ -0,0 +1,254 @@
+"""
+HTTP load-test scenarios for a running server (see the ``seed_loadtest`` and
+``loadtest`` management commands).
+
+Each scenario is one iteration of something a real client does. Worker
+threads repeat it against ``base_url`` for a fixed duration, each thread on
+its own keep-alive connection and logged in as its own seeded account, and
+time only the requests named in ``timed()``. Untimed requests (e.g.
+cancelling the appointment a ``book`` iteration just made, so the slot pool
+never runs dry) keep the data set steady between runs.
+
+Results are plain dicts ready for ``json.dump``; ``compare()`` diffs two of
+them and reports the scenarios that got slower or less reliable.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+PERCENTILES = (50, 90, 95, 99)
+
+CHAT_QUESTIONS = [
+    'What are the visiting hours?',
+    'Which departments do you have?',
+    'How do I book an appointment?',
+    'Is there an emergency ward?',
+    'What is the phone number for the cardiology department?',
+]
+
+
+class HttpClient:
+    """One keep-alive connection plus the current bearer token."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self._prefix = parts.path.rstrip('/')
+        self.token = None
+
+    def request(self, method, path, payload=None):
+        headers = {'Accept': 'application/json'}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        try:
+            self._connection.request(method, self._prefix + path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request; the caller sees status 0
+            self._connection.close()
+            return 0, None
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        self._connection.close()
+
+
+class Recorder:
+    """Per-thread latencies and status counts, keyed by request name."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def timed(self, name, client, method, path, payload=None, expect=(200,)):
+        started = time.perf_counter()
+        status, data = client.request(method, path, payload)
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        counts = self.statuses.setdefault(name, {'ok': 0, 'rejected': 0, 'errors': 0})
+        if status in expect:
+            counts['ok'] += 1
+        elif 400 <= status < 500:
+            # e.g. another worker booked the slot first; expected under contention
+            counts['rejected'] += 1
+        else:
+            counts['errors'] += 1
+        return status, data
+
+
+def login(client, account, recorder=None):
+    payload = {'username': account['username'], 'password': account['password']}
+    if recorder is None:
+        status, data = client.request('POST', '/api/login/', payload)
+    else:
+        status, data = recorder.timed('login', client, 'POST', '/api/login/', payload)
+    client.token = data.get('access_token') if status == 200 and data else None
+    return client.token is not None
+
+
+# ------------------------------ Scenarios ------------------------------
+# A scenario is (role, iteration); iteration(client, recorder, context, rng).
+
+def browse_slots(client, recorder, context, rng):
+    recorder.timed('slots', client, 'GET', '/api/slots/')
+
+
+def book(client, recorder, context, rng):
+    status, data = recorder.timed('book', client, 'POST', '/api/appointments/book/',
+                                  {'slot_id': rng.choice(context['slot_ids'])}, expect=(201,))
+    if status == 201:
+        client.request('POST', f"/api/appointments/{data['appointment_id']}/cancel/")
+
+
+def cancel(client, recorder, context, rng):
+    # Cancel only the appointment just booked: listing the patient's
+    # appointments would scan every row earlier iterations canceled.
+    status, data = client.request('POST', '/api/appointments/book/', {'slot_id': rng.choice(context['slot_ids'])})
+    if status != 201:
+        return
+    recorder.timed('cancel', client, 'POST', f"/api/appointments/{data['appointment_id']}/cancel/")
+
+
+def login_storm(client, recorder, context, rng):
+    login(client, context['account'], recorder)
+
+
+def doctor_dashboard(client, recorder, context, rng):
+    recorder.timed('doctor_slots', client, 'GET', '/api/doctor/slots/')
+    recorder.timed('doctor_appointments', client, 'GET', '/api/doctor/appointments/')
+    recorder.timed('doctor_status', client, 'GET', '/api/doctor/appointments/status/')
+
+
+def chatbot(client, recorder, context, rng):
+    payload = {'query': rng.choice(CHAT_QUESTIONS), 'session_id': context['session_id']}
+    recorder.timed('chat', client, 'POST', '/api/bot/chat/', payload)
+
+
+SCENARIOS = {
+    'browse_slots': ('patient', browse_slots),
+    'book': ('patient', book),
+    'cancel': ('patient', cancel),
+    'login_storm': ('patient', login_storm),
+    'doctor_dashboard': ('doctor', doctor_dashboard),
+    'chatbot': (None, chatbot),
+}
+
+
+# ------------------------------ Runner ------------------------------
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        **statuses,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'error_rate': round(statuses['errors'] / len(latencies), 4) if latencies else 0,
+        'latency_ms': {
+            f'p{q}': round(percentile(latencies, q) * 1000, 2) if latencies else None for q in PERCENTILES
+        },
+    }
+    if latencies:
+        summary['latency_ms']['mean'] = round(sum(latencies) / len(latencies) * 1000, 2)
+        summary['latency_ms']['max'] = round(latencies[-1] * 1000, 2)
+    return summary
+
+
+def run_scenario(name, base_url, accounts, concurrency, duration, warmup=0, seed=0):
+    """Run one scenario with ``concurrency`` threads for ``duration`` seconds."""
+    role, iteration = SCENARIOS[name]
+    pool = accounts[f'{role}s'] if role else accounts['patients']
+    if not pool:
+        raise ValueError(f'Scenario {name!r} needs seeded {role} accounts')
+    recorders = []
+    lock = threading.Lock()
+    start_at = time.perf_counter() + warmup
+    deadline = start_at + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = HttpClient(base_url)
+        account = {**pool[index % len(pool)], 'password': accounts['password']}
+        context = {'account': account, 'slot_ids': accounts['slot_ids'],
+                   'session_id': f'loadtest-{seed}-{index}'}
+        if role and name != 'login_storm':
+            login(client, account)
+        discard, recorder = Recorder(), Recorder()
+        try:
+            while time.perf_counter() < start_at:
+                iteration(client, discard, context, rng)
+            while time.perf_counter() < deadline:
+                iteration(client, recorder, context, rng)
+        finally:
+            client.close()
+        with lock:
+            recorders.append(recorder)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    requests = {}
+    for key in sorted({key for recorder in recorders for key in recorder.latencies}):
+        latencies = [value for recorder in recorders for value in recorder.latencies.get(key, [])]
+        statuses = {'ok': 0, 'rejected': 0, 'errors': 0}
+        for recorder in recorders:
+            for status, count in recorder.statuses.get(key, {}).items():
+                statuses[status] += count
+        requests[key] = summarize(latencies, statuses, duration)
+    return {'concurrency': concurrency, 'duration_s': duration, 'requests': requests}
+
+
+def compare(baseline, current, latency_threshold=0.10, throughput_threshold=0.10, error_threshold=0.01):
+    """
+    Compare two ``loadtest`` result documents request by request. A request
+    regresses when its p95 latency grows, or its throughput drops, by more
+    than the given fraction, or its error rate rises by more than
+    ``error_threshold`` (absolute).
+    """
+    rows, regressions = [], []
+    for scenario, result in current['scenarios'].items():
+        before_requests = baseline['scenarios'].get(scenario, {}).get('requests', {})
+        for key, after in result['requests'].items():
+            before = before_requests.get(key)
+            if before is None:
+                continue
+            row = {
+                'scenario': scenario,
+                'request': key,
+                'p95_ms': [before['latency_ms']['p95'], after['latency_ms']['p95']],
+                'rps': [before['rps'], after['rps']],
+                'error_rate': [before['error_rate'], after['error_rate']],
+                'flags': [],
+            }
+            if before['latency_ms']['p95'] and after['latency_ms']['p95'] is not None and \
+                    after['latency_ms']['p95'] > before['latency_ms']['p95'] * (1 + latency_threshold):
+                row['flags'].append('latency')
+            if before['rps'] and after['rps'] < before['rps'] * (1 - throughput_threshold):
+                row['flags'].append('throughput')
+            if after['error_rate'] > before['error_rate'] + error_threshold:
+                row['flags'].append('errors')
+            rows.append(row)
+            if row['flags']:
+                regressions.append(row)
+    return {'compared': rows, 'regressions': regressions}
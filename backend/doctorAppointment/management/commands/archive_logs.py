@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from doctorAppointment.retention import DEFAULT_BATCH_SIZE, RETENTION_POLICIES, archive_before, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Move Log and LoginInfo rows past their retention period into gzipped NDJSON files '
+            'and delete them in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=sorted(RETENTION_POLICIES), action='append',
+                            help='Only archive this table (repeatable; default: all).')
+        parser.add_argument('--days', type=int, default=None,
+                            help='Keep this many days instead of the configured retention.')
+        parser.add_argument('--dir', default=None, help='Archive directory (default: RETENTION_ARCHIVE_DIR).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived.')
+
+    def handle(self, *args, **options):
+        for name in options['table'] or sorted(RETENTION_POLICIES):
+            cutoff = retention_cutoff(name, options['days'])
+            result = archive_before(name, cutoff, directory=options['dir'], batch_size=options['batch_size'],
+                                    dry_run=options['dry_run'])
+            verb = 'Would archive' if options['dry_run'] else 'Archived'
+            message = f"{verb} {result['archived']} {name} rows older than {cutoff:%Y-%m-%d %H:%M}"
+            if result['dropped_partitions']:
+                message += f" (dropped partitions {', '.join(result['dropped_partitions'])})"
+            if result['path']:
+                message += f" to {result['path']}"
+            self.stdout.write(self.style.SUCCESS(message + '.'))
@@ -0,0 +1,151 @@
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.celery import app
+from doctorAppointment.models import Appointment, AppointmentSlot, Doctor, EmailNotification, Patient, User
+from doctorAppointment.specializations import resolve
+
+
+class Command(BaseCommand):
+    help = ('Concurrent patients book overlapping sets of slots from a small shared pool, either '
+            'through POST /api/appointments/book/batch/ or as N single bookings, then cancel what '
+            'they got. Reports throughput, latency, deadlocks and partial bookings. Creates bench '
+            'accounts and deletes them afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--pool', type=int, default=40, help='Slots shared by all clients.')
+        parser.add_argument('--batch-size', type=int, default=4)
+        parser.add_argument('--mode', choices=['batch', 'single', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'],
+                                   EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                tokens, patient_ids, slot_ids = self._seed(prefix, options)
+                modes = ['batch', 'single'] if options['mode'] == 'both' else [options['mode']]
+                for mode in modes:
+                    results[mode] = self._run(mode, tokens, patient_ids, slot_ids, options)
+        finally:
+            app.conf.task_always_eager = eager
+            EmailNotification.objects.filter(to_email__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _seed(self, prefix, options):
+        doctors = []
+        general = resolve('General')
+        for i in range(4):
+            user = User.objects.create(username=f'{prefix}-d{i}', role='doctor', password='!')
+            doctors.append(Doctor.objects.create(user=user, name=f'Bench {i}', specialization=general))
+        # Every slot at a distinct time, so a batch never overlaps itself
+        slots = [
+            AppointmentSlot.objects.create(
+                doctor=doctors[i % len(doctors)], date=date(2099, 1, 1) + timedelta(days=i // 32),
+                start_time=f'{8 + i % 32 // 4:02}:{i % 4 * 15:02}', end_time=f'{8 + i % 32 // 4:02}:{i % 4 * 15 + 14:02}',
+            )
+            for i in range(options['pool'])
+        ]
+        tokens, patient_ids = [], []
+        for i in range(options['clients']):
+            user = User.objects.create(username=f'{prefix}-p{i}', email=f'{prefix}-p{i}@example.com',
+                                       role='patient', password='!')
+            patient_ids.append(Patient.objects.create(user=user, name=f'Bench {i}', phone_number='5550100').pk)
+            tokens.append(str(RefreshToken.for_user(user).access_token))
+        return tokens, patient_ids, [slot.pk for slot in slots]
+
+    def _run(self, mode, tokens, patient_ids, slot_ids, options):
+        lock = threading.Lock()
+        totals = {'attempts': 0, 'committed': 0, 'rejected': 0, 'partial': 0, 'errors': 0, 'deadlocks': 0,
+                  'appointments_booked': 0}
+        latencies = []
+        first_id = (Appointment.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+        deadline = time.perf_counter() + options['seconds']
+
+        def client_loop(index):
+            rng = random.Random(index)
+            client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {tokens[index]}')
+            local = dict.fromkeys(totals, 0)
+            local_latencies = []
+
+            def failed(response):
+                if response.status_code >= 500:
+                    local['errors'] += 1
+                    error = str(response.exc_info[1]) if getattr(response, 'exc_info', None) else ''
+                    local['deadlocks'] += 'deadlock' in error.lower()
+                return response.status_code >= 300
+
+            try:
+                while time.perf_counter() < deadline:
+                    batch = rng.sample(slot_ids, options['batch_size'])
+                    local['attempts'] += 1
+                    started = time.perf_counter()
+                    if mode == 'batch':
+                        response = client.post('/api/appointments/book/batch/', {'slot_ids': batch},
+                                               content_type='application/json')
+                        booked = 0 if failed(response) else len(response.json()['appointment_ids'])
+                    else:
+                        booked = sum(
+                            not failed(client.post('/api/appointments/book/', {'slot_id': slot_id},
+                                                   content_type='application/json'))
+                            for slot_id in batch
+                        )
+                    local_latencies.append(time.perf_counter() - started)
+                    local['appointments_booked'] += booked
+                    if booked == len(batch):
+                        local['committed'] += 1
+                    elif booked:
+                        local['partial'] += 1
+                    else:
+                        local['rejected'] += 1
+                    # Give the slots back so the pool stays contended
+                    if booked:
+                        response = client.get('/api/patient/appointments/')
+                        rows = response.json() if response.status_code == 200 else []
+                        for row in rows:
+                            if row['status'] == 'Booked':
+                                client.post(f'/api/appointments/{row["id"]}/cancel/')
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    totals[key] += value
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(len(tokens))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        # Every appointment row must belong to a reported booking: no hidden partial batches
+        created = Appointment.objects.filter(patient_id__in=patient_ids, id__gt=first_id).count()
+        latencies.sort()
+        return {
+            'clients': len(tokens),
+            'pool': len(slot_ids),
+            'batch_size': options['batch_size'],
+            'elapsed_s': round(elapsed, 2),
+            'attempts_per_s': round(totals['attempts'] / elapsed, 1),
+            'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            'latency_ms_p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            **totals,
+            'appointment_rows_created': created,
+            'consistent': created == totals['appointments_booked'],
+        }
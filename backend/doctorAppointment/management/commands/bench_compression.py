@@ -0,0 +1,93 @@
+import gzip
+import json
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from doctorAppointment.compression import brotli, compress_bytes
+from doctorAppointment.models import User
+
+ENDPOINTS = ['/api/slots/', '/api/doctors/', '/api/admin/doctors/', '/api/admin/patients/',
+             '/api/admin/appointments/?page_size=200']
+ENCODINGS = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+# What the browser must fetch before the app can render: scripts and stylesheets linked from index.html
+CRITICAL_ASSET = re.compile(r'<(?:script|link)[^>]+(?:src|href)="(/assets/[^"]+\.(?:js|css))"')
+
+
+class Command(BaseCommand):
+    help = ('Measure response bytes and time with and without compression for the large API lists '
+            '(against the data already in the database), the size of the built frontend\'s critical '
+            'path as served (raw, .gz, .br), and the transfer time both imply on a given link.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--mbps', type=float, default=1.6,
+                            help='Link bandwidth for the transfer-time model (default: Lighthouse slow 4G).')
+        parser.add_argument('--rtt-ms', type=float, default=150)
+
+    def handle(self, *args, **options):
+        result = {'encodings': ENCODINGS, 'api': self._api(options)}
+        result['frontend'] = self._frontend(options)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _transfer_ms(self, size, options, round_trips=1):
+        return round(round_trips * options['rtt_ms'] + size * 8 / (options['mbps'] * 1000), 1)
+
+    def _api(self, options):
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            admin = User.objects.create(username=f'bench-{uuid.uuid4().hex[:8]}', role='admin', password='!')
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+            result = {}
+            for url in ENDPOINTS:
+                row = {}
+                for encoding in ENCODINGS:
+                    timings = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                        body = b''.join(response.streaming_content) if response.streaming else response.content
+                        timings.append(time.perf_counter() - started)
+                    row[encoding] = {
+                        'status': response.status_code,
+                        'bytes': len(body),
+                        'request_ms': round(min(timings) * 1000, 2),
+                        'transfer_ms': self._transfer_ms(len(body), options),
+                    }
+                result[url] = row
+            transaction.set_rollback(True)
+        return result
+
+    def _frontend(self, options):
+        dist = settings.FRONTEND_DIST
+        index = dist / 'index.html'
+        if not index.is_file():
+            return {'error': f'{index} not found; build the frontend first (see build.sh).'}
+        html = index.read_text()
+        files = [index] + [dist / path.lstrip('/') for path in CRITICAL_ASSET.findall(html)]
+        sizes = {'identity': 0, 'gzip': 0, 'br': 0}
+        for path in files:
+            data = path.read_bytes()
+            sizes['identity'] += len(data)
+            # What WhiteNoise serves: the precompressed sibling when build.sh wrote one
+            for encoding, suffix, fallback in [('gzip', '.gz', gzip.compress),
+                                               ('br', '.br', lambda data: compress_bytes(data, 'br'))]:
+                variant = path.with_name(path.name + suffix)
+                if variant.is_file():
+                    sizes[encoding] += min(len(data), variant.stat().st_size)
+                elif encoding == 'gzip' or brotli is not None:
+                    sizes[encoding] += len(fallback(data))
+        # First visit: connection + index.html, then the assets in parallel. Repeat visit: the
+        # immutable assets come from cache and index.html is revalidated (a 304, ~no bytes)
+        return {
+            'critical_files': [str(path.relative_to(dist)) for path in files],
+            'bytes': sizes,
+            'first_visit_ms': {encoding: self._transfer_ms(size, options, round_trips=3)
+                               for encoding, size in sizes.items()},
+            'repeat_visit_ms': self._transfer_ms(0, options, round_trips=2),
+        }
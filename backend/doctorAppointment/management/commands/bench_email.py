@@ -0,0 +1,117 @@
+import json
+import socketserver
+import threading
+import time
+
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from doctorAppointment.models import EmailNotification
+from doctorAppointment.notifications import deliver_due_emails
+
+
+class _SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend; counts delivered messages."""
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        # Stand-in for the TCP + TLS setup a real provider costs per connection
+        time.sleep(server.handshake_delay)
+        with server.lock:
+            server.connections += 1
+        self._reply('220 standin ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self._reply('250-standin')
+                self._reply('250 SIZE 10485760')
+            elif command.startswith(('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self._reply('250 OK')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self._reply('250 OK queued')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay=0.05):
+        super().__init__(('127.0.0.1', 0), _SMTPStandInHandler)
+        self.handshake_delay = handshake_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class Command(BaseCommand):
+    help = ('Compare one-connection-per-email delivery with the batched outbox against a local '
+            'SMTP stand-in. Outbox rows are created in a rolled-back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--handshake-ms', type=float, default=50.0,
+                            help='Simulated connection setup cost of the SMTP provider.')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        results = {}
+        with SMTPStandIn(options['handshake_ms'] / 1000) as server:
+            host, port = server.server_address
+
+            def connection():
+                return get_connection('django.core.mail.backends.smtp.EmailBackend', host=host, port=port,
+                                      use_tls=False, use_ssl=False, username='', password='', timeout=10)
+
+            started = time.perf_counter()
+            for i in range(options['messages']):
+                send_mail('Bench', 'Hello', 'bench@example.com', [f'user{i}@example.com'], connection=connection())
+            results['per_message_connection'] = self._summary(server, started, options['messages'])
+            server.connections = server.messages = 0
+
+            with transaction.atomic():
+                EmailNotification.objects.bulk_create([
+                    EmailNotification(kind='welcome', to_email=f'user{i}@example.com', subject='Bench', body='Hello')
+                    for i in range(options['messages'])
+                ])
+                started = time.perf_counter()
+                while deliver_due_emails(batch_size=options['batch_size'], connection=connection())['sent']:
+                    pass
+                results['batched_outbox'] = self._summary(server, started, options['messages'])
+                transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _summary(self, server, started, expected):
+        elapsed = time.perf_counter() - started
+        return {
+            'messages': server.messages,
+            'expected': expected,
+            'connections': server.connections,
+            'elapsed_s': round(elapsed, 3),
+            'messages_per_s': round(server.messages / elapsed, 1),
+        }
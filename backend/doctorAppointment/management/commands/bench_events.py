@@ -0,0 +1,89 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from doctorAppointment.events import (
+    ALL_CHANNEL, InProcessBroker, doctor_channel, format_sse, specialization_channel,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark live-update fan-out through the in-process broker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=50)
+        parser.add_argument('--doctors', type=int, default=100,
+                            help='Subscribers are spread over this many doctor channels.')
+        parser.add_argument('--all-share', type=float, default=0.1,
+                            help="Fraction of subscribers listening on the 'all' channel.")
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self._run(options))
+        self.stdout.write(json.dumps(result, indent=2))
+
+    async def _run(self, options):
+        broker = InProcessBroker(queue_size=options['events'] + 1)
+        n_all = int(options['subscribers'] * options['all_share'])
+        subscriptions = []
+        for i in range(options['subscribers']):
+            if i < n_all:
+                channels = [ALL_CHANNEL]
+            else:
+                channels = [doctor_channel(i % options['doctors'])]
+            subscriptions.append(broker.subscribe(channels))
+
+        # One consumer task per subscriber, like one SSE response per client
+        events_for = [
+            options['events'] if i < n_all else
+            sum(1 for n in range(options['events']) if n % options['doctors'] == i % options['doctors'])
+            for i in range(options['subscribers'])
+        ]
+        latencies = []
+
+        async def consume(subscription, count):
+            for _ in range(count):
+                frame = await subscription.get()
+                sent = json.loads(frame.split('data: ', 1)[1])['sent']
+                latencies.append(time.perf_counter() - sent)
+
+        consumers = [asyncio.create_task(consume(sub, count)) for sub, count in zip(subscriptions, events_for)]
+        await asyncio.sleep(0)
+
+        # Publish from a worker thread, as request threads do in production
+        publish_times = []
+
+        def publisher():
+            for n in range(options['events']):
+                doctor_id = n % options['doctors']
+                message = format_sse('slot.created', json.dumps({'type': 'slot.created', 'doctor_id': doctor_id,
+                                                                 'sent': time.perf_counter()}))
+                started = time.perf_counter()
+                broker.publish([ALL_CHANNEL, doctor_channel(doctor_id), specialization_channel(doctor_id % 10)], message)
+                publish_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        await asyncio.gather(*consumers)
+        elapsed = time.perf_counter() - started
+        thread.join()
+
+        for subscription in subscriptions:
+            subscription.close()
+
+        latencies.sort()
+        return {
+            'subscribers': options['subscribers'],
+            'events': options['events'],
+            'deliveries': len(latencies),
+            'elapsed_s': round(elapsed, 4),
+            'deliveries_per_s': round(len(latencies) / elapsed) if elapsed else None,
+            'publish_ms_mean': round(statistics.mean(publish_times) * 1000, 3),
+            'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            'latency_ms_p99': round(latencies[int(len(latencies) * 0.99)] * 1000, 3) if latencies else None,
+        }
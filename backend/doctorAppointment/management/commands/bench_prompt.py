@@ -0,0 +1,115 @@
+import json
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from doctorAppointment import chatbot
+from doctorAppointment.knowledge import chunk_text
+from doctorAppointment.loadtest import CHAT_QUESTIONS
+from doctorAppointment.prompting import ChatSession, _terms, build_messages, count_tokens
+
+FOLLOW_UPS = [
+    'And on weekends?',
+    'What was my first question?',
+    'Who should I call for that?',
+    'Is parking available there?',
+]
+# Stand-in reply when not calling the LLM: about as long as the model's usual answers
+CANNED_REPLY = ('Sunrise Multispeciality Hospital offers this service through the relevant department. '
+                'Please contact the OPD reception on +91 90000 33333 or the 24x7 helpline for details, '
+                'and bring previous reports and a valid ID to your visit. ') * 2
+
+
+def legacy_messages(query, chunks, history):
+    """The prompt RAGChatbot.generate sent before prompts were budgeted."""
+    system_prompt = (
+        "You are a hospital information assistant for a single specific hospital."
+        "\n- For factual questions about the hospital (services, hours, contacts, policies), rely ONLY on the provided 'Hospital knowledge base'."
+        "\n- If the required hospital fact is not present in the knowledge base, say: 'I can only answer questions about this hospital based on available information.'"
+        "\n- You may use the prior chat messages to maintain conversation context or to answer questions about the conversation itself (e.g., 'what was my first question?')."
+        "\n- Keep answers concise and accurate."
+    )
+    context_text = "\n\n".join([f"- {c}" for c in chunks]) if chunks else "(No hospital knowledge provided.)"
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": "Hospital knowledge base (authoritative for hospital facts; do NOT invent "
+                                      "facts beyond this):\n" + context_text},
+    ]
+    messages += [m for m in history[-12:]]
+    messages.append({"role": "user", "content": query})
+    return messages
+
+
+class Command(BaseCommand):
+    help = ('Replay a multi-turn chat and compare the input tokens (and, with --live, the Groq latency) of '
+            'the old prompt (two system prompts, every retrieved chunk, 12 history messages) with the '
+            'token-budgeted prompt. Uses the FAISS retriever when it loads, otherwise a word-overlap stand-in '
+            'over the same chunks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=12)
+        parser.add_argument('--live', action='store_true', help='Send both prompts to Groq (needs GROQ_API_KEY).')
+
+    def handle(self, *args, **options):
+        bot = chatbot._chatbot
+        if bot is not None:
+            retrieve, retriever = bot.retrieve, 'faiss'
+        else:
+            data_dir = chatbot._data_dir
+            text = (data_dir / 'hospital.txt').read_text(encoding='utf-8')
+            chunks = chunk_text(text)
+
+            def retrieve(query, k=5):
+                terms = _terms(query)
+                scored = [(chunk, len(terms & _terms(chunk)) / max(len(terms), 1)) for chunk in chunks]
+                return sorted(scored, key=lambda item: -item[1])[:k]
+            retriever = 'word-overlap stand-in'
+
+        client = None
+        if options['live']:
+            from groq import Groq
+            client = Groq(api_key=os.environ['GROQ_API_KEY'])
+
+        questions = CHAT_QUESTIONS + FOLLOW_UPS
+        session, history = ChatSession(), []
+        rows = []
+        for turn in range(options['turns']):
+            query = questions[turn % len(questions)]
+            retrieved = retrieve(query)
+            before = legacy_messages(query, [chunk for chunk, _ in retrieved], history)
+            started = time.perf_counter()
+            after, stats = build_messages(query, retrieved, session)
+            build_ms = (time.perf_counter() - started) * 1000
+            row = {
+                'turn': turn + 1,
+                'tokens_before': sum(count_tokens(m['content']) for m in before),
+                'tokens_after': stats['prompt_tokens'],
+                'build_ms': round(build_ms, 2),
+            }
+            reply = CANNED_REPLY
+            if client is not None:
+                for name, messages in (('before', before), ('after', after)):
+                    started = time.perf_counter()
+                    completion = client.chat.completions.create(model='llama-3.1-8b-instant', messages=messages,
+                                                                temperature=0.2, max_tokens=512, top_p=0.9)
+                    row[f'llm_ms_{name}'] = round((time.perf_counter() - started) * 1000)
+                    row[f'prompt_tokens_reported_{name}'] = completion.usage.prompt_tokens
+                reply = completion.choices[0].message.content.strip()
+            history += [{'role': 'user', 'content': query}, {'role': 'assistant', 'content': reply}]
+            session.add_turn(query, reply)
+            rows.append(row)
+
+        summary = {
+            'retriever': retriever,
+            'turns': len(rows),
+            'mean_tokens_before': round(statistics.mean(row['tokens_before'] for row in rows)),
+            'mean_tokens_after': round(statistics.mean(row['tokens_after'] for row in rows)),
+            'max_tokens_after': max(row['tokens_after'] for row in rows),
+            'mean_build_ms': round(statistics.mean(row['build_ms'] for row in rows), 2),
+        }
+        if client is not None:
+            for name in ('before', 'after'):
+                summary[f'mean_llm_ms_{name}'] = round(statistics.mean(row[f'llm_ms_{name}'] for row in rows))
+        self.stdout.write(json.dumps({'summary': summary, 'turns': rows}, indent=2))
@@ -0,0 +1,149 @@
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from doctorAppointment.models import Appointment, Doctor, EmailNotification, Patient, User
+from doctorAppointment.reminders import queue_reminders, sweep_reminders
+from doctorAppointment.specializations import resolve
+
+
+class Command(BaseCommand):
+    help = ('Simulate Celery beat running the reminder sweeper over a large synthetic calendar. '
+            'Everything runs in one transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=30, help='Calendar span the appointments are spread over.')
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--patients', type=int, default=2000)
+        parser.add_argument('--canceled', type=float, default=0.1, help='Share of canceled appointments.')
+        parser.add_argument('--hours', type=float, default=6, help='Simulated time the sweeper runs for.')
+        parser.add_argument('--interval-minutes', type=float, default=5)
+        parser.add_argument('--page-size', type=int, default=settings.REMINDER_PAGE_SIZE)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            start = self._seed(options)
+            seeded_s = time.perf_counter() - started
+            result = self._simulate(start, options)
+            result['seed_s'] = round(seeded_s, 3)
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _seed(self, options):
+        rng = random.Random(options['seed'])
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-d{i}', role='doctor', password='!') for i in range(options['doctors'])
+        ] + [
+            User(username=f'{prefix}-p{i}', role='patient', email=f'{prefix}-p{i}@example.com', password='!')
+            for i in range(options['patients'])
+        ])
+        if users[0].pk is None:
+            ids = dict(User.objects.filter(username__startswith=prefix).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        general = resolve('General')
+        doctors = Doctor.objects.bulk_create([
+            Doctor(user_id=user.pk, name=user.username, specialization=general)
+            for user in users[:options['doctors']]
+        ])
+        patients = Patient.objects.bulk_create([
+            Patient(user_id=user.pk, name=user.username, phone_number='5550100')
+            for user in users[options['doctors']:]
+        ])
+        if doctors[0].pk is None:
+            doctors = list(Doctor.objects.filter(user__username__startswith=prefix))
+            patients = list(Patient.objects.filter(user__username__startswith=prefix))
+
+        zone = ZoneInfo(settings.APPOINTMENT_TIME_ZONE)
+        start = timezone.now().replace(second=0, microsecond=0)
+        quarters = options['days'] * 24 * 4
+        appointments = []
+        # A patient's active appointments may not overlap (see overlaps.py)
+        taken = set()
+        while len(appointments) < options['appointments']:
+            quarter = rng.randrange(1, quarters)
+            patient_id = rng.choice(patients).pk
+            starts_at = start + timedelta(minutes=15 * quarter)
+            local = starts_at.astimezone(zone)
+            if (patient_id, quarter) in taken or (local + timedelta(minutes=15)).date() != local.date():
+                continue
+            taken.add((patient_id, quarter))
+            canceled = rng.random() < options['canceled']
+            appointments.append(Appointment(
+                doctor_id=rng.choice(doctors).pk,
+                patient_id=patient_id,
+                status='Canceled' if canceled else 'Booked',
+                appointment_date=local.date(),
+                start_time=local.time(),
+                end_time=(local + timedelta(minutes=15)).time(),
+                starts_at=starts_at,
+                canceled_at=start if canceled else None,
+            ))
+        Appointment.objects.bulk_create(appointments, batch_size=2000)
+        return start
+
+    def _simulate(self, start, options):
+        interval = timedelta(minutes=options['interval_minutes'])
+        sweeps = int(options['hours'] * 60 / options['interval_minutes']) + 1
+        durations, pages, dispatched = [], 0, 0
+        queued = skipped = queries = 0
+
+        for step in range(sweeps):
+            now = start + step * interval
+
+            def dispatch(lead, ids):
+                nonlocal queued, skipped
+                result = queue_reminders(lead, ids, now=now)
+                queued += result['queued']
+                skipped += result['skipped']
+
+            sweep_started = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                result = sweep_reminders(dispatch, now=now, page_size=options['page_size'])
+            durations.append(time.perf_counter() - sweep_started)
+            queries += len(captured)
+            for totals in result.values():
+                pages += totals['pages']
+                dispatched += totals['appointments']
+
+        # Running the last sweep again must not queue anything new
+        repeat = sweep_reminders(lambda lead, ids: None, now=now, page_size=options['page_size'])
+        duplicates = (
+            EmailNotification.objects.filter(kind='appointment_reminder')
+            .values('appointment_id', 'subject').annotate(n=Count('id')).filter(n__gt=1).count()
+        )
+        first_sweep = durations[0]
+
+        durations.sort()
+        return {
+            'appointments': options['appointments'],
+            'simulated_hours': options['hours'],
+            'sweeps': sweeps,
+            'pages_dispatched': pages,
+            'reminders_dispatched': dispatched,
+            'reminders_queued': queued,
+            'reminders_skipped': skipped,
+            'duplicate_reminders': duplicates,
+            'redispatched_on_repeat': sum(totals['appointments'] for totals in repeat.values()),
+            'queries_per_sweep': round(queries / sweeps, 1),
+            'sweep_ms_p50': round(durations[len(durations) // 2] * 1000, 2),
+            'sweep_ms_max': round(durations[-1] * 1000, 2),
+            # The first sweep picks up the whole 24h window at once
+            'first_sweep_ms': round(first_sweep * 1000, 2),
+            # A per-appointment ETA design would have scheduled this many tasks up front
+            'naive_eta_tasks': 2 * Appointment.objects.filter(status='Booked', starts_at__gt=start).count(),
+        }
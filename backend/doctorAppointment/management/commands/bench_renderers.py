@@ -0,0 +1,87 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from doctorAppointment.models import Doctor, User
+from doctorAppointment.projections import DOCTOR_ROWS
+from doctorAppointment.renderers import ORJSONRenderer
+from doctorAppointment.serializers import DoctorSerializer
+from doctorAppointment.specializations import resolve
+
+
+class Command(BaseCommand):
+    help = ('Compare DoctorSerializer + JSONRenderer with the values_list() projection + ORJSONRenderer '
+            'on a large doctor list. Rows are created in a rolled-back transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            admin = self._seed(options['rows'])
+            result = {'rows': options['rows'], 'repeat': options['repeat']}
+            result.update(self._stages(options['repeat']))
+            result.update(self._requests(admin, options['repeat']))
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _seed(self, rows):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{i}', first_name=f'Doctor {i}', email=f'{prefix}-{i}@example.com',
+                 role='doctor', password='!')
+            for i in range(rows)
+        ])
+        if users[0].pk is None:
+            ids = dict(User.objects.filter(username__startswith=prefix).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        general = resolve('General')
+        Doctor.objects.bulk_create([
+            Doctor(user_id=user.pk, name=user.first_name, specialization=general) for user in users
+        ])
+        return User.objects.create(username=f'{prefix}-admin', role='admin', password='!')
+
+    def _best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            value = func()
+            timings.append(time.perf_counter() - started)
+        return round(min(timings) * 1000, 2), value
+
+    def _stages(self, repeat):
+        queryset = Doctor.objects.select_related('user').all()
+        serializer_ms, serialized = self._best(lambda: DoctorSerializer(queryset.all(), many=True).data, repeat)
+        projection_ms, projected = self._best(lambda: DOCTOR_ROWS.rows(Doctor.objects.all()), repeat)
+        json_ms, json_body = self._best(lambda: JSONRenderer().render(serialized), repeat)
+        orjson_ms, orjson_body = self._best(lambda: ORJSONRenderer().render(projected), repeat)
+        return {
+            'serializer_ms': serializer_ms,
+            'projection_ms': projection_ms,
+            'json_renderer_ms': json_ms,
+            'orjson_renderer_ms': orjson_ms,
+            'identical_output': json.loads(json_body) == json.loads(orjson_body),
+            'response_bytes': len(orjson_body),
+        }
+
+    def _requests(self, admin, repeat):
+        token = str(RefreshToken.for_user(admin).access_token)
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        result = {}
+        for name, renderer in [('json_renderer', 'rest_framework.renderers.JSONRenderer'),
+                               ('orjson_renderer', 'doctorAppointment.renderers.ORJSONRenderer')]:
+            with override_settings(REST_FRAMEWORK={
+                'DEFAULT_RENDERER_CLASSES': [renderer],
+                'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework_simplejwt.authentication.JWTAuthentication'],
+            }):
+                result[f'request_ms_{name}'], response = self._best(lambda: client.get('/api/admin/doctors/'), repeat)
+                result[f'request_status_{name}'] = response.status_code
+        return result
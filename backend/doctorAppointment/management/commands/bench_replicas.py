@@ -0,0 +1,157 @@
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.celery import app
+from doctorAppointment.models import AppointmentSlot, Doctor, EmailNotification, Patient, User
+from doctorAppointment.specializations import resolve
+
+STANDIN_ALIAS = 'replica_standin'
+
+
+class Command(BaseCommand):
+    help = ('pgbench-style load test of replica routing: concurrent patients poll the slot list and '
+            'book/cancel slots. Without configured replicas a stand-in alias pointing at the primary '
+            'is used. Creates bench accounts and deletes them afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--slots', type=int, default=200)
+        parser.add_argument('--write-ratio', type=float, default=0.01,
+                            help='Share of iterations that book (and then cancel) a slot.')
+        parser.add_argument('--sticky-seconds', type=int, default=2)
+
+    def handle(self, *args, **options):
+        replicas = list(settings.DATABASE_REPLICAS)
+        if not replicas:
+            connections.settings[STANDIN_ALIAS] = dict(connections.settings['default'])
+            replicas = [STANDIN_ALIAS]
+
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], DATABASE_REPLICAS=replicas,
+                                   DB_REPLICA_STICKY_SECONDS=options['sticky_seconds'],
+                                   EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                tokens, slot_ids = self._seed(prefix, options)
+                result = self._run(tokens, slot_ids, replicas, options)
+        finally:
+            app.conf.task_always_eager = eager
+            EmailNotification.objects.filter(to_email__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _seed(self, prefix, options):
+        doctor_user = User.objects.create(username=f'{prefix}-doctor', role='doctor', password='!')
+        doctor = Doctor.objects.create(user=doctor_user, name='Bench', specialization=resolve('General'))
+        slots = AppointmentSlot.objects.bulk_create([
+            # 15-minute slots, 32 a day: slots of one doctor may not overlap
+            AppointmentSlot(doctor=doctor, date=date(2099, 1, 1) + timedelta(days=i // 32),
+                            start_time=f'{8 + i % 32 // 4:02}:{i % 4 * 15:02}',
+                            end_time=f'{8 + i % 32 // 4:02}:{i % 4 * 15 + 14:02}')
+            for i in range(options['slots'])
+        ])
+        slot_ids = [slot.pk for slot in slots] if slots[0].pk else list(
+            AppointmentSlot.objects.filter(doctor=doctor).values_list('id', flat=True))
+        tokens = []
+        for i in range(options['clients']):
+            user = User.objects.create(username=f'{prefix}-p{i}', email=f'{prefix}-p{i}@example.com',
+                                       role='patient', password='!')
+            Patient.objects.create(user=user, name=f'Bench {i}', phone_number='5550100')
+            tokens.append(str(RefreshToken.for_user(user).access_token))
+        return tokens, slot_ids
+
+    def _run(self, tokens, slot_ids, replicas, options):
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0, 'sticky_violations': 0,
+                  'select_by_alias': {alias: 0 for alias in ['default', *replicas]}}
+        latencies = []
+        deadline = time.perf_counter() + options['seconds']
+
+        def client_loop(index):
+            rng = random.Random(index)
+            # Failed requests (e.g. SQLite lock timeouts) are counted, not raised
+            client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {tokens[index]}')
+            served = {}
+
+            def recorder(alias):
+                def record(execute, sql, params, many, context):
+                    if sql.lstrip().upper().startswith('SELECT'):
+                        served[alias] = served.get(alias, 0) + 1
+                    return execute(sql, params, many, context)
+                return record
+
+            local = {'reads': 0, 'writes': 0, 'errors': 0, 'sticky_violations': 0}
+            local_latencies = []
+            by_alias = {}
+            try:
+                with ExitStack() as stack:
+                    for alias in totals['select_by_alias']:
+                        stack.enter_context(connections[alias].execute_wrapper(recorder(alias)))
+                    while time.perf_counter() < deadline:
+                        if rng.random() < options['write_ratio']:
+                            response = client.post('/api/appointments/book/', {'slot_id': rng.choice(slot_ids)},
+                                                   content_type='application/json')
+                            if response.status_code != 201:
+                                local['errors'] += response.status_code >= 500
+                                continue
+                            local['writes'] += 1
+                            # Read-your-writes: the next slot list must come from the primary
+                            served.clear()
+                            client.get('/api/slots/')
+                            if any(served.get(alias) for alias in replicas):
+                                local['sticky_violations'] += 1
+                            response = client.get('/api/patient/appointments/')
+                            booked = [row for row in response.json() if row['status'] == 'Booked'] \
+                                if response.status_code == 200 else []
+                            for row in booked:
+                                client.post(f'/api/appointments/{row["id"]}/cancel/')
+                            continue
+                        served.clear()
+                        started = time.perf_counter()
+                        response = client.get('/api/slots/')
+                        local_latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            local['errors'] += 1
+                        local['reads'] += 1
+                        for alias, count in served.items():
+                            by_alias[alias] = by_alias.get(alias, 0) + count
+            finally:
+                connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    totals[key] += value
+                for alias, count in by_alias.items():
+                    totals['select_by_alias'][alias] += count
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(len(tokens))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'clients': len(tokens),
+            'replicas': replicas,
+            'elapsed_s': round(elapsed, 2),
+            'tps': round((totals['reads'] + totals['writes']) / elapsed, 1),
+            'read_latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            'read_latency_ms_p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            **totals,
+        }
@@ -0,0 +1,93 @@
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from doctorAppointment.models import Patient, User
+from doctorAppointment.search import matching_ids
+
+FIRST_NAMES = ['Anna', 'Ben', 'Carla', 'David', 'Elena', 'Farid', 'Grace', 'Hugo', 'Ines', 'Jonas',
+               'Karin', 'Liam', 'Maria', 'Nils', 'Olga', 'Pavel', 'Rosa', 'Samir', 'Tara', 'Umar']
+LAST_NAMES = ['Abbott', 'Berger', 'Chen', 'Dubois', 'Eriksen', 'Fischer', 'Garcia', 'Hansen', 'Ivanova',
+              'Jensen', 'Kowalski', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Petrov', 'Rossi', 'Schmidt',
+              'Tanaka', 'Weber']
+
+
+class Command(BaseCommand):
+    help = ('Seed N patients inside a transaction that is rolled back and time admin autocomplete '
+            'queries (search.matching_ids) against the unindexed icontains scan they replace.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--scan-queries', type=int, default=10,
+                            help='icontains queries to time; each one scans every patient.')
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            result = self._run(options)
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _run(self, options):
+        rng = random.Random(0)
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        started = time.perf_counter()
+        batch_size = 5000
+        for offset in range(0, options['patients'], batch_size):
+            count = min(batch_size, options['patients'] - offset)
+            users = User.objects.bulk_create([
+                User(username=f'{prefix}-{offset + i}', email=f'{prefix}-{offset + i}@example.com',
+                     role='patient', password='!')
+                for i in range(count)
+            ])
+            Patient.objects.bulk_create([
+                Patient(user=user, name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{offset + i}',
+                        phone_number=f'555-{rng.randrange(10 ** 7):07}')
+                for i, user in enumerate(users)
+            ])
+        seed_s = time.perf_counter() - started
+
+        # What an admin types: 1-4 letters of a name, a name plus surname prefix, a phone prefix
+        queries = []
+        for _ in range(options['queries']):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            queries.append(rng.choice([
+                first[:rng.randint(1, 4)],
+                f'{first} {last[:rng.randint(1, 3)]}',
+                f'{last}{rng.randrange(options["patients"])}',
+                f'555-{rng.randrange(1000):03}',
+            ]))
+
+        def timed(search, texts):
+            latencies = []
+            for text in texts:
+                started = time.perf_counter()
+                search(text)
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            return {
+                'queries': len(texts),
+                'p50_ms': round(statistics.median(latencies) * 1000, 2),
+                'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+            }
+
+        def scan(text):
+            condition = Q(name__icontains=text) | Q(phone_number__icontains=text) | Q(user__email__icontains=text)
+            return list(Patient.objects.filter(condition).values_list('id', flat=True)[:options['limit']])
+
+        return {
+            'patients': options['patients'],
+            'seed_s': round(seed_s, 1),
+            'indexed': timed(lambda text: matching_ids('patient', text, options['limit']), queries),
+            # First/last-name prefixes only: worst case for the scan, since few rows match early
+            'icontains_scan': timed(scan, [f'{last}{options["patients"] - 1}'
+                                           for last in LAST_NAMES[:options['scan_queries']]]),
+        }
@@ -0,0 +1,68 @@
+import json
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = ('Benchmark a burst of /api/signup/ requests through the full Django stack. '
+            'Everything runs in one transaction that is rolled back, so no data is kept '
+            'and no emails are queued.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--role', choices=['patient', 'doctor'], default='patient')
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Keep the configured password hasher (dominates the timings).')
+
+    def handle(self, *args, **options):
+        settings_override = {'ALLOWED_HOSTS': ['*']}
+        if not options['real_hasher']:
+            settings_override['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(**settings_override):
+            result = self._run(options)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _run(self, options):
+        client = Client()
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        latencies, query_counts, failures = [], [], 0
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            for i in range(options['users']):
+                payload = {
+                    'username': f'{prefix}-{i}',
+                    'first_name': f'Bench {i}',
+                    'email': f'{prefix}-{i}@example.com',
+                    'password': 'bench-pass-123',
+                    'password_confirm': 'bench-pass-123',
+                    'role': options['role'],
+                    'phone_number': '5550100',
+                    'specialization': 'General',
+                }
+                request_started = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.post('/api/signup/', payload, content_type='application/json')
+                latencies.append(time.perf_counter() - request_started)
+                query_counts.append(len(queries))
+                if response.status_code != 201:
+                    failures += 1
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        latencies.sort()
+        return {
+            'signups': options['users'],
+            'failures': failures,
+            'elapsed_s': round(elapsed, 3),
+            'signups_per_s': round(options['users'] / elapsed, 1),
+            'latency_ms_p50': round(latencies[len(latencies) // 2] * 1000, 2),
+            'latency_ms_p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+            'queries_per_signup': statistics.mean(query_counts),
+        }
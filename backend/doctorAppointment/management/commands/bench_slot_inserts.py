@@ -0,0 +1,108 @@
+import json
+import statistics
+import time
+import uuid
+from datetime import date, time as clock, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection, transaction
+
+from doctorAppointment.models import AppointmentSlot, Doctor, User
+from doctorAppointment.overlaps import SLOT_OVERLAP, install_guards, remove_guards, violated_constraint
+from doctorAppointment.specializations import resolve
+
+SLOTS_PER_DAY = 32
+
+
+class Command(BaseCommand):
+    help = ('Benchmark slot inserts with the overlap guards (exclusion constraints on PostgreSQL, '
+            'triggers on SQLite) on and off. The guards are dropped and restored inside one '
+            'transaction that is rolled back; on PostgreSQL that locks the slot table, so run it '
+            'against a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--slots', type=int, default=20000, help='Slots per bulk insert.')
+        parser.add_argument('--single', type=int, default=500, help='Slots inserted one by one per round.')
+        parser.add_argument('--rounds', type=int, default=3)
+        parser.add_argument('--existing-days', type=int, default=60,
+                            help='Days of slots each doctor already has before the timed inserts.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            result = self._run(options)
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def _run(self, options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        doctors = []
+        general = resolve('General')
+        for i in range(options['doctors']):
+            user = User.objects.create(username=f'{prefix}-d{i}', role='doctor', password='!')
+            doctors.append(Doctor.objects.create(user=user, name=user.username, specialization=general))
+        # Existing calendar the guards have to probe
+        AppointmentSlot.objects.bulk_create(
+            self._slots(doctors, options['existing_days'] * SLOTS_PER_DAY * len(doctors), date(2098, 1, 1)),
+            batch_size=2000,
+        )
+
+        timings = {'on': {'bulk': [], 'single': []}, 'off': {'bulk': [], 'single': []}}
+        first_day = date(2099, 1, 1)
+        for round_ in range(options['rounds']):
+            for mode in ('on', 'off'):
+                if mode == 'on':
+                    install_guards(connection)
+                else:
+                    remove_guards(connection)
+                bulk = self._slots(doctors, options['slots'], first_day)
+                first_day += timedelta(days=len(bulk) // (SLOTS_PER_DAY * len(doctors)) + 1)
+                started = time.perf_counter()
+                AppointmentSlot.objects.bulk_create(bulk, batch_size=2000)
+                timings[mode]['bulk'].append(time.perf_counter() - started)
+
+                single = self._slots(doctors, options['single'], first_day)
+                first_day += timedelta(days=len(single) // (SLOTS_PER_DAY * len(doctors)) + 1)
+                started = time.perf_counter()
+                for slot in single:
+                    slot.save()
+                timings[mode]['single'].append((time.perf_counter() - started) / len(single))
+        install_guards(connection)
+
+        # Every overlapping insert must be rejected by the database
+        rejected = 0
+        for slot in self._slots(doctors, options['single'], date(2098, 1, 1)):
+            slot.start_time = clock(slot.start_time.hour, slot.start_time.minute + 5)
+            try:
+                with transaction.atomic():
+                    slot.save()
+            except IntegrityError as e:
+                rejected += violated_constraint(e) == SLOT_OVERLAP
+
+        result = {'vendor': connection.vendor, 'doctors': len(doctors), 'existing_slots':
+                  options['existing_days'] * SLOTS_PER_DAY * len(doctors)}
+        for mode, values in timings.items():
+            bulk_s = statistics.median(values['bulk'])
+            result[f'guards_{mode}'] = {
+                'bulk_slots_per_s': round(options['slots'] / bulk_s),
+                'single_insert_ms': round(statistics.median(values['single']) * 1000, 3),
+            }
+        result['bulk_overhead'] = round(
+            result['guards_off']['bulk_slots_per_s'] / result['guards_on']['bulk_slots_per_s'] - 1, 3)
+        result['overlaps_attempted'] = options['single']
+        result['overlaps_rejected'] = rejected
+        return result
+
+    def _slots(self, doctors, count, first_day):
+        """``count`` back-to-back 15-minute slots, round-robin over the doctors."""
+        slots = []
+        for i in range(count):
+            position = i // len(doctors)
+            minutes = 8 * 60 + position % SLOTS_PER_DAY * 15
+            slots.append(AppointmentSlot(
+                doctor=doctors[i % len(doctors)],
+                date=first_day + timedelta(days=position // SLOTS_PER_DAY),
+                start_time=clock(minutes // 60, minutes % 60),
+                end_time=clock((minutes + 14) // 60, (minutes + 14) % 60),
+            ))
+        return slots
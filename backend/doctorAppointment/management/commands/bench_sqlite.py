@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+LEGACY_OPTIONS = {'timeout': 5}
+MD5_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def _use_database(path, mode):
+    """Point this process's default connection at ``path`` with the given SQLite mode."""
+    from django.conf import settings
+    from django.db import connections
+
+    connections['default'].close()
+    connections.settings['default']['NAME'] = path
+    if mode == 'legacy':
+        connections.settings['default']['OPTIONS'] = dict(LEGACY_OPTIONS)
+    else:
+        connections.settings['default']['OPTIONS'] = dict(settings.DATABASES['default']['OPTIONS'])
+
+
+def _worker(args):
+    """One benchmark process: log in, then book and cancel slots until the deadline."""
+    path, mode, index, slot_ids, start_at, seconds, login_every = args
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    django.setup()
+
+    from django.test import Client, override_settings
+    from backend.celery import app
+    from doctorAppointment.audit import writer
+
+    _use_database(path, mode)
+    app.conf.task_always_eager = True
+    override_settings(
+        ALLOWED_HOSTS=['*'], PASSWORD_HASHERS=MD5_HASHERS, AUDIT_LOG_QUEUE=mode != 'legacy',
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    ).enable()
+
+    rng = random.Random(index)
+    client = Client(raise_request_exception=False)
+    result = {'bookings': 0, 'cancels': 0, 'conflicts': 0, 'logins': 0, 'lock_errors': 0, 'other_errors': 0}
+
+    def check(response, ok_status):
+        if response.status_code == ok_status:
+            return True
+        if response.status_code >= 500:
+            error = str(response.exc_info[1]) if getattr(response, 'exc_info', None) else ''
+            result['lock_errors' if 'locked' in error else 'other_errors'] += 1
+        return False
+
+    def login():
+        response = client.post('/api/login/', {'username': f'bench-p{index}', 'password': 'bench-pass'},
+                               content_type='application/json')
+        if check(response, 200):
+            result['logins'] += 1
+            client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {response.json()["access_token"]}'
+
+    # All processes start together, after Django has loaded everywhere
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + seconds
+    login()
+    iteration = 0
+    while time.time() < deadline:
+        iteration += 1
+        if iteration % login_every == 0:
+            login()
+        response = client.post('/api/appointments/book/', {'slot_id': rng.choice(slot_ids)},
+                               content_type='application/json')
+        if response.status_code == 400:
+            result['conflicts'] += 1
+            continue
+        if not check(response, 201):
+            continue
+        result['bookings'] += 1
+        response = client.get('/api/patient/appointments/')
+        if not check(response, 200):
+            continue
+        for row in response.json():
+            if row['status'] == 'Booked' and check(client.post(f'/api/appointments/{row["id"]}/cancel/'), 200):
+                result['cancels'] += 1
+    writer.flush()
+    return result
+
+
+class Command(BaseCommand):
+    help = ('Multi-process booking benchmark on a scratch SQLite file: each process logs in and '
+            'books/cancels slots through the API. Compares the legacy SQLite setup (rollback journal, '
+            'deferred transactions, 5s timeout, synchronous audit writes) with the hardened one.')
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--slots', type=int, default=50)
+        parser.add_argument('--login-every', type=int, default=5, help='Log in again every N bookings.')
+        parser.add_argument('--mode', choices=['legacy', 'hardened', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.stderr.write('Configured database is not SQLite; the benchmark still uses a scratch SQLite file.')
+
+        workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            slot_ids = self._prepare(template, options)
+            modes = ['legacy', 'hardened'] if options['mode'] == 'both' else [options['mode']]
+            results = {}
+            for mode in modes:
+                path = os.path.join(workdir, f'{mode}.sqlite3')
+                shutil.copyfile(template, path)
+                results[mode] = self._run(path, mode, slot_ids, options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _prepare(self, path, options):
+        from django.contrib.auth.hashers import make_password
+        from django.test import override_settings
+        from doctorAppointment.models import AppointmentSlot, Doctor, Patient, User
+        from doctorAppointment.specializations import resolve
+
+        _use_database(path, 'legacy')
+        call_command('migrate', verbosity=0)
+        doctor_user = User.objects.create(username='bench-doctor', role='doctor', password='!')
+        doctor = Doctor.objects.create(user=doctor_user, name='Bench', specialization=resolve('General'))
+        with override_settings(PASSWORD_HASHERS=MD5_HASHERS):
+            password = make_password('bench-pass')
+        for index in range(options['processes']):
+            user = User.objects.create(username=f'bench-p{index}', role='patient', password=password)
+            Patient.objects.create(user=user, name=f'Bench {index}', phone_number='5550100')
+        slots = [
+            AppointmentSlot.objects.create(doctor=doctor, date='2099-01-01', start_time=f'{9 + i // 4:02}:{i % 4 * 15:02}',
+                                           end_time=f'{9 + i // 4:02}:{i % 4 * 15 + 14:02}')
+            for i in range(options['slots'])
+        ]
+        from django.db import connections
+        connections['default'].close()
+        return [slot.id for slot in slots]
+
+    def _run(self, path, mode, slot_ids, options):
+        start_at = time.time() + 10  # leaves time for every process to start Django
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(options['processes']) as pool:
+            per_process = pool.map(_worker, [
+                (path, mode, index, slot_ids, start_at, options['seconds'], options['login_every'])
+                for index in range(options['processes'])
+            ])
+        totals = {key: sum(result[key] for result in per_process) for key in per_process[0]}
+        totals['bookings_per_s'] = round(totals['bookings'] / options['seconds'], 1)
+        totals['processes'] = options['processes']
+        return totals
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doctorAppointment.bulk_import import DEFAULT_BATCH_SIZE, PROFILE_SPECS, import_accounts, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create doctor or patient accounts from a CSV or JSON-lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('role', choices=sorted(PROFILE_SPECS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as handle:
+                report = import_accounts(read_rows(handle, fmt), options['role'], batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} {options['role']} accounts, {report['failed']} rows failed."
+        ))
@@ -0,0 +1,93 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doctorAppointment.loadtest import SCENARIOS, compare, run_scenario
+
+
+class Command(BaseCommand):
+    help = ('Run load-test scenarios against a running server (seed it first with seed_loadtest) '
+            'and write throughput and latency percentiles as JSON. With --compare BASELINE CURRENT, '
+            'diff two result files instead and exit non-zero on regressions. Set CHATBOT_FAKE_LLM=1 '
+            'on the server to keep the chatbot scenario off the real LLM API.')
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--accounts', default='loadtest-accounts.json')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Comma-separated subset of: {", ".join(SCENARIOS)}')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds per scenario.')
+        parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each scenario.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results here as well as to stdout.')
+        parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'))
+        parser.add_argument('--latency-threshold', type=float, default=0.10,
+                            help='Allowed relative p95 latency increase.')
+        parser.add_argument('--throughput-threshold', type=float, default=0.10,
+                            help='Allowed relative throughput drop.')
+        parser.add_argument('--error-threshold', type=float, default=0.01,
+                            help='Allowed absolute error-rate increase.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self._compare(*options['compare'], options)
+
+        names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(unknown)}')
+        try:
+            with open(options['accounts']) as f:
+                accounts = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f'{options["accounts"]} not found; run seed_loadtest first')
+
+        result = {
+            'meta': {
+                'base_url': options['base_url'],
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'git_commit': self._git_commit(),
+                'python': platform.python_version(),
+                'concurrency': options['concurrency'],
+                'duration_s': options['duration'],
+                'seed': options['seed'],
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            self.stderr.write(f'Running {name}...')
+            try:
+                result['scenarios'][name] = run_scenario(
+                    name, options['base_url'], accounts, options['concurrency'],
+                    options['duration'], warmup=options['warmup'], seed=options['seed'],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def _compare(self, baseline_path, current_path, options):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        with open(current_path) as f:
+            current = json.load(f)
+        report = compare(baseline, current, options['latency_threshold'],
+                         options['throughput_threshold'], options['error_threshold'])
+        self.stdout.write(json.dumps(report, indent=2))
+        if report['regressions']:
+            raise CommandError(f'{len(report["regressions"])} request(s) regressed')
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from doctorAppointment.models import LoginInfo
+from doctorAppointment.retention import ensure_partitions, partition_table
+
+
+class Command(BaseCommand):
+    help = ('PostgreSQL only: convert the LoginInfo table to monthly range partitions on login_time '
+            '(copies the table under an exclusive lock), or create upcoming partitions if it already is.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL.')
+        if partition_table(LoginInfo, 'login_time', months_ahead=options['months_ahead']):
+            self.stdout.write(self.style.SUCCESS('LoginInfo is now partitioned by month.'))
+        else:
+            created = ensure_partitions(LoginInfo, months_ahead=options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'LoginInfo already partitioned; created {created} missing partitions.'))
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from doctorAppointment.models import Appointment, LoginInfo
+from doctorAppointment.stats import rollup_range
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly/daily statistics rollups from the source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only rebuild the last N days (default: full history).')
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        if options['days']:
+            start = end - timedelta(days=options['days'])
+        else:
+            candidates = [
+                LoginInfo.objects.order_by('login_time').values_list('login_time', flat=True).first(),
+                Appointment.objects.order_by('booked_at').values_list('booked_at', flat=True).first(),
+            ]
+            candidates = [value for value in candidates if value]
+            if not candidates:
+                self.stdout.write('Nothing to roll up.')
+                return
+            start = min(candidates)
+
+        # Rebuild a week at a time to keep each transaction short
+        written = 0
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=7), end)
+            written += rollup_range(chunk_start, chunk_end)
+            chunk_start = chunk_end
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} statistics buckets since {start:%Y-%m-%d %H:%M}.'))
@@ -0,0 +1,116 @@
+import json
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from doctorAppointment.models import Appointment, AppointmentSlot, Doctor, Patient, User, appointment_start
+from doctorAppointment.specializations import resolve
+
+SPECIALIZATIONS = ['General', 'Cardiology', 'Dermatology', 'Neurology', 'Pediatrics', 'Orthopedics']
+SLOTS_PER_DAY = 32  # 15-minute slots from 08:00
+
+
+class Command(BaseCommand):
+    help = ('Seed N doctors, M patients and K slots for the loadtest command and write the '
+            'accounts file it reads. Accounts share the --prefix; existing ones are replaced.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--patients', type=int, default=200)
+        parser.add_argument('--slots', type=int, default=5000)
+        parser.add_argument('--booked', type=float, default=0.3,
+                            help='Share of slots booked up front, so dashboards and lists have rows.')
+        parser.add_argument('--prefix', default='lt')
+        parser.add_argument('--password', default='loadtest-pass')
+        parser.add_argument('--output', default='loadtest-accounts.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        with transaction.atomic():
+            deleted, _ = User.objects.filter(username__startswith=f'{prefix}-').delete()
+            if deleted:
+                self.stdout.write(f'Removed {deleted} rows from a previous seed.')
+            password = make_password(options['password'])
+            doctors = self._accounts(prefix, 'doctor', options['doctors'], password)
+            patients = self._accounts(prefix, 'patient', options['patients'], password)
+            specializations = [resolve(name) for name in SPECIALIZATIONS]
+            doctor_profiles = Doctor.objects.bulk_create([
+                Doctor(user=user, name=f'Doctor {i}', specialization=specializations[i % len(specializations)])
+                for i, user in enumerate(doctors)
+            ])
+            patient_profiles = Patient.objects.bulk_create([
+                Patient(user=user, name=f'Patient {i}', phone_number=f'555{i:07}')
+                for i, user in enumerate(patients)
+            ])
+            slots = self._slots(doctor_profiles, options['slots'])
+            booked = self._book(slots, patient_profiles, options['booked'], rng)
+
+        manifest = {
+            'prefix': prefix,
+            'password': options['password'],
+            'doctors': [{'username': user.username} for user in doctors],
+            'patients': [{'username': user.username} for user in patients],
+            'slot_ids': [slot.pk for slot in slots if not slot.is_booked],
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(manifest, f)
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(doctors)} doctors, {len(patients)} patients, {len(slots)} slots '
+            f'({booked} booked); accounts written to {options["output"]}'
+        ))
+
+    def _accounts(self, prefix, role, count, password):
+        return User.objects.bulk_create([
+            User(username=f'{prefix}-{role}-{i}', email=f'{prefix}-{role}-{i}@example.com',
+                 first_name=f'{role.title()} {i}', role=role, password=password)
+            for i in range(count)
+        ])
+
+    def _slots(self, doctors, count):
+        if not doctors:
+            return []
+        first_day = date.today() + timedelta(days=30)
+        slots = []
+        for i in range(count):
+            doctor = doctors[i % len(doctors)]
+            position = i // len(doctors)
+            day = first_day + timedelta(days=position // SLOTS_PER_DAY)
+            minutes = 8 * 60 + (position % SLOTS_PER_DAY) * 15
+            slots.append(AppointmentSlot(
+                doctor=doctor, date=day,
+                start_time=time(minutes // 60, minutes % 60),
+                end_time=time((minutes + 14) // 60, (minutes + 14) % 60),
+            ))
+        return AppointmentSlot.objects.bulk_create(slots, batch_size=1000)
+
+    def _book(self, slots, patients, share, rng):
+        if not patients:
+            return 0
+        chosen = rng.sample(slots, int(len(slots) * share))
+        appointments = []
+        # A patient's active appointments may not overlap (see overlaps.py)
+        taken = set()
+        for slot in chosen:
+            for _ in range(10):
+                patient = rng.choice(patients)
+                if (patient.pk, slot.date, slot.start_time) not in taken:
+                    break
+            else:
+                continue
+            taken.add((patient.pk, slot.date, slot.start_time))
+            slot.is_booked = True
+            appointments.append(Appointment(
+                patient=patient, doctor=slot.doctor, slot=slot,
+                appointment_date=slot.date, start_time=slot.start_time, end_time=slot.end_time,
+                # bulk_create skips save(), which normally fills this in
+                starts_at=appointment_start(slot.date, slot.start_time),
+            ))
+        AppointmentSlot.objects.bulk_update([slot for slot in chosen if slot.is_booked], ['is_booked'],
+                                            batch_size=1000)
+        Appointment.objects.bulk_create(appointments, batch_size=1000)
+        return len(appointments)
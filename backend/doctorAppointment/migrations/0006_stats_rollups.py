@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_history(apps, schema_editor):
+    """
+    Date existing appointments from their own schedule instead of the migration
+    run, which would put every past booking in one stats bucket. The booking
+    time was never recorded; the appointment's start is its latest possible
+    value (capped at now for future appointments), and a visit happened then.
+    """
+    Appointment = apps.get_model('doctorAppointment', 'Appointment')
+    zone = ZoneInfo(settings.APPOINTMENT_TIME_ZONE)
+    now = timezone.now()
+    batch = []
+    for appointment in Appointment.objects.only(
+            'id', 'status', 'appointment_date', 'start_time', 'visited_at').iterator(chunk_size=2000):
+        starts_at = timezone.make_aware(datetime.combine(appointment.appointment_date, appointment.start_time), zone)
+        appointment.booked_at = min(starts_at, now)
+        if appointment.status == 'Visited':
+            appointment.visited_at = min(starts_at, now)
+        batch.append(appointment)
+        if len(batch) >= 2000:
+            Appointment.objects.bulk_update(batch, ['booked_at', 'visited_at'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['booked_at', 'visited_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0005_logininfo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='booked_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='visited_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='logininfo',
+            name='login_time',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='StatsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('logins', models.PositiveIntegerField(default=0)),
+                ('registrations', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats_buckets', to='doctorAppointment.doctor')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'indexes': [models.Index(fields=['granularity', 'doctor', 'bucket_start'], name='stats_bucket_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket_start', 'doctor'), name='unique_stats_bucket'), models.UniqueConstraint(condition=models.Q(('doctor__isnull', True)), fields=('granularity', 'bucket_start'), name='unique_stats_bucket_sitewide')],
+            },
+        ),
+    ]
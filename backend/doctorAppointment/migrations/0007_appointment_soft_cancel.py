@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0006_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='canceled_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='doctorAppointment.appointmentslot'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('Booked', 'Booked'), ('Visited', 'Visited'), ('Canceled', 'Canceled')], default='Booked', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['Booked', 'Visited'])), fields=('slot',), name='unique_active_appointment_per_slot'),
+        ),
+    ]
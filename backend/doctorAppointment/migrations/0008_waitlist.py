@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0007_appointment_soft_cancel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Waiting', 'Waiting'), ('Offered', 'Offered'), ('Claimed', 'Claimed'), ('Expired', 'Expired'), ('Left', 'Left')], default='Waiting', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='doctorAppointment.doctor')),
+                ('offered_slot', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_offers', to='doctorAppointment.appointmentslot')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='doctorAppointment.patient')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['doctor', 'date', 'status', 'created_at'], name='waitlist_queue_idx'), models.Index(fields=['status', 'offer_expires_at'], name='waitlist_offer_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['Waiting', 'Offered'])), fields=('patient', 'doctor', 'date'), name='unique_active_waitlist_entry')],
+            },
+        ),
+    ]
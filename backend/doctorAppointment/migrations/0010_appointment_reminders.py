@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:12
+
+import django.db.models.deletion
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_starts_at(apps, schema_editor):
+    Appointment = apps.get_model('doctorAppointment', 'Appointment')
+    zone = ZoneInfo(settings.APPOINTMENT_TIME_ZONE)
+    batch = []
+    for appointment in Appointment.objects.filter(starts_at__isnull=True).only(
+            'id', 'appointment_date', 'start_time').iterator(chunk_size=2000):
+        appointment.starts_at = timezone.make_aware(
+            datetime.combine(appointment.appointment_date, appointment.start_time), zone)
+        batch.append(appointment)
+        if len(batch) >= 2000:
+            Appointment.objects.bulk_update(batch, ['starts_at'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['starts_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0009_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead', models.CharField(choices=[('24h', '24 hours before'), ('1h', '1 hour before')], max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'starts_at'], name='appointment_upcoming_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='doctorAppointment.appointment'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentreminder',
+            constraint=models.UniqueConstraint(fields=('appointment', 'lead'), name='unique_appointment_reminder'),
+        ),
+        migrations.RunPython(backfill_starts_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:31
+
+from django.db import migrations, models
+
+# The SQL below is frozen as this migration first ran; doctorAppointment.overlaps
+# holds the live copy that reinstall_guards restores after SQLite table rebuilds.
+
+CONFLICT_QUERIES = [
+    ('slot {0} does not end after it starts',
+     'SELECT id FROM "doctorAppointment_appointmentslot" WHERE end_time <= start_time LIMIT 10'),
+    ('slots {0} and {1} overlap', """
+        SELECT a.id, b.id FROM "doctorAppointment_appointmentslot" a JOIN "doctorAppointment_appointmentslot" b
+          ON a.doctor_id = b.doctor_id AND a.date = b.date AND a.id < b.id
+         AND a.start_time < b.end_time AND b.start_time < a.end_time
+        LIMIT 10
+    """),
+    ('appointment {0} ends before it starts',
+     """SELECT id FROM "doctorAppointment_appointment" WHERE status IN ('Booked', 'Visited') AND end_time < start_time LIMIT 10"""),
+    ('appointments {0} and {1} overlap for one patient', """
+        SELECT a.id, b.id FROM "doctorAppointment_appointment" a JOIN "doctorAppointment_appointment" b
+          ON a.patient_id = b.patient_id AND a.appointment_date = b.appointment_date AND a.id < b.id
+         AND a.status IN ('Booked', 'Visited') AND b.status IN ('Booked', 'Visited')
+         AND a.start_time < b.end_time AND b.start_time < a.end_time
+        LIMIT 10
+    """),
+]
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS btree_gist',
+    """ALTER TABLE "doctorAppointment_appointmentslot" ADD CONSTRAINT slot_no_overlap
+       EXCLUDE USING gist (doctor_id WITH =, tsrange(date + start_time, date + end_time, '[)') WITH &&)""",
+    """ALTER TABLE "doctorAppointment_appointment" ADD CONSTRAINT appointment_no_patient_overlap
+       EXCLUDE USING gist (patient_id WITH =,
+           tsrange(appointment_date + start_time, appointment_date + end_time, '[)') WITH &&)
+       WHERE (status IN ('Booked', 'Visited'))""",
+]
+POSTGRES_REMOVE = [
+    'ALTER TABLE "doctorAppointment_appointmentslot" DROP CONSTRAINT IF EXISTS slot_no_overlap',
+    'ALTER TABLE "doctorAppointment_appointment" DROP CONSTRAINT IF EXISTS appointment_no_patient_overlap',
+]
+
+SQLITE_INSTALL = [
+    """CREATE TRIGGER IF NOT EXISTS slot_no_overlap_insert BEFORE INSERT ON "doctorAppointment_appointmentslot" BEGIN
+        SELECT RAISE(ABORT, 'slot_no_overlap') WHERE EXISTS (
+            SELECT 1 FROM "doctorAppointment_appointmentslot" s
+            WHERE s.doctor_id = NEW.doctor_id AND s.date = NEW.date AND s.id IS NOT NEW.id
+              AND s.start_time < NEW.end_time AND NEW.start_time < s.end_time
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS slot_no_overlap_update
+    BEFORE UPDATE OF doctor_id, date, start_time, end_time ON "doctorAppointment_appointmentslot" BEGIN
+        SELECT RAISE(ABORT, 'slot_no_overlap') WHERE EXISTS (
+            SELECT 1 FROM "doctorAppointment_appointmentslot" s
+            WHERE s.doctor_id = NEW.doctor_id AND s.date = NEW.date AND s.id IS NOT NEW.id
+              AND s.start_time < NEW.end_time AND NEW.start_time < s.end_time
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointment_no_patient_overlap_insert
+    BEFORE INSERT ON "doctorAppointment_appointment" WHEN NEW.status IN ('Booked', 'Visited') BEGIN
+        SELECT RAISE(ABORT, 'appointment_no_patient_overlap') WHERE EXISTS (
+            SELECT 1 FROM "doctorAppointment_appointment" a
+            WHERE a.patient_id = NEW.patient_id AND a.appointment_date = NEW.appointment_date
+              AND a.id IS NOT NEW.id AND a.status IN ('Booked', 'Visited')
+              AND a.start_time < NEW.end_time AND NEW.start_time < a.end_time
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS appointment_no_patient_overlap_update
+    BEFORE UPDATE OF patient_id, appointment_date, start_time, end_time, status ON "doctorAppointment_appointment"
+    WHEN NEW.status IN ('Booked', 'Visited') BEGIN
+        SELECT RAISE(ABORT, 'appointment_no_patient_overlap') WHERE EXISTS (
+            SELECT 1 FROM "doctorAppointment_appointment" a
+            WHERE a.patient_id = NEW.patient_id AND a.appointment_date = NEW.appointment_date
+              AND a.id IS NOT NEW.id AND a.status IN ('Booked', 'Visited')
+              AND a.start_time < NEW.end_time AND NEW.start_time < a.end_time
+        );
+    END""",
+]
+SQLITE_REMOVE = [
+    'DROP TRIGGER IF EXISTS slot_no_overlap_insert',
+    'DROP TRIGGER IF EXISTS slot_no_overlap_update',
+    'DROP TRIGGER IF EXISTS appointment_no_patient_overlap_insert',
+    'DROP TRIGGER IF EXISTS appointment_no_patient_overlap_update',
+]
+
+
+def check_existing_rows(apps, schema_editor):
+    problems = []
+    with schema_editor.connection.cursor() as cursor:
+        for message, query in CONFLICT_QUERIES:
+            cursor.execute(query)
+            problems += [message.format(*row) for row in cursor.fetchall()]
+    if problems:
+        raise RuntimeError(
+            'Resolve these rows before applying the slot overlap constraints: ' + '; '.join(problems)
+        )
+
+
+def _run(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    statements = postgres if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def add_guards(apps, schema_editor):
+    _run(schema_editor, POSTGRES_INSTALL, SQLITE_INSTALL)
+
+
+def drop_guards(apps, schema_editor):
+    _run(schema_editor, POSTGRES_REMOVE, SQLITE_REMOVE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0012_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_existing_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentslot',
+            index=models.Index(fields=['doctor', 'date', 'start_time'], name='slot_doctor_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentslot',
+            constraint=models.CheckConstraint(condition=models.Q(('end_time__gt', models.F('start_time'))), name='slot_end_after_start'),
+        ),
+        # After AddConstraint: on SQLite it rebuilds the table, which would drop the triggers
+        migrations.RunPython(add_guards, drop_guards),
+    ]
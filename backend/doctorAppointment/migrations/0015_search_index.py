@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+from django.db import migrations
+
+# The SQL below is frozen as this migration first ran, when doctors still had a
+# text specialization column; 0018_search_specialization moves the index onto
+# the specialization table. doctorAppointment.search holds the live copy.
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS search_patient_name_trgm ON "doctorAppointment_patient" USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_patient_phone_trgm ON "doctorAppointment_patient" USING gin (UPPER(phone_number) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_doctor_name_trgm ON "doctorAppointment_doctor" USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_doctor_specialization_trgm ON "doctorAppointment_doctor" USING gin (UPPER(specialization) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_user_email_trgm ON "doctorAppointment_user" USING gin (UPPER(email) gin_trgm_ops)',
+]
+POSTGRES_REMOVE = [
+    'DROP INDEX IF EXISTS search_patient_name_trgm',
+    'DROP INDEX IF EXISTS search_patient_phone_trgm',
+    'DROP INDEX IF EXISTS search_doctor_name_trgm',
+    'DROP INDEX IF EXISTS search_doctor_specialization_trgm',
+    'DROP INDEX IF EXISTS search_user_email_trgm',
+]
+
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_patient USING fts5(name, phone_number, email,
+       tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_doctor USING fts5(name, specialization, email,
+       tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5')""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_insert AFTER INSERT ON "doctorAppointment_patient" BEGIN
+        INSERT INTO search_patient (rowid, name, phone_number, email)
+        SELECT NEW.id, NEW.name, NEW.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+            NEW.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+        FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_update
+    AFTER UPDATE OF name, phone_number, user_id ON "doctorAppointment_patient" BEGIN
+        DELETE FROM search_patient WHERE rowid = OLD.id;
+        INSERT INTO search_patient (rowid, name, phone_number, email)
+        SELECT NEW.id, NEW.name, NEW.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+            NEW.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+        FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_delete AFTER DELETE ON "doctorAppointment_patient" BEGIN
+        DELETE FROM search_patient WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_insert AFTER INSERT ON "doctorAppointment_doctor" BEGIN
+        INSERT INTO search_doctor (rowid, name, specialization, email)
+        SELECT NEW.id, NEW.name, NEW.specialization, u.email FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_update
+    AFTER UPDATE OF name, specialization, user_id ON "doctorAppointment_doctor" BEGIN
+        DELETE FROM search_doctor WHERE rowid = OLD.id;
+        INSERT INTO search_doctor (rowid, name, specialization, email)
+        SELECT NEW.id, NEW.name, NEW.specialization, u.email FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_delete AFTER DELETE ON "doctorAppointment_doctor" BEGIN
+        DELETE FROM search_doctor WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_user_email AFTER UPDATE OF email ON "doctorAppointment_user" BEGIN
+        UPDATE search_patient SET email = NEW.email
+        WHERE rowid IN (SELECT id FROM "doctorAppointment_patient" WHERE user_id = NEW.id);
+        UPDATE search_doctor SET email = NEW.email
+        WHERE rowid IN (SELECT id FROM "doctorAppointment_doctor" WHERE user_id = NEW.id);
+    END""",
+]
+SQLITE_REBUILD = [
+    'DELETE FROM search_patient',
+    """INSERT INTO search_patient (rowid, name, phone_number, email)
+       SELECT p.id, p.name, p.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+           p.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+       FROM "doctorAppointment_patient" p JOIN "doctorAppointment_user" u ON u.id = p.user_id""",
+    'DELETE FROM search_doctor',
+    """INSERT INTO search_doctor (rowid, name, specialization, email)
+       SELECT d.id, d.name, d.specialization, u.email
+       FROM "doctorAppointment_doctor" d JOIN "doctorAppointment_user" u ON u.id = d.user_id""",
+]
+SQLITE_REMOVE = [
+    'DROP TRIGGER IF EXISTS search_patient_insert',
+    'DROP TRIGGER IF EXISTS search_patient_update',
+    'DROP TRIGGER IF EXISTS search_patient_delete',
+    'DROP TRIGGER IF EXISTS search_doctor_insert',
+    'DROP TRIGGER IF EXISTS search_doctor_update',
+    'DROP TRIGGER IF EXISTS search_doctor_delete',
+    'DROP TRIGGER IF EXISTS search_user_email',
+    'DROP TABLE IF EXISTS search_patient',
+    'DROP TABLE IF EXISTS search_doctor',
+]
+
+
+def _run(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    statements = postgres if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def add_search_index(apps, schema_editor):
+    _run(schema_editor, POSTGRES_INSTALL, SQLITE_INSTALL + SQLITE_REBUILD)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, POSTGRES_REMOVE, SQLITE_REMOVE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0014_appointment_schedule_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, drop_search_index),
+    ]
@@ -0,0 +1,207 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of doctorAppointment.specializations.normalize as of this migration
+ALIASES = {
+    'gp': 'General',
+    'general practice': 'General',
+    'general practitioner': 'General',
+    'general physician': 'General',
+    'pediatrician': 'Pediatrics',
+    'paediatrics': 'Pediatrics',
+    'paediatrician': 'Pediatrics',
+    'orthopedist': 'Orthopedics',
+    'orthopaedics': 'Orthopedics',
+    'orthopedic surgeon': 'Orthopedics',
+    'ent': 'ENT',
+}
+SUFFIXES = [(re.compile(r'ologist$'), 'ology'), (re.compile(r'iatrist$'), 'iatry')]
+LOWERCASE_WORDS = {'and', 'of', 'the', 'in'}
+
+
+def normalize(text):
+    key = ' '.join((text or '').split()).casefold()
+    if not key:
+        return ''
+    if key in ALIASES:
+        return ALIASES[key]
+    for pattern, replacement in SUFFIXES:
+        key = pattern.sub(replacement, key)
+    if key in ALIASES:
+        return ALIASES[key]
+    words = key.split(' ')
+    return ' '.join(
+        word if i and word in LOWERCASE_WORDS else word[:1].upper() + word[1:]
+        for i, word in enumerate(words)
+    )
+
+
+# The 0015 search index reads the text column removed below: it is dropped
+# first, and restored when this migration is reversed. 0018 installs the index
+# over the specialization table. Frozen copy of 0015's statements:
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS search_patient_name_trgm ON "doctorAppointment_patient" USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_patient_phone_trgm ON "doctorAppointment_patient" USING gin (UPPER(phone_number) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_doctor_name_trgm ON "doctorAppointment_doctor" USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_doctor_specialization_trgm ON "doctorAppointment_doctor" USING gin (UPPER(specialization) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS search_user_email_trgm ON "doctorAppointment_user" USING gin (UPPER(email) gin_trgm_ops)',
+]
+POSTGRES_REMOVE = [
+    'DROP INDEX IF EXISTS search_patient_name_trgm',
+    'DROP INDEX IF EXISTS search_patient_phone_trgm',
+    'DROP INDEX IF EXISTS search_doctor_name_trgm',
+    'DROP INDEX IF EXISTS search_doctor_specialization_trgm',
+    'DROP INDEX IF EXISTS search_user_email_trgm',
+]
+
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_patient USING fts5(name, phone_number, email,
+       tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_doctor USING fts5(name, specialization, email,
+       tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5')""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_insert AFTER INSERT ON "doctorAppointment_patient" BEGIN
+        INSERT INTO search_patient (rowid, name, phone_number, email)
+        SELECT NEW.id, NEW.name, NEW.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+            NEW.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+        FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_update
+    AFTER UPDATE OF name, phone_number, user_id ON "doctorAppointment_patient" BEGIN
+        DELETE FROM search_patient WHERE rowid = OLD.id;
+        INSERT INTO search_patient (rowid, name, phone_number, email)
+        SELECT NEW.id, NEW.name, NEW.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+            NEW.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+        FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_patient_delete AFTER DELETE ON "doctorAppointment_patient" BEGIN
+        DELETE FROM search_patient WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_insert AFTER INSERT ON "doctorAppointment_doctor" BEGIN
+        INSERT INTO search_doctor (rowid, name, specialization, email)
+        SELECT NEW.id, NEW.name, NEW.specialization, u.email FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_update
+    AFTER UPDATE OF name, specialization, user_id ON "doctorAppointment_doctor" BEGIN
+        DELETE FROM search_doctor WHERE rowid = OLD.id;
+        INSERT INTO search_doctor (rowid, name, specialization, email)
+        SELECT NEW.id, NEW.name, NEW.specialization, u.email FROM "doctorAppointment_user" u WHERE u.id = NEW.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_doctor_delete AFTER DELETE ON "doctorAppointment_doctor" BEGIN
+        DELETE FROM search_doctor WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_user_email AFTER UPDATE OF email ON "doctorAppointment_user" BEGIN
+        UPDATE search_patient SET email = NEW.email
+        WHERE rowid IN (SELECT id FROM "doctorAppointment_patient" WHERE user_id = NEW.id);
+        UPDATE search_doctor SET email = NEW.email
+        WHERE rowid IN (SELECT id FROM "doctorAppointment_doctor" WHERE user_id = NEW.id);
+    END""",
+]
+SQLITE_REBUILD = [
+    'DELETE FROM search_patient',
+    """INSERT INTO search_patient (rowid, name, phone_number, email)
+       SELECT p.id, p.name, p.phone_number || ' ' || replace(replace(replace(replace(replace(replace(
+           p.phone_number, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', ''), u.email
+       FROM "doctorAppointment_patient" p JOIN "doctorAppointment_user" u ON u.id = p.user_id""",
+    'DELETE FROM search_doctor',
+    """INSERT INTO search_doctor (rowid, name, specialization, email)
+       SELECT d.id, d.name, d.specialization, u.email
+       FROM "doctorAppointment_doctor" d JOIN "doctorAppointment_user" u ON u.id = d.user_id""",
+]
+SQLITE_REMOVE = [
+    'DROP TRIGGER IF EXISTS search_patient_insert',
+    'DROP TRIGGER IF EXISTS search_patient_update',
+    'DROP TRIGGER IF EXISTS search_patient_delete',
+    'DROP TRIGGER IF EXISTS search_doctor_insert',
+    'DROP TRIGGER IF EXISTS search_doctor_update',
+    'DROP TRIGGER IF EXISTS search_doctor_delete',
+    'DROP TRIGGER IF EXISTS search_user_email',
+    'DROP TABLE IF EXISTS search_patient',
+    'DROP TABLE IF EXISTS search_doctor',
+]
+
+
+
+def _run(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    statements = postgres if vendor == 'postgresql' else sqlite if vendor == 'sqlite' else []
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_text_search_index(apps, schema_editor):
+    _run(schema_editor, POSTGRES_REMOVE, SQLITE_REMOVE)
+
+
+def restore_text_search_index(apps, schema_editor):
+    _run(schema_editor, POSTGRES_INSTALL, SQLITE_INSTALL + SQLITE_REBUILD)
+
+
+def link_specializations(apps, schema_editor):
+    Doctor = apps.get_model('doctorAppointment', 'Doctor')
+    Specialization = apps.get_model('doctorAppointment', 'Specialization')
+    texts = Doctor.objects.values_list('specialization', flat=True).distinct()
+    for text in texts:
+        name = normalize(text)
+        if name:
+            specialization, _ = Specialization.objects.get_or_create(name=name)
+            Doctor.objects.filter(specialization=text).update(specialization_ref=specialization)
+
+
+def unlink_specializations(apps, schema_editor):
+    Doctor = apps.get_model('doctorAppointment', 'Doctor')
+    Specialization = apps.get_model('doctorAppointment', 'Specialization')
+    for specialization in Specialization.objects.all():
+        Doctor.objects.filter(specialization_ref=specialization).update(specialization=specialization.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_text_search_index, restore_text_search_index),
+        migrations.CreateModel(
+            name='Specialization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='specialization_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='doctorAppointment.specialization'),
+        ),
+        migrations.RunPython(link_specializations, unlink_specializations),
+        # Gives the text column a default, so reversing RemoveField can re-add it to existing rows
+        migrations.AlterField(
+            model_name='doctor',
+            name='specialization',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='doctor',
+            name='specialization',
+        ),
+        migrations.RenameField(
+            model_name='doctor',
+            old_name='specialization_ref',
+            new_name='specialization',
+        ),
+        migrations.AlterField(
+            model_name='doctor',
+            name='specialization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='doctors', to='doctorAppointment.specialization'),
+        ),
+    ]
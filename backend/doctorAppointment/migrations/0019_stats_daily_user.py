@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDay
+
+
+def backfill_daily_users(apps, schema_editor):
+    """Fill the per-day user sets from the LoginInfo rows retention has kept so far."""
+    LoginInfo = apps.get_model('doctorAppointment', 'LoginInfo')
+    StatsDailyUser = apps.get_model('doctorAppointment', 'StatsDailyUser')
+    rows = (LoginInfo.objects.annotate(day=TruncDay('login_time')).values_list('day', 'user_id')
+            .distinct().order_by())
+    batch = []
+    for day, user_id in rows.iterator(chunk_size=2000):
+        batch.append(StatsDailyUser(bucket_start=day, user_id=user_id))
+        if len(batch) >= 2000:
+            StatsDailyUser.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    StatsDailyUser.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0018_search_specialization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsDailyUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('bucket_start', 'user'), name='unique_stats_daily_user')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_users, migrations.RunPython.noop),
+    ]
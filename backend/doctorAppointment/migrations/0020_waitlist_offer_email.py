@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorAppointment', '0019_stats_daily_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailnotification',
+            name='kind',
+            field=models.CharField(choices=[('welcome', 'Welcome'), ('appointment_confirmation', 'Appointment confirmation'), ('appointment_reminder', 'Appointment reminder'), ('waitlist_offer', 'Waitlist offer')], max_length=30),
+        ),
+    ]
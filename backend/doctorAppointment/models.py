@@ -1,5 +1,11 @@
-from django.db import models
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -12,10 +18,21 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
     
+class Specialization(models.Model):
+    # Canonical spelling; free-text input goes through specializations.resolve()
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='doctor_profile')
     name = models.CharField(max_length=100, default = 'Anonymous')
-    specialization = models.CharField(max_length=100)
+    specialization = models.ForeignKey(Specialization, on_delete=models.PROTECT, null=True, blank=True,
+                                       related_name='doctors')
 
     def __str__(self):
         return f'{self.name} - {self.specialization}'
@@ -34,33 +51,216 @@ class AppointmentSlot(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     is_booked = models.BooleanField(default=False)
+    # Bumped on every change (queryset .update() calls set it explicitly); see conditional.py
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Overlapping slots per doctor are rejected by the database; see overlaps.py
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_time__gt=models.F('start_time')),
+                                   name='slot_end_after_start'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'date', 'start_time'], name='slot_doctor_day_idx'),
+        ]
 
     def __str__(self):
         return f'Slot on {self.date} from {self.start_time} to {self.end_time} for Dr. {self.doctor.name}'
 
+def appointment_start(date, start_time):
+    """Aware datetime for a slot's date and start time, in the clinic's time zone."""
+    return timezone.make_aware(datetime.combine(date, start_time), ZoneInfo(settings.APPOINTMENT_TIME_ZONE))
+
 class Appointment(models.Model):
     STATUS_CHOICES = [
         ('Booked', 'Booked'),
         ('Visited', 'Visited'),
+        ('Canceled', 'Canceled'),
     ]
+
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments')
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments')
-    slot = models.OneToOneField(AppointmentSlot, on_delete=models.CASCADE, related_name='appointment')
+    # Canceled appointments keep pointing at their slot, so the slot can carry
+    # many appointments over time but only one active one (see Meta).
+    slot = models.ForeignKey(AppointmentSlot, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='appointments')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Booked')
     appointment_date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
+    booked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    visited_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    canceled_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # appointment_date + start_time as one indexed instant, for the reminder sweeper
+    starts_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['slot'], condition=models.Q(status__in=['Booked', 'Visited']),
+                                    name='unique_active_appointment_per_slot'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'starts_at'], name='appointment_upcoming_idx'),
+            # Probed by the patient overlap trigger on SQLite; see overlaps.py
+            models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_day_idx'),
+            # Admin overview pages (newest first) and date-range filters; see overview.py
+            models.Index(fields=['appointment_date', 'start_time', 'id'], name='appointment_schedule_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        if self.starts_at is None:
+            self.starts_at = appointment_start(self.appointment_date, self.start_time)
         # Mark slot as booked when appointment is saved
         if not self.pk:
             self.slot.is_booked = True
             self.slot.save()
         super().save(*args, **kwargs)
 
+    def cancel(self):
+        """
+        Mark the appointment canceled and release its slot in one transaction.
+        Returns False if the appointment was no longer 'Booked'.
+        """
+        with transaction.atomic():
+            now = timezone.now()
+            updated = Appointment.objects.filter(pk=self.pk, status='Booked').update(
+                status='Canceled', canceled_at=now, updated_at=now
+            )
+            if not updated:
+                return False
+            if self.slot_id:
+                AppointmentSlot.objects.filter(pk=self.slot_id).update(is_booked=False, updated_at=now)
+        self.status = 'Canceled'
+        self.canceled_at = now
+        return True
+
     def __str__(self):
         return f'Appointment {self.id} for {self.patient.name} with Dr. {self.doctor.name} on {self.appointment_date}'
 
+class WaitlistEntry(models.Model):
+    """
+    A patient queued for a doctor's slots on a given date. When a slot on that
+    date is freed it is held and offered to the oldest waiting entry, which
+    can claim it until offer_expires_at.
+    """
+    STATUS_CHOICES = [
+        ('Waiting', 'Waiting'),
+        ('Offered', 'Offered'),
+        ('Claimed', 'Claimed'),
+        ('Expired', 'Expired'),
+        ('Left', 'Left'),
+    ]
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    offered_slot = models.ForeignKey(AppointmentSlot, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='waitlist_offers')
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'doctor', 'date'],
+                                    condition=models.Q(status__in=['Waiting', 'Offered']),
+                                    name='unique_active_waitlist_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'date', 'status', 'created_at'], name='waitlist_queue_idx'),
+            models.Index(fields=['status', 'offer_expires_at'], name='waitlist_offer_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.patient.name} waiting for Dr. {self.doctor.name} on {self.date} ({self.status})'
+
+class EmailNotification(models.Model):
+    """
+    Outbox row for an email. Rows are written in the same transaction as the
+    event that caused them and delivered in batches by the send_queued_emails
+    task over a single SMTP connection.
+    """
+    KIND_CHOICES = [
+        ('welcome', 'Welcome'),
+        ('appointment_confirmation', 'Appointment confirmation'),
+        ('appointment_reminder', 'Appointment reminder'),
+        ('waitlist_offer', 'Waitlist offer'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails')
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='emails')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} to {self.to_email} ({self.status})'
+
+class AppointmentReminder(models.Model):
+    """
+    Ledger of reminders for an appointment, one row per lead time. The unique
+    constraint plus the queued_at claim make sure each reminder is queued once,
+    however often the sweeper runs or re-dispatches a batch.
+    """
+    LEAD_CHOICES = [
+        ('24h', '24 hours before'),
+        ('1h', '1 hour before'),
+    ]
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='reminders')
+    lead = models.CharField(max_length=3, choices=LEAD_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the reminder email was queued, or skipped because the appointment is no longer booked
+    queued_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'lead'], name='unique_appointment_reminder'),
+        ]
+
+    def __str__(self):
+        return f'{self.lead} reminder for appointment {self.appointment_id}'
+
+class IdempotencyKey(models.Model):
+    """
+    A client's Idempotency-Key for a POST, with a fingerprint of the request
+    and the response it got; see idempotency.py. response_status is set in
+    the same transaction as the row, so readers never see it unset.
+    """
+    scope = models.CharField(max_length=40)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.key} ({self.scope})'
+
 class Log(models.Model):
     LEVEL_CHOICES = [
         ('INFO', 'Info'),
@@ -69,7 +269,7 @@ class Log(models.Model):
     ]
     level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='INFO')
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
     def __str__(self):
@@ -77,7 +277,7 @@ class Log(models.Model):
 
 class LoginInfo(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
-    login_time = models.DateTimeField(auto_now_add=True)
+    login_time = models.DateTimeField(auto_now_add=True, db_index=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
     login_type = models.CharField(max_length=20, choices=[('registration', 'Registration'), ('login', 'Login')], default='login')
@@ -88,3 +288,56 @@ class LoginInfo(models.Model):
 
     def __str__(self):
         return f'{self.user.username} - {self.login_type} at {self.login_time}'
+
+class StatsBucket(models.Model):
+    """
+    Pre-aggregated hourly/daily counters for the admin statistics endpoints.
+    Rows with doctor=NULL hold site-wide totals; per-doctor rows only carry
+    the appointment counters.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='stats_buckets')
+    logins = models.PositiveIntegerField(default=0)
+    registrations = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['bucket_start']
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket_start', 'doctor'], name='unique_stats_bucket'),
+            models.UniqueConstraint(fields=['granularity', 'bucket_start'], condition=models.Q(doctor__isnull=True),
+                                    name='unique_stats_bucket_sitewide'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'doctor', 'bucket_start'], name='stats_bucket_lookup_idx'),
+        ]
+
+    def __str__(self):
+        scope = f'Dr. {self.doctor_id}' if self.doctor_id else 'all'
+        return f'{self.granularity} {self.bucket_start} ({scope})'
+
+
+class StatsDailyUser(models.Model):
+    """
+    The users who logged in or registered on each day, kept with the daily
+    StatsBucket rollups so distinct users over a range are counted without
+    LoginInfo, which retention archives.
+    """
+    bucket_start = models.DateTimeField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bucket_start', 'user'], name='unique_stats_daily_user'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} on {self.bucket_start}'
@@ -0,0 +1,170 @@
+"""
+Email outbox.
+
+``queue_email`` stores an ``EmailNotification`` row (inside the caller's
+transaction) and asks a worker to flush the outbox once that transaction
+commits. ``deliver_due_emails`` claims a batch of due rows, sends them over
+one reused SMTP connection, marks each row sent as soon as it goes out and
+reschedules failures with exponential backoff. A claimed row is leased for ``EMAIL_CLAIM_LEASE_SECONDS``, so rows
+held by a crashed worker are picked up again.
+"""
+import uuid
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import EmailNotification
+
+
+def queue_email(kind, to_email, subject, body, user=None, appointment=None, flush=True):
+    """Add an email to the outbox; returns the row, or None if there is no recipient."""
+    if not to_email:
+        return None
+    notification = EmailNotification.objects.create(
+        kind=kind, to_email=to_email, subject=subject, body=body, user=user, appointment=appointment,
+    )
+    if flush:
+        from .tasks import send_queued_emails
+        transaction.on_commit(lambda: send_queued_emails.delay(), robust=True)
+    return notification
+
+
+def welcome_email(user):
+    return (
+        'Welcome to Our Doctor Appointment Platform',
+        f'Hi {user.username},\n\nThank you for registering on our platform.',
+    )
+
+
+def _appointment_line(appointment):
+    return (f'Dr. {appointment.doctor.name} on {appointment.appointment_date:%d %b %Y} '
+            f'at {appointment.start_time:%H:%M}')
+
+
+def confirmation_email(appointment):
+    return (
+        'Your appointment is confirmed',
+        f'Hi {appointment.patient.name},\n\nYour appointment with {_appointment_line(appointment)} is booked.',
+    )
+
+
+def reminder_email(appointment, lead):
+    return (
+        f'Reminder: appointment {lead}',
+        f'Hi {appointment.patient.name},\n\nThis is a reminder of your appointment with '
+        f'{_appointment_line(appointment)}.',
+    )
+
+
+def waitlist_offer_email(entry):
+    slot = entry.offered_slot
+    expires = timezone.localtime(entry.offer_expires_at, ZoneInfo(settings.APPOINTMENT_TIME_ZONE))
+    return (
+        'A slot opened up for you',
+        f'Hi {entry.patient.name},\n\nA slot with Dr. {entry.doctor.name} on {slot.date:%d %b %Y} at '
+        f'{slot.start_time:%H:%M} is held for you until {expires:%H:%M}. Claim it from your waitlist before then.',
+    )
+
+
+def queue_waitlist_offer(entry):
+    subject, body = waitlist_offer_email(entry)
+    return queue_email('waitlist_offer', entry.patient.user.email, subject, body, user=entry.patient.user)
+
+
+def queue_appointment_confirmation(appointment):
+    subject, body = confirmation_email(appointment)
+    return queue_email('appointment_confirmation', appointment.patient.user.email, subject, body,
+                       user=appointment.patient.user, appointment=appointment)
+
+
+def queue_batch_confirmation(patient, appointments):
+    """One confirmation email for a batch of appointments (see batch_booking.py)."""
+    lines = '\n'.join(f'- {_appointment_line(appointment)}' for appointment in appointments)
+    return queue_email(
+        'appointment_confirmation', patient.user.email, f'Your {len(appointments)} appointments are confirmed',
+        f'Hi {patient.name},\n\nThe following appointments are booked:\n{lines}',
+        user=patient.user, appointment=appointments[0],
+    )
+
+
+def _claim_due(batch_size):
+    now = timezone.now()
+    due = EmailNotification.objects.filter(
+        Q(status='pending') | Q(status='sending'), next_attempt_at__lte=now
+    ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+    token = uuid.uuid4()
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_CLAIM_LEASE_SECONDS', 600))
+    # Conditional update: a row only goes to the worker whose token lands on it
+    EmailNotification.objects.filter(
+        id__in=list(due), status__in=['pending', 'sending'], next_attempt_at__lte=now
+    ).update(status='sending', claim_token=token, next_attempt_at=now + lease)
+    return list(EmailNotification.objects.filter(claim_token=token, status='sending'))
+
+
+def _record_failure(notification, error):
+    notification.attempts += 1
+    notification.last_error = str(error)[:1000]
+    if notification.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        notification.status = 'failed'
+    else:
+        notification.status = 'pending'
+        delay = settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (notification.attempts - 1)
+        notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    notification.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _record_sent(notification):
+    # Marked as soon as it goes out, so a worker dying later in the batch
+    # does not send it again once the lease runs out
+    EmailNotification.objects.filter(pk=notification.pk).update(
+        status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, claim_token=None,
+    )
+
+
+def deliver_due_emails(batch_size=None, connection=None):
+    """
+    Send one batch of due emails over a single SMTP connection.
+    Returns {'sent': n, 'failed': n} for the batch.
+    """
+    batch = _claim_due(batch_size or settings.EMAIL_BATCH_SIZE)
+    result = {'sent': 0, 'failed': 0}
+    if not batch:
+        return result
+
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for notification in batch:
+            _record_failure(notification, e)
+        result['failed'] = len(batch)
+        return result
+    try:
+        for notification in batch:
+            message = EmailMessage(
+                notification.subject, notification.body, settings.DEFAULT_FROM_EMAIL,
+                [notification.to_email], connection=connection,
+            )
+            try:
+                try:
+                    connection.send_messages([message])
+                except SMTPServerDisconnected:
+                    # The server dropped the session mid-batch; reconnect once and retry
+                    connection.close()
+                    connection.open()
+                    connection.send_messages([message])
+            except Exception as e:
+                _record_failure(notification, e)
+                result['failed'] += 1
+            else:
+                _record_sent(notification)
+                result['sent'] += 1
+    finally:
+        connection.close()
+    return result
@@ -0,0 +1,143 @@
+"""
+Database-enforced overlap rules for slots and appointments.
+
+- A doctor's slots may not overlap (``slot_no_overlap``).
+- A patient may not hold two active (Booked/Visited) appointments that
+  overlap (``appointment_no_patient_overlap``).
+
+On PostgreSQL these are exclusion constraints over ``tsrange(date + start,
+date + end)`` (GiST, with btree_gist for the id equality). SQLite has no
+exclusion constraints, so the same rules are BEFORE INSERT/UPDATE triggers
+that probe the (doctor, date, start_time) / (patient, appointment_date)
+indexes; ranges never cross midnight because slots must end after they
+start (``slot_end_after_start``, a plain check constraint), so comparing
+within one date is enough.
+
+Either way a violation raises IntegrityError whose message carries the
+constraint name; ``violated_constraint()`` maps it back for the views.
+SQLite drops a table's triggers when Django rebuilds the table during a
+later migration, so ``install_guards`` is also run after every migrate
+(see apps.py); it is idempotent.
+"""
+from django.db.migrations.recorder import MigrationRecorder
+
+SLOT_OVERLAP = 'slot_no_overlap'
+PATIENT_OVERLAP = 'appointment_no_patient_overlap'
+SLOT_TIME_ORDER = 'slot_end_after_start'
+GUARDS_MIGRATION = ('doctorAppointment', '0013_slot_overlap_constraints')
+
+SLOTS = '"doctorAppointment_appointmentslot"'
+APPOINTMENTS = '"doctorAppointment_appointment"'
+ACTIVE = "('Booked', 'Visited')"
+
+_SLOT_CONFLICT = f"""
+    SELECT RAISE(ABORT, '{SLOT_OVERLAP}') WHERE EXISTS (
+        SELECT 1 FROM {SLOTS} s
+        WHERE s.doctor_id = NEW.doctor_id AND s.date = NEW.date AND s.id IS NOT NEW.id
+          AND s.start_time < NEW.end_time AND NEW.start_time < s.end_time
+    );
+"""
+_PATIENT_CONFLICT = f"""
+    SELECT RAISE(ABORT, '{PATIENT_OVERLAP}') WHERE EXISTS (
+        SELECT 1 FROM {APPOINTMENTS} a
+        WHERE a.patient_id = NEW.patient_id AND a.appointment_date = NEW.appointment_date
+          AND a.id IS NOT NEW.id AND a.status IN {ACTIVE}
+          AND a.start_time < NEW.end_time AND NEW.start_time < a.end_time
+    );
+"""
+
+SQLITE_TRIGGERS = {
+    f'{SLOT_OVERLAP}_insert': f'BEFORE INSERT ON {SLOTS} BEGIN {_SLOT_CONFLICT} END',
+    f'{SLOT_OVERLAP}_update': (
+        f'BEFORE UPDATE OF doctor_id, date, start_time, end_time ON {SLOTS} BEGIN {_SLOT_CONFLICT} END'
+    ),
+    f'{PATIENT_OVERLAP}_insert': (
+        f'BEFORE INSERT ON {APPOINTMENTS} WHEN NEW.status IN {ACTIVE} BEGIN {_PATIENT_CONFLICT} END'
+    ),
+    f'{PATIENT_OVERLAP}_update': (
+        f'BEFORE UPDATE OF patient_id, appointment_date, start_time, end_time, status ON {APPOINTMENTS} '
+        f'WHEN NEW.status IN {ACTIVE} BEGIN {_PATIENT_CONFLICT} END'
+    ),
+}
+
+POSTGRES_CONSTRAINTS = {
+    SLOT_OVERLAP: (
+        SLOTS, f"EXCLUDE USING gist (doctor_id WITH =, tsrange(date + start_time, date + end_time, '[)') WITH &&)"
+    ),
+    PATIENT_OVERLAP: (
+        APPOINTMENTS,
+        "EXCLUDE USING gist (patient_id WITH =, "
+        "tsrange(appointment_date + start_time, appointment_date + end_time, '[)') WITH &&) "
+        f"WHERE (status IN {ACTIVE})"
+    ),
+}
+
+
+def install_guards(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+            for name, (table, definition) in POSTGRES_CONSTRAINTS.items():
+                cursor.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', [name])
+                if cursor.fetchone() is None:
+                    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+        elif connection.vendor == 'sqlite':
+            for name, body in SQLITE_TRIGGERS.items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+
+def remove_guards(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for name, (table, _) in POSTGRES_CONSTRAINTS.items():
+                cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}')
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def reinstall_guards(using='default', **kwargs):
+    """post_migrate handler: put back triggers lost to SQLite table rebuilds."""
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if GUARDS_MIGRATION in MigrationRecorder(connection).applied_migrations():
+        install_guards(connection)
+
+
+def violated_constraint(error):
+    """Name of the overlap/time-order constraint an IntegrityError reports, or None."""
+    message = str(error)
+    for name in (SLOT_OVERLAP, PATIENT_OVERLAP, SLOT_TIME_ORDER):
+        if name in message:
+            return name
+    return None
+
+
+def find_conflicts(connection, limit=10):
+    """Existing rows that would violate the guards, as readable strings (for the migration)."""
+    problems = []
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id FROM {SLOTS} WHERE end_time <= start_time LIMIT %s', [limit])
+        problems += [f'slot {row[0]} does not end after it starts' for row in cursor.fetchall()]
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM {SLOTS} a JOIN {SLOTS} b
+              ON a.doctor_id = b.doctor_id AND a.date = b.date AND a.id < b.id
+             AND a.start_time < b.end_time AND b.start_time < a.end_time
+            LIMIT %s
+        """, [limit])
+        problems += [f'slots {a} and {b} overlap' for a, b in cursor.fetchall()]
+        cursor.execute(f'SELECT id FROM {APPOINTMENTS} WHERE status IN {ACTIVE} AND end_time < start_time LIMIT %s',
+                       [limit])
+        problems += [f'appointment {row[0]} ends before it starts' for row in cursor.fetchall()]
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM {APPOINTMENTS} a JOIN {APPOINTMENTS} b
+              ON a.patient_id = b.patient_id AND a.appointment_date = b.appointment_date AND a.id < b.id
+             AND a.status IN {ACTIVE} AND b.status IN {ACTIVE}
+             AND a.start_time < b.end_time AND b.start_time < a.end_time
+            LIMIT %s
+        """, [limit])
+        problems += [f'appointments {a} and {b} overlap for one patient' for a, b in cursor.fetchall()]
+    return problems
@@ -0,0 +1,124 @@
+"""
+Admin appointment overview: filters, keyset pages, grouped counts and
+streamed export.
+
+Pages are ordered newest first by (appointment_date, start_time, id) and
+continue from an opaque cursor holding the last row's key, so fetching page
+N costs the same as page 1 (no OFFSET) and rows inserted meanwhile do not
+shift later pages. Counts per status and doctor come from one GROUP BY over
+the filtered rows; exports stream the filtered rows in chunks.
+"""
+import base64
+import csv
+import json
+from datetime import date, time
+
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
+
+from .models import Appointment
+from .projections import Computed, Projection, time_range
+
+APPOINTMENT_OVERVIEW_ROWS = Projection(
+    id='id', patient='patient__name', doctor='doctor__name', date='appointment_date',
+    time=Computed(time_range, 'start_time', 'end_time'), status='status',
+)
+STATUSES = [value for value, _ in Appointment.STATUS_CHOICES]
+ORDERING = ('-appointment_date', '-start_time', '-id')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_HEADERS = ['id', 'patient', 'doctor', 'date', 'time', 'status']
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def filter_appointments(params):
+    """Appointments matching doctor_id, status, date_from and date_to (inclusive). Raises ValueError."""
+    queryset = Appointment.objects.all()
+    doctor_id = params.get('doctor_id')
+    if doctor_id:
+        if not doctor_id.isdigit():
+            raise ValueError('doctor_id must be an integer')
+        queryset = queryset.filter(doctor_id=int(doctor_id))
+    status = params.get('status')
+    if status:
+        if status not in STATUSES:
+            raise ValueError(f'status must be one of {", ".join(STATUSES)}')
+        queryset = queryset.filter(status=status)
+    for param, lookup in (('date_from', 'appointment_date__gte'), ('date_to', 'appointment_date__lte')):
+        value = params.get(param)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'{param} must be a date (YYYY-MM-DD)')
+            queryset = queryset.filter(**{lookup: parsed})
+    return queryset
+
+
+def encode_cursor(appointment_date, start_time, appointment_id):
+    key = json.dumps([appointment_date.isoformat(), start_time.isoformat(), appointment_id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        appointment_date, start_time, appointment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(appointment_date), time.fromisoformat(start_time), int(appointment_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of overview rows after ``cursor``; returns (rows, next_cursor or None)."""
+    if cursor:
+        appointment_date, start_time, appointment_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(appointment_date__lt=appointment_date)
+            | Q(appointment_date=appointment_date, start_time__lt=start_time)
+            | Q(appointment_date=appointment_date, start_time=start_time, id__lt=appointment_id)
+        )
+    columns = APPOINTMENT_OVERVIEW_ROWS.columns
+    raw = list(queryset.order_by(*ORDERING).values_list(*columns)[:limit + 1])
+    next_cursor = None
+    if len(raw) > limit:
+        raw = raw[:limit]
+        last = raw[-1]
+        next_cursor = encode_cursor(last[columns.index('appointment_date')],
+                                    last[columns.index('start_time')], last[columns.index('id')])
+    return [APPOINTMENT_OVERVIEW_ROWS.to_dict(row) for row in raw], next_cursor
+
+
+def counts(queryset):
+    """Totals per status and per doctor (with a status breakdown) from one grouped query."""
+    by_status = dict.fromkeys(STATUSES, 0)
+    doctors = {}
+    grouped = (queryset.order_by().values('doctor_id', 'doctor__name', 'status')
+               .annotate(count=Count('id')).values_list('doctor_id', 'doctor__name', 'status', 'count'))
+    for doctor_id, doctor_name, status, count in grouped:
+        by_status[status] = by_status.get(status, 0) + count
+        doctor = doctors.setdefault(doctor_id, {
+            'doctor_id': doctor_id, 'doctor': doctor_name, 'total': 0, **dict.fromkeys(STATUSES, 0),
+        })
+        doctor[status] = doctor.get(status, 0) + count
+        doctor['total'] += count
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_doctor': sorted(doctors.values(), key=lambda row: (-row['total'], row['doctor_id'])),
+    }
+
+
+def export_rows(queryset, fmt, chunk_size=2000):
+    """Yield the filtered overview rows as CSV or JSON-lines text, streaming from the DB."""
+    rows = APPOINTMENT_OVERVIEW_ROWS.iterator(queryset.order_by(*ORDERING), chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_HEADERS)
+        for row in rows:
+            yield writer.writerow([row[header] for header in EXPORT_HEADERS])
+    else:
+        for row in rows:
+            yield json.dumps(row, default=str) + '\n'
@@ -0,0 +1,83 @@
+"""
+Read-only fast path for list endpoints.
+
+A ``Projection`` describes a response row in terms of ORM paths. It fetches
+exactly those columns with ``values_list()`` and turns each tuple into a
+dict with a mapper built once, at import time, instead of going through
+model instances and DRF's per-field serializer machinery. Use it for large
+read-only lists; serializers remain the tool for validation and writes.
+"""
+from operator import itemgetter
+
+
+class Computed:
+    """Output value built by ``func`` from the given ORM paths, e.g. a 'start-end' string."""
+
+    def __init__(self, func, *paths):
+        self.func = func
+        self.paths = paths
+
+
+def _computed(func, indexes):
+    return lambda r: func(*[r[i] for i in indexes])
+
+
+def _mapper(getters):
+    return lambda r: {key: get(r) for key, get in getters}
+
+
+class Projection:
+    """
+    Projection(id='id', user={'id': 'user__id', ...}, time=Computed(f, 'start_time', 'end_time'))
+
+    Values are ORM paths, nested dicts of the same, or ``Computed``.
+    """
+
+    def __init__(self, **spec):
+        self.columns = []
+
+        def column(path):
+            if path not in self.columns:
+                self.columns.append(path)
+            return self.columns.index(path)
+
+        def compile_dict(fields):
+            getters = []
+            for key, source in fields.items():
+                if isinstance(source, dict):
+                    get = compile_dict(source)
+                elif isinstance(source, Computed):
+                    get = _computed(source.func, tuple(column(path) for path in source.paths))
+                else:
+                    get = itemgetter(column(source))
+                getters.append((key, get))
+            return _mapper(tuple(getters))
+
+        self.to_dict = compile_dict(spec)
+        self.columns = tuple(self.columns)
+
+    def rows(self, queryset):
+        """List of response dicts for ``queryset``."""
+        return list(map(self.to_dict, queryset.values_list(*self.columns)))
+
+    def iterator(self, queryset, chunk_size=2000):
+        """Stream response dicts without caching the queryset."""
+        return map(self.to_dict, queryset.values_list(*self.columns).iterator(chunk_size=chunk_size))
+
+
+def time_range(start_time, end_time):
+    return f'{start_time}-{end_time}'
+
+
+USER_FIELDS = {
+    'id': 'user__id',
+    'first_name': 'user__first_name',
+    'username': 'user__username',
+    'email': 'user__email',
+    'role': 'user__role',
+}
+
+# Same shape as DoctorSerializer / PatientSerializer
+DOCTOR_ROWS = Projection(id='id', user=USER_FIELDS, name='name', specialization='specialization__name',
+                         specialization_id='specialization_id')
+PATIENT_ROWS = Projection(id='id', user=USER_FIELDS, name='name', phone_number='phone_number')
@@ -0,0 +1,215 @@
+"""
+Token-budgeted prompt assembly for the RAG chatbot.
+
+Every chat turn used to send two system prompts, all retrieved chunks (up to
+five of 700 words) and the last 12 history messages verbatim: thousands of
+input tokens, most of them irrelevant to the question. ``build_messages``
+fits the whole prompt into ``CHATBOT_PROMPT_TOKEN_BUDGET`` tokens:
+
+- one system message carries the rules, the knowledge and a summary of the
+  earlier conversation;
+- the question itself is cut to ``QUERY_SHARE`` of the budget;
+- the last ``CHATBOT_HISTORY_MESSAGES`` messages are sent verbatim (capped at
+  ``HISTORY_SHARE`` of the budget, the oldest trimmed first); older ones are
+  folded into a rolling summary kept on the ``ChatSession``, one short line
+  per message and at most ``CHATBOT_SUMMARY_TOKENS`` tokens overall;
+- retrieved chunks below ``CHATBOT_MIN_CHUNK_SCORE`` are dropped; the rest
+  are split into passages, passages repeated by overlapping chunks are
+  skipped, and the remaining budget is filled with the passages that score
+  best (chunk score plus overlap with the question's words).
+
+Tokens are counted with tiktoken's cl100k_base encoding when it is
+installed and its vocabulary file is available: Llama 3's vocabulary extends
+it, so counts are close and err high. Otherwise a regex pre-tokenizer
+approximates it.
+"""
+import logging
+import re
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a hospital information assistant for a single specific hospital."
+    "\n- For factual questions about the hospital (services, hours, contacts, policies), rely ONLY on the 'Hospital knowledge base' below."
+    "\n- If the required hospital fact is not present in the knowledge base, say: 'I can only answer questions about this hospital based on available information.'"
+    "\n- You may use the earlier conversation to keep context or to answer questions about the conversation itself."
+    "\n- Keep answers concise and accurate."
+)
+NO_KNOWLEDGE = '(No hospital knowledge provided.)'
+# Role and separators the chat format adds per message
+MESSAGE_OVERHEAD = 4
+HISTORY_SHARE = 0.3
+QUERY_SHARE = 0.25
+SUMMARY_LINE_TOKENS = 30
+PASSAGE_WORDS = 50
+# Weight of question-word overlap against the embedding score when ranking passages
+LEXICAL_WEIGHT = 0.5
+SHINGLE_WORDS = 6
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'can', 'do', 'does', 'for', 'from', 'have', 'how', 'i', 'in', 'is', 'it',
+    'me', 'my', 'of', 'on', 'or', 'the', 'there', 'to', 'what', 'when', 'where', 'which', 'who', 'with', 'you',
+    'your',
+}
+_PIECE = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+# Sentence ends, and numbered section headings ("8. VISITING HOURS"); "8." itself is no sentence end
+_SENTENCE = re.compile(r'(?<=[^\d\s][.!?])\s+|\s+(?=\d+\.\s+[A-Z])')
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:  # not installed, or the vocabulary can't be fetched
+        logger.warning('Token counting falls back to an estimate: %s', e)
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Common words are one token, longer ones about one per 8 characters
+    return sum(max(1, (len(piece) + 6) // 8) for piece in _PIECE.findall(text))
+
+
+def truncate(text, max_tokens):
+    """``text`` cut at a word boundary to at most ``max_tokens`` tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(' '.join(words[:middle]) + ' …') <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return ' '.join(words[:low]) + ' …' if low else ''
+
+
+def _terms(text):
+    return {word.rstrip('s') for word in re.findall(r'[a-z0-9]+', text.lower())
+            if len(word) > 2 and word not in STOPWORDS}
+
+
+def _shingles(words):
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+
+
+def _passages(chunk):
+    for sentence in _SENTENCE.split(chunk):
+        words = sentence.split()
+        for start in range(0, len(words), PASSAGE_WORDS):
+            if words[start:start + PASSAGE_WORDS]:
+                yield ' '.join(words[start:start + PASSAGE_WORDS])
+
+
+def select_context(query, retrieved, max_tokens):
+    """The knowledge text for ``retrieved`` [(chunk, score)] that fits in ``max_tokens``, and the chunks used."""
+    query_terms = _terms(query)
+    candidates = []
+    for chunk_number, (chunk, score) in enumerate(retrieved):
+        if score < settings.CHATBOT_MIN_CHUNK_SCORE:
+            continue
+        for passage_number, passage in enumerate(_passages(chunk)):
+            overlap = len(query_terms & _terms(passage)) / len(query_terms) if query_terms else 0
+            candidates.append((score + LEXICAL_WEIGHT * overlap, chunk_number, passage_number, passage))
+
+    chosen, seen = [], set()
+    remaining = max_tokens
+    for _, chunk_number, passage_number, passage in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        shingles = _shingles(passage.lower().split())
+        # Consecutive chunks share 120 words; a passage mostly seen already adds nothing
+        if len(shingles & seen) * 2 > len(shingles):
+            continue
+        cost = count_tokens(passage) + 1
+        if cost > remaining:
+            continue
+        chosen.append((chunk_number, passage_number, passage))
+        seen |= shingles
+        remaining -= cost
+
+    # Back in document order, with a gap marker where passages were left out
+    lines, used = [], []
+    for chunk_number, passage_number, passage in sorted(chosen):
+        if not used or used[-1][0] != chunk_number:
+            lines.append(f'- {passage}')
+            used.append((chunk_number, passage_number))
+        else:
+            separator = ' ' if used[-1][1] == passage_number - 1 else ' … '
+            lines[-1] += separator + passage
+            used[-1] = (chunk_number, passage_number)
+    return '\n'.join(lines), sorted({chunk_number for chunk_number, _, _ in chosen})
+
+
+class ChatSession:
+    """Recent messages verbatim plus a rolling summary of the older ones."""
+
+    def __init__(self, recent_messages=None):
+        self.recent = deque()
+        self.summary_lines = deque()
+        self.recent_limit = recent_messages or settings.CHATBOT_HISTORY_MESSAGES
+
+    @property
+    def summary(self):
+        return '\n'.join(self.summary_lines)
+
+    def add_turn(self, query, response):
+        self.recent.append({'role': 'user', 'content': query})
+        self.recent.append({'role': 'assistant', 'content': response})
+        while len(self.recent) > self.recent_limit:
+            message = self.recent.popleft()
+            speaker = 'User' if message['role'] == 'user' else 'Assistant'
+            self.summary_lines.append(f"{speaker}: {truncate(' '.join(message['content'].split()), SUMMARY_LINE_TOKENS)}")
+        while self.summary_lines and count_tokens(self.summary) > settings.CHATBOT_SUMMARY_TOKENS:
+            self.summary_lines.popleft()
+
+    def history(self):
+        return list(self.recent)
+
+
+def build_messages(query, retrieved, session=None, budget=None):
+    """
+    Chat messages for ``query`` within ``budget`` tokens (default
+    CHATBOT_PROMPT_TOKEN_BUDGET), and {'prompt_tokens', 'chunks_used'}.
+    ``retrieved`` is [(chunk, score)] from RAGChatbot.retrieve.
+    """
+    budget = budget or settings.CHATBOT_PROMPT_TOKEN_BUDGET
+    query_budget = int(budget * QUERY_SHARE)
+    if count_tokens(query) > query_budget:
+        # One endless "word" can't be cut at a word boundary
+        query = truncate(query, query_budget) or query[:query_budget]
+    summary = session.summary if session else ''
+    summary_text = f'\n\nEarlier in this conversation:\n{summary}' if summary else ''
+    knowledge_header = "\n\nHospital knowledge base (authoritative for hospital facts; do NOT invent facts beyond this):\n"
+    remaining = budget - count_tokens(SYSTEM_PROMPT + knowledge_header + NO_KNOWLEDGE + summary_text) \
+        - count_tokens(query) - 2 * MESSAGE_OVERHEAD
+
+    # Newest messages first; the oldest one that doesn't fit is trimmed, anything older dropped
+    history = []
+    history_budget = max(min(remaining, int(budget * HISTORY_SHARE)), 0)
+    for message in reversed(session.history() if session else []):
+        cost = count_tokens(message['content']) + MESSAGE_OVERHEAD
+        if cost > history_budget:
+            content = truncate(message['content'], history_budget - MESSAGE_OVERHEAD)
+            if content:
+                history.append({'role': message['role'], 'content': content})
+                history_budget = 0
+            break
+        history.append(message)
+        history_budget -= cost
+    history.reverse()
+    remaining -= sum(count_tokens(m['content']) + MESSAGE_OVERHEAD for m in history)
+
+    knowledge, chunks_used = select_context(query, retrieved, max(remaining, 0))
+    system = SYSTEM_PROMPT + knowledge_header + (knowledge or NO_KNOWLEDGE) + summary_text
+    messages = [{'role': 'system', 'content': system}, *history, {'role': 'user', 'content': query}]
+    return messages, {
+        'prompt_tokens': sum(count_tokens(m['content']) + MESSAGE_OVERHEAD for m in messages),
+        'chunks_used': chunks_used,
+    }
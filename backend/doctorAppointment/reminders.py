@@ -0,0 +1,121 @@
+"""
+Appointment reminders.
+
+Celery beat runs ``sweep_reminders`` every few minutes. For each lead time
+it pages through booked appointments starting inside that lead's window
+(keyset pagination over the ``appointment_upcoming_idx`` index), records an
+``AppointmentReminder`` row per appointment and dispatches one notification
+task per page. ``queue_reminders`` claims the unqueued ledger rows of a page
+under a row lock and writes the emails to the outbox in the same
+transaction, so a reminder is queued exactly once even if a page is
+dispatched twice.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import Appointment, AppointmentReminder
+from .notifications import queue_email, reminder_email
+
+# Longest lead first; each lead's window ends where the next one begins. A lead
+# only applies to appointments booked at least that long before they start, so
+# one booked less than 24h ahead only gets the 1h reminder.
+REMINDER_LEADS = (
+    ('24h', timedelta(hours=24), 'in 24 hours'),
+    ('1h', timedelta(hours=1), 'in 1 hour'),
+)
+LEAD_LABELS = {lead: label for lead, _, label in REMINDER_LEADS}
+
+
+def reminder_window(lead, now):
+    """(after, until] bounds of ``starts_at`` for appointments due a ``lead`` reminder."""
+    leads = [delta for _, delta, _ in REMINDER_LEADS]
+    index = [key for key, _, _ in REMINDER_LEADS].index(lead)
+    after = now + leads[index + 1] if index + 1 < len(leads) else now
+    return after, now + leads[index]
+
+
+def due_pages(lead, now, page_size):
+    """Yield lists of appointment ids whose ``lead`` reminder has not been queued yet."""
+    after, until = reminder_window(lead, now)
+    delta = next(delta for key, delta, _ in REMINDER_LEADS if key == lead)
+    queued = AppointmentReminder.objects.filter(
+        appointment=OuterRef('pk'), lead=lead, queued_at__isnull=False
+    )
+    due = (
+        Appointment.objects.filter(status='Booked', starts_at__gt=after, starts_at__lte=until,
+                                   booked_at__lte=F('starts_at') - delta)
+        .filter(~Exists(queued))
+        .order_by('starts_at', 'id')
+    )
+    cursor = None
+    while True:
+        page = due
+        if cursor:
+            page = page.filter(Q(starts_at__gt=cursor[0]) | Q(starts_at=cursor[0], id__gt=cursor[1]))
+        rows = list(page.values_list('starts_at', 'id')[:page_size])
+        if not rows:
+            return
+        yield [appointment_id for _, appointment_id in rows]
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1]
+
+
+def sweep_reminders(dispatch, now=None, page_size=None):
+    """
+    Record and dispatch the reminders that are due. ``dispatch(lead, ids)`` is
+    called once per page. Returns {lead: {'appointments': n, 'pages': n}}.
+    """
+    now = now or timezone.now()
+    page_size = page_size or settings.REMINDER_PAGE_SIZE
+    result = {}
+    for lead, _, _ in REMINDER_LEADS:
+        totals = {'appointments': 0, 'pages': 0}
+        for ids in due_pages(lead, now, page_size):
+            # Rows already in the ledger but never queued (lost task) are dispatched again
+            AppointmentReminder.objects.bulk_create(
+                [AppointmentReminder(appointment_id=appointment_id, lead=lead) for appointment_id in ids],
+                ignore_conflicts=True,
+            )
+            dispatch(lead, ids)
+            totals['appointments'] += len(ids)
+            totals['pages'] += 1
+        result[lead] = totals
+    return result
+
+
+def queue_reminders(lead, appointment_ids, now=None):
+    """
+    Queue the ``lead`` reminder emails for one page of appointments.
+    Returns {'queued': n, 'skipped': n}; rows claimed by another worker are left to it.
+    """
+    now = now or timezone.now()
+    result = {'queued': 0, 'skipped': 0}
+    with transaction.atomic():
+        claimed = list(
+            AppointmentReminder.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(lead=lead, appointment_id__in=appointment_ids, queued_at__isnull=True)
+            .select_related('appointment__patient__user', 'appointment__doctor')
+        )
+        for reminder in claimed:
+            appointment = reminder.appointment
+            if appointment.status != 'Booked' or appointment.starts_at <= now:
+                result['skipped'] += 1
+                continue
+            subject, body = reminder_email(appointment, LEAD_LABELS[lead])
+            user = appointment.patient.user
+            if queue_email('appointment_reminder', user.email, subject, body,
+                           user=user, appointment=appointment, flush=False):
+                result['queued'] += 1
+            else:
+                result['skipped'] += 1
+        if claimed:
+            AppointmentReminder.objects.filter(id__in=[reminder.id for reminder in claimed]).update(queued_at=now)
+        if result['queued']:
+            from .tasks import send_queued_emails
+            transaction.on_commit(lambda: send_queued_emails.delay(), robust=True)
+    return result
@@ -0,0 +1,81 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless a view opts in with ``@use_replica``; then,
+for the rest of that request, reads are sent to one of
+``settings.DATABASE_REPLICAS``. Writes always go to the primary.
+
+Read-your-writes: any write made while serving an authenticated user pins
+that user to the primary for ``DB_REPLICA_STICKY_SECONDS`` (via the cache,
+which must be shared between web processes, e.g. CACHE_REDIS_URL), so a
+patient who just booked never sees a replica's older slot list. Within the
+request that wrote, later reads also stay on the primary.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+_wrote = ContextVar('replica_wrote', default=False)
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _wrote.get():
+            return 'default'
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def use_replica(view_method):
+    """Serve an APIView method's reads from a replica, unless the user is pinned to the primary."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or is_pinned(request.user):
+            return view_method(self, request, *args, **kwargs)
+        token = _read_alias.set(random.choice(replicas))
+        try:
+            return view_method(self, request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pins users who wrote during a request to the primary for a few seconds."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if _wrote.get() and getattr(settings, 'DATABASE_REPLICAS', None) and user and user.is_authenticated:
+                cache.set(_pin_key(user.pk), 1, settings.DB_REPLICA_STICKY_SECONDS)
+            return response
+        finally:
+            _wrote.reset(token)
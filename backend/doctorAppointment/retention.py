@@ -0,0 +1,220 @@
+"""
+Retention for the append-only audit tables.
+
+``archive_before`` moves rows older than a cutoff into a gzipped NDJSON
+file, a batch at a time: each batch is written and flushed to disk before
+it is deleted, and every delete is its own short statement, so the table is
+never locked for long. A crash between the two steps can repeat a batch in
+the next run's file, but never loses rows.
+
+On PostgreSQL ``LoginInfo`` can be converted to a table partitioned by month
+(``partition_table``). Months entirely past the cutoff are then archived and
+dropped as whole partitions instead of being deleted row by row.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Log, LoginInfo
+
+DEFAULT_BATCH_SIZE = 5000
+
+# name -> (model, time field, settings key holding the retention in days)
+RETENTION_POLICIES = {
+    'log': (Log, 'timestamp', 'LOG_RETENTION_DAYS'),
+    'logininfo': (LoginInfo, 'login_time', 'LOGIN_INFO_RETENTION_DAYS'),
+}
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _next_month(value):
+    return _month_start(datetime(value.year + value.month // 12, value.month % 12 + 1, 1))
+
+
+def partitions(model):
+    """[(name, lower, upper)] of a monthly partitioned table, oldest first; [] if not partitioned."""
+    if connection.vendor != 'postgresql':
+        return []
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)', [table]
+        )
+        names = sorted(name for name, in cursor.fetchall() if name.startswith(f'{table}_p'))
+    result = []
+    for name in names:
+        lower = datetime.strptime(name.rsplit('_p', 1)[1], '%Y%m').replace(tzinfo=dt_timezone.utc)
+        result.append((name, lower, _next_month(lower)))
+    return result
+
+
+def ensure_partitions(model, months_ahead=3):
+    """
+    Create the missing monthly partitions up to ``months_ahead`` from now and
+    return how many were created. No-op if not partitioned.
+    """
+    existing = partitions(model)
+    if not existing:
+        return 0
+    table = model._meta.db_table
+    quote = connection.ops.quote_name
+    names = {name for name, _, _ in existing}
+    # From the current month, or from the end of the partitions if they stop short of it
+    month = min(existing[-1][2], _month_start(timezone.now()))
+    until = _month_start(timezone.now())
+    for _ in range(months_ahead):
+        until = _next_month(until)
+    created = 0
+    with connection.cursor() as cursor:
+        while month <= until:
+            upper = _next_month(month)
+            name = f'{table}_p{month:%Y%m}'
+            if name not in names:
+                # IF NOT EXISTS: a concurrent run may have just created it
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} '
+                    f'FOR VALUES FROM (%s) TO (%s)', [month, upper]
+                )
+                created += 1
+            month = upper
+    return created
+
+
+def partition_table(model, time_field, months_ahead=3):
+    """
+    Rebuild ``model``'s table as a PostgreSQL table partitioned by month on
+    ``time_field``, copying the existing rows. Runs in one transaction and
+    holds an exclusive lock on the table while it copies; run it in a
+    maintenance window. The primary key becomes (id, time_field), so the table
+    must not be the target of foreign keys.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError('Partitioning needs PostgreSQL.')
+    if partitions(model):
+        return False
+    table = model._meta.db_table
+    old = f'{table}_unpartitioned'
+    quote = connection.ops.quote_name
+    column = model._meta.get_field(time_field).column
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT min({quote(column)}) FROM {quote(table)}')
+        first = cursor.fetchone()[0] or timezone.now()
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f'PARTITION BY RANGE ({quote(column)})'
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, {quote(column)})')
+        for field in model._meta.concrete_fields:
+            if field.db_index or field.is_relation:
+                cursor.execute(f'CREATE INDEX ON {quote(table)} ({quote(field.column)})')
+            if field.is_relation:
+                target = field.related_model._meta.db_table
+                cursor.execute(
+                    f'ALTER TABLE {quote(table)} ADD FOREIGN KEY ({quote(field.column)}) '
+                    f'REFERENCES {quote(target)} (id) DEFERRABLE INITIALLY DEFERRED'
+                )
+        month = _month_start(first)
+        until = _month_start(timezone.now())
+        for _ in range(months_ahead):
+            until = _next_month(until)
+        while month <= until:
+            cursor.execute(
+                f'CREATE TABLE {quote(f"{table}_p{month:%Y%m}")} PARTITION OF {quote(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)', [month, _next_month(month)]
+            )
+            month = _next_month(month)
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {quote(table)}",
+            [table]
+        )
+        cursor.execute(f'DROP TABLE {quote(old)}')
+    return True
+
+
+class _Archive:
+    """Gzipped NDJSON file that is flushed to disk after every batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._raw = None
+
+    def write(self, rows):
+        if self._raw is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._raw = open(self.path, 'wb')
+            self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._gzip.write(''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows).encode())
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self.rows += len(rows)
+
+    def close(self):
+        if self._raw is not None:
+            self._gzip.close()
+            self._raw.close()
+
+
+def _batches(queryset, batch_size):
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.order_by('pk').values()[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1]['id']
+
+
+def archive_before(name, cutoff, directory=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Archive and delete the ``name`` policy's rows older than ``cutoff``.
+    Returns {'archived': n, 'dropped_partitions': [...], 'path': str or None}.
+    """
+    model, time_field, _ = RETENTION_POLICIES[name]
+    old = model.objects.filter(**{f'{time_field}__lt': cutoff})
+    if dry_run:
+        return {'archived': old.count(), 'dropped_partitions': [], 'path': None}
+
+    directory = directory or settings.RETENTION_ARCHIVE_DIR
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    archive = _Archive(os.path.join(str(directory), f'{model._meta.db_table}-{stamp}.ndjson.gz'))
+    dropped = []
+    quote = connection.ops.quote_name
+    try:
+        for partition, lower, upper in partitions(model):
+            if upper > cutoff:
+                break
+            in_partition = model.objects.filter(**{f'{time_field}__gte': lower, f'{time_field}__lt': upper})
+            for rows in _batches(in_partition, batch_size):
+                archive.write(rows)
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {quote(model._meta.db_table)} DETACH PARTITION {quote(partition)}')
+                cursor.execute(f'DROP TABLE {quote(partition)}')
+            dropped.append(partition)
+        for rows in _batches(old, batch_size):
+            archive.write(rows)
+            model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    finally:
+        archive.close()
+    return {'archived': archive.rows, 'dropped_partitions': dropped, 'path': archive.path if archive.rows else None}
+
+
+def retention_cutoff(name, days=None):
+    _, _, setting = RETENTION_POLICIES[name]
+    days = days if days is not None else getattr(settings, setting)
+    return timezone.now() - timedelta(days=days)
@@ -0,0 +1,271 @@
+"""
+Admin search and autocomplete over patients, doctors and their appointments.
+
+Covered fields: patient name and phone number, doctor name and
+specialization, and the account email of both.
+
+On PostgreSQL every field has a pg_trgm GIN index on ``UPPER(field)``, which
+serves both the substring ``LIKE`` used for prefix/autocomplete matches and
+the ``<%`` word-similarity operator used for typo-tolerant name matches.
+Each field is probed by its own branch of a UNION so every branch can use its
+index; rows are ranked by word similarity.
+
+SQLite has neither, so each entity gets an FTS5 shadow table with prefix
+indexes (``search_patient`` / ``search_doctor``, rowid = the profile id),
+kept in sync by triggers on the profile, user and specialization tables.
+Triggers rather than save signals, so ``bulk_create`` (bulk import, seeders)
+and queryset ``update()`` are indexed too. Queries match every typed token
+as a prefix; the first ``SQLITE_CANDIDATES`` matches are ranked by bm25.
+There is no typo tolerance in this mode. As with the overlap guards, SQLite
+drops the triggers when Django rebuilds a table, so ``reinstall_search``
+runs after every migrate and rebuilds the index if any trigger had gone
+missing.
+"""
+import re
+
+from django.db import connections, router
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Q
+
+from .models import Appointment, Doctor, Patient
+from .overview import APPOINTMENT_OVERVIEW_ROWS, ORDERING
+from .projections import DOCTOR_ROWS, PATIENT_ROWS
+
+SEARCH_MIGRATION = ('doctorAppointment', '0018_search_specialization')
+KINDS = ('patient', 'doctor', 'appointment')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+USERS = '"doctorAppointment_user"'
+PATIENTS = '"doctorAppointment_patient"'
+DOCTORS = '"doctorAppointment_doctor"'
+SPECIALIZATIONS = '"doctorAppointment_specialization"'
+
+# FTS5 splits "555-0100" into two tokens; index the digits-only form as well
+# so a typed phone prefix matches however the number was formatted
+_PHONE_DIGITS = "replace(replace(replace(replace(replace(replace({0}, '-', ''), ' ', ''), '(', ''), ')', ''), '.', ''), '+', '')"
+
+
+def _phone(column):
+    return f"{column} || ' ' || {_PHONE_DIGITS.format(column)}"
+
+
+FTS_TABLES = {
+    'search_patient': 'name, phone_number, email',
+    'search_doctor': 'name, specialization, email',
+}
+# Prefix indexes up to 5 characters: longer prefixes expand to few enough tokens
+FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3 4 5'"
+SQLITE_CANDIDATES = 200
+
+_INDEX_PATIENT = f"""
+    INSERT INTO search_patient (rowid, name, phone_number, email)
+    SELECT NEW.id, NEW.name, {_phone('NEW.phone_number')}, u.email FROM {USERS} u WHERE u.id = NEW.user_id;
+"""
+_INDEX_DOCTOR = f"""
+    INSERT INTO search_doctor (rowid, name, specialization, email)
+    SELECT NEW.id, NEW.name, (SELECT s.name FROM {SPECIALIZATIONS} s WHERE s.id = NEW.specialization_id), u.email
+    FROM {USERS} u WHERE u.id = NEW.user_id;
+"""
+
+SQLITE_TRIGGERS = {
+    'search_patient_insert': f'AFTER INSERT ON {PATIENTS} BEGIN {_INDEX_PATIENT} END',
+    'search_patient_update': (
+        f'AFTER UPDATE OF name, phone_number, user_id ON {PATIENTS} BEGIN '
+        f'DELETE FROM search_patient WHERE rowid = OLD.id; {_INDEX_PATIENT} END'
+    ),
+    'search_patient_delete': f'AFTER DELETE ON {PATIENTS} BEGIN DELETE FROM search_patient WHERE rowid = OLD.id; END',
+    'search_doctor_insert': f'AFTER INSERT ON {DOCTORS} BEGIN {_INDEX_DOCTOR} END',
+    'search_doctor_update': (
+        f'AFTER UPDATE OF name, specialization_id, user_id ON {DOCTORS} BEGIN '
+        f'DELETE FROM search_doctor WHERE rowid = OLD.id; {_INDEX_DOCTOR} END'
+    ),
+    'search_doctor_delete': f'AFTER DELETE ON {DOCTORS} BEGIN DELETE FROM search_doctor WHERE rowid = OLD.id; END',
+    'search_user_email': (
+        f'AFTER UPDATE OF email ON {USERS} BEGIN '
+        f'UPDATE search_patient SET email = NEW.email WHERE rowid IN (SELECT id FROM {PATIENTS} WHERE user_id = NEW.id); '
+        f'UPDATE search_doctor SET email = NEW.email WHERE rowid IN (SELECT id FROM {DOCTORS} WHERE user_id = NEW.id); '
+        'END'
+    ),
+    'search_specialization_name': (
+        f'AFTER UPDATE OF name ON {SPECIALIZATIONS} BEGIN '
+        f'UPDATE search_doctor SET specialization = NEW.name '
+        f'WHERE rowid IN (SELECT id FROM {DOCTORS} WHERE specialization_id = NEW.id); '
+        'END'
+    ),
+}
+
+SQLITE_REBUILD = [
+    'DELETE FROM search_patient',
+    f"""INSERT INTO search_patient (rowid, name, phone_number, email)
+        SELECT p.id, p.name, {_phone('p.phone_number')}, u.email
+        FROM {PATIENTS} p JOIN {USERS} u ON u.id = p.user_id""",
+    'DELETE FROM search_doctor',
+    f"""INSERT INTO search_doctor (rowid, name, specialization, email)
+        SELECT d.id, d.name, s.name, u.email
+        FROM {DOCTORS} d JOIN {USERS} u ON u.id = d.user_id
+        LEFT JOIN {SPECIALIZATIONS} s ON s.id = d.specialization_id""",
+]
+
+POSTGRES_INDEXES = [
+    ('search_patient_name_trgm', PATIENTS, 'name'),
+    ('search_patient_phone_trgm', PATIENTS, 'phone_number'),
+    ('search_doctor_name_trgm', DOCTORS, 'name'),
+    ('search_specialization_name_trgm', SPECIALIZATIONS, 'name'),
+    ('search_user_email_trgm', USERS, 'email'),
+]
+_USER = f'JOIN {USERS} u ON u.id = t.user_id'
+# kind -> (table t, [(column, join, fuzzy)]); fuzzy columns are also matched by word similarity
+POSTGRES_FIELDS = {
+    'patient': (PATIENTS, [('t.name', '', True), ('t.phone_number', '', False), ('u.email', _USER, False)]),
+    'doctor': (DOCTORS, [
+        ('t.name', '', True),
+        ('s.name', f'JOIN {SPECIALIZATIONS} s ON s.id = t.specialization_id', True),
+        ('u.email', _USER, False),
+    ]),
+}
+
+
+def install_search(connection, rebuild=False):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name, table, column in POSTGRES_INDEXES:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}) gin_trgm_ops)')
+        elif connection.vendor == 'sqlite':
+            for table, columns in FTS_TABLES.items():
+                cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns}, {FTS_OPTIONS})')
+            for name, body in SQLITE_TRIGGERS.items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+            if rebuild:
+                for statement in SQLITE_REBUILD:
+                    cursor.execute(statement)
+
+
+def remove_search(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for name, _, _ in POSTGRES_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            for table in FTS_TABLES:
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+def reinstall_search(using='default', **kwargs):
+    """post_migrate handler: restore triggers lost to SQLite table rebuilds and re-sync the index."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if SEARCH_MIGRATION not in MigrationRecorder(connection).applied_migrations():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'search\\_%' ESCAPE '\\'")
+        present = {row[0] for row in cursor.fetchall()}
+    # Rows written while a trigger was missing never reached the index
+    install_search(connection, rebuild=not set(SQLITE_TRIGGERS) <= present)
+
+
+def fts_query(text):
+    """FTS5 MATCH expression requiring every token of ``text`` as a prefix, or '' if it has none."""
+    tokens = re.findall(r'\w+', text)
+    if not re.search(r'[^\W\d_]', text) and len(tokens) > 1:
+        # A formatted phone number: match the digits-only form
+        tokens = [''.join(tokens)]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _like_pattern(text):
+    escaped = text.upper().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _sqlite_ids(connection, kind, text, limit):
+    match = fts_query(text)
+    if not match:
+        return []
+    # ORDER BY rank would score every match (all 1M rows for "5"); score the
+    # first candidates in rowid order instead and rank those
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid, bm25(search_{kind}) FROM search_{kind} WHERE search_{kind} MATCH %s LIMIT %s',
+                       [match, max(limit, SQLITE_CANDIDATES)])
+        return [pk for pk, _ in sorted(cursor.fetchall(), key=lambda row: row[1])[:limit]]
+
+
+def _postgres_ids(connection, kind, text, limit):
+    table, columns = POSTGRES_FIELDS[kind]
+    like = _like_pattern(text)
+    branches, params = [], []
+    for column, join, fuzzy in columns:
+        condition = f'UPPER({column}) LIKE %s'
+        params += [text, like]
+        if fuzzy:
+            condition += f' OR UPPER(%s) <%% UPPER({column})'
+            params.append(text)
+        branches.append(f'SELECT t.id, word_similarity(%s, {column}) AS score FROM {table} t {join} WHERE {condition}')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM ({" UNION ALL ".join(branches)}) matches '
+            'GROUP BY id ORDER BY MAX(score) DESC, id LIMIT %s',
+            params + [limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _generic_ids(kind, text, limit):
+    model, fields = {
+        'patient': (Patient, ['name', 'phone_number', 'user__email']),
+        'doctor': (Doctor, ['name', 'specialization__name', 'user__email']),
+    }[kind]
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': text})
+    return list(model.objects.filter(condition).order_by('id').values_list('id', flat=True)[:limit])
+
+
+def matching_ids(kind, text, limit=DEFAULT_LIMIT, using='default'):
+    """Ids of the best ``limit`` patients or doctors matching ``text``, best first."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        return _sqlite_ids(connection, kind, text, limit)
+    if connection.vendor == 'postgresql':
+        return _postgres_ids(connection, kind, text, limit)
+    return _generic_ids(kind, text, limit)
+
+
+def _in_order(rows, ids):
+    position = {pk: i for i, pk in enumerate(ids)}
+    return sorted(rows, key=lambda row: position[row['id']])
+
+
+def search(text, kinds=KINDS, limit=DEFAULT_LIMIT, using=None):
+    """
+    Best matches for ``text`` per kind, as {kind + 's': rows}. Appointments
+    are the most recent ones of the matched patients and doctors. Raw queries
+    bypass the router, so the read alias (a replica under @use_replica) is
+    resolved here.
+    """
+    using = using or router.db_for_read(Patient)
+    text = text.strip()
+    results = {}
+    ids = {}
+    for kind in ('patient', 'doctor'):
+        if kind in kinds or 'appointment' in kinds:
+            ids[kind] = matching_ids(kind, text, limit, using=using) if text else []
+    if 'patient' in kinds:
+        rows = PATIENT_ROWS.rows(Patient.objects.using(using).filter(id__in=ids['patient']))
+        results['patients'] = _in_order(rows, ids['patient'])
+    if 'doctor' in kinds:
+        rows = DOCTOR_ROWS.rows(Doctor.objects.using(using).filter(id__in=ids['doctor']))
+        results['doctors'] = _in_order(rows, ids['doctor'])
+    if 'appointment' in kinds:
+        rows = []
+        if ids['patient'] or ids['doctor']:
+            queryset = Appointment.objects.using(using).filter(
+                Q(patient_id__in=ids['patient']) | Q(doctor_id__in=ids['doctor'])
+            ).order_by(*ORDERING)[:limit]
+            rows = APPOINTMENT_OVERVIEW_ROWS.rows(queryset)
+        results['appointments'] = rows
+    return results
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.db import transaction
 from .models import User, Doctor, Patient, AppointmentSlot, Appointment
+from .specializations import resolve
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,32 +29,34 @@ class RegisterSerializer(serializers.ModelSerializer):
         specialization = validated_data.pop('specialization', '')
         
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
-        
-        # Create profile based on role
-        if user.role == 'doctor':
-            from .models import Doctor
-            Doctor.objects.create(
-                user=user,
-                name=validated_data.get('first_name', ''),
-                specialization=specialization
-            )
-        elif user.role == 'patient':
-            from .models import Patient
-            Patient.objects.create(
-                user=user,
-                name=validated_data.get('first_name', ''),
-                phone_number=phone_number
-            )
+        # User and profile are created together or not at all; no savepoint
+        # is needed when the caller already opened a transaction.
+        with transaction.atomic(savepoint=False):
+            user = User.objects.create_user(**validated_data)
+
+            # Create profile based on role
+            if user.role == 'doctor':
+                Doctor.objects.create(
+                    user=user,
+                    name=validated_data.get('first_name', ''),
+                    specialization=resolve(specialization)
+                )
+            elif user.role == 'patient':
+                Patient.objects.create(
+                    user=user,
+                    name=validated_data.get('first_name', ''),
+                    phone_number=phone_number
+                )
         
         return user
 
 class DoctorSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    specialization = serializers.SlugRelatedField(slug_field='name', read_only=True)
 
     class Meta:
         model = Doctor
-        fields = ['id', 'user', 'name', 'specialization']
+        fields = ['id', 'user', 'name', 'specialization', 'specialization_id']
 
 class PatientSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -0,0 +1,103 @@
+"""
+Specialization catalog: normalizing free-text input and the facet counts
+behind the patient slot filter.
+
+Doctors reference a ``Specialization`` row instead of storing free text, so
+"Cardiology", "cardiology " and "Cardiologist" are one specialty and
+filtering by it is an indexed id comparison. Every write path turns the text
+it receives into a row with ``resolve()``.
+
+``facets()`` returns each specialization with its doctor count and the
+number of open future slots, from one aggregate query cached for
+``SPECIALIZATION_FACETS_TTL`` seconds. Counts move with every booking and
+signup, so they are allowed to lag by that much; a new specialization clears
+the cache so it is listed at once.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AppointmentSlot, Doctor, Specialization
+
+FACETS_CACHE_KEY = 'specialization-facets'
+
+# Spellings that the suffix rules below don't reach, keyed by casefolded text
+ALIASES = {
+    'gp': 'General',
+    'general practice': 'General',
+    'general practitioner': 'General',
+    'general physician': 'General',
+    'pediatrician': 'Pediatrics',
+    'paediatrics': 'Pediatrics',
+    'paediatrician': 'Pediatrics',
+    'orthopedist': 'Orthopedics',
+    'orthopaedics': 'Orthopedics',
+    'orthopedic surgeon': 'Orthopedics',
+    'ent': 'ENT',
+}
+# Practitioner -> field: cardiologist -> cardiology, psychiatrist -> psychiatry
+SUFFIXES = [(re.compile(r'ologist$'), 'ology'), (re.compile(r'iatrist$'), 'iatry')]
+LOWERCASE_WORDS = {'and', 'of', 'the', 'in'}
+
+
+def normalize(text):
+    """Canonical name for free-text ``text``, or '' if it is blank."""
+    key = ' '.join((text or '').split()).casefold()
+    if not key:
+        return ''
+    if key in ALIASES:
+        return ALIASES[key]
+    for pattern, replacement in SUFFIXES:
+        key = pattern.sub(replacement, key)
+    if key in ALIASES:
+        return ALIASES[key]
+    words = key.split(' ')
+    return ' '.join(
+        word if i and word in LOWERCASE_WORDS else word[:1].upper() + word[1:]
+        for i, word in enumerate(words)
+    )
+
+
+def resolve(text):
+    """The Specialization for free-text ``text`` (created if new), or None if it is blank."""
+    name = normalize(text)
+    if not name:
+        return None
+    specialization, created = Specialization.objects.get_or_create(name=name)
+    if created:
+        invalidate_facets()
+    return specialization
+
+
+def invalidate_facets():
+    cache.delete(FACETS_CACHE_KEY)
+
+
+def facets():
+    """[{id, name, doctors, free_slots}] for every specialization, by name; cached."""
+    today = timezone.localdate()
+    cached = cache.get(FACETS_CACHE_KEY)
+    # Free slots are counted from today, so yesterday's entry is stale regardless of age
+    if cached is not None and cached['date'] == today:
+        return cached['rows']
+    # Correlated subqueries rather than joins: the slot count walks the
+    # (doctor, date) index from today instead of every slot ever created
+    doctor_count = (Doctor.objects.filter(specialization=OuterRef('pk')).order_by()
+                    .values('specialization').annotate(count=Count('id')).values('count'))
+    free_slots = (AppointmentSlot.objects.filter(doctor__specialization=OuterRef('pk'), is_booked=False,
+                                                 date__gte=today)
+                  .order_by().values('doctor__specialization').annotate(count=Count('id')).values('count'))
+    rows = list(
+        Specialization.objects.annotate(
+            doctor_count=Coalesce(Subquery(doctor_count), 0),
+            free_slots=Coalesce(Subquery(free_slots), 0),
+        ).order_by('name').values_list('id', 'name', 'doctor_count', 'free_slots')
+    )
+    rows = [{'id': pk, 'name': name, 'doctors': doctors, 'free_slots': free_slots}
+            for pk, name, doctors, free_slots in rows]
+    cache.set(FACETS_CACHE_KEY, {'date': today, 'rows': rows}, settings.SPECIALIZATION_FACETS_TTL)
+    return rows
@@ -0,0 +1,43 @@
+"""
+Serving the built React frontend (``FRONTEND_DIST``) next to the API.
+
+build.sh runs ``vite build`` and writes ``.br``/``.gz`` siblings for every
+file in the bundle; WhiteNoise picks the variant the client accepts. Vite
+puts a content hash in every file under ``/assets/``, so those are cached
+for a year as immutable, like collectstatic's manifest names. The entry
+points that reference them (index.html, the service worker and the PWA
+manifest) keep their names across deploys and must be revalidated on every
+load, otherwise clients keep booting the previous bundle.
+"""
+import re
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Vite's default output name: assets/<name>-<8 char base64url hash>.<ext>
+VITE_ASSET = re.compile(r'^/assets/.+-[\w-]{8}\.\w+$')
+REVALIDATE_FILES = {'index.html', 'sw.js', 'registerSW.js', 'manifest.webmanifest'}
+
+
+class FrontendWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also treats hashed Vite assets as immutable; see the module docstring."""
+
+    def immutable_file_test(self, path, url):
+        return bool(VITE_ASSET.match(url)) or super().immutable_file_test(path, url)
+
+    def add_cache_headers(self, headers, path, url):
+        if url.rsplit('/', 1)[-1] in REVALIDATE_FILES or url.endswith('/'):
+            headers['Cache-Control'] = 'no-cache'
+        else:
+            super().add_cache_headers(headers, path, url)
+
+
+def frontend_index(request):
+    """index.html for client-side routes (/login, /patient/dashboard, ...) so deep links and reloads work."""
+    index = settings.FRONTEND_DIST / 'index.html'
+    if not index.is_file():
+        raise Http404('The frontend has not been built.')
+    response = HttpResponse(index.read_bytes(), content_type='text/html; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,217 @@
+"""
+Rollup maintenance and queries for the admin statistics endpoints.
+
+Counters are pre-aggregated into hourly and daily ``StatsBucket`` rows so the
+stats views never scan ``LoginInfo`` or ``Appointment`` directly.  Buckets are
+recomputed from the source tables by the ``rollup_stats`` periodic task;
+recomputing a bucket is idempotent, so overlapping windows are harmless.
+Distinct counts don't add up across buckets, so the daily rollup also keeps
+the set of users seen each day (``StatsDailyUser``); those outlive the
+LoginInfo rows that retention archives.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Appointment, LoginInfo, StatsBucket, StatsDailyUser
+
+GRANULARITY_STEP = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+_TRUNC = {
+    'hour': TruncHour,
+    'day': TruncDay,
+}
+# Counters derived from the source tables on every rollup
+LOGIN_FIELDS = ('logins', 'registrations', 'unique_users')
+APPOINTMENT_FIELDS = ('bookings', 'cancellations', 'visits')
+
+
+def floor_bucket(value, granularity):
+    value = timezone.localtime(value)
+    if granularity == 'day':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _aggregate_window(granularity, start, end):
+    """Return {(bucket_start, doctor_id): {field: count}} for [start, end)."""
+    trunc = _TRUNC[granularity]
+    counters = {}
+
+    login_rows = (
+        LoginInfo.objects.filter(login_time__gte=start, login_time__lt=end)
+        .annotate(bucket=trunc('login_time'))
+        .values('bucket')
+        .annotate(
+            logins=Count('id', filter=Q(login_type='login')),
+            registrations=Count('id', filter=Q(login_type='registration')),
+            unique_users=Count('user', distinct=True),
+        )
+        .order_by()
+    )
+    for row in login_rows:
+        bucket = counters.setdefault((row['bucket'], None), {})
+        for field in LOGIN_FIELDS:
+            bucket[field] = row[field]
+
+    for field, column in (('bookings', 'booked_at'), ('cancellations', 'canceled_at'), ('visits', 'visited_at')):
+        rows = (
+            Appointment.objects.filter(**{f'{column}__gte': start, f'{column}__lt': end})
+            .annotate(bucket=trunc(column))
+            .values('bucket', 'doctor_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            per_doctor = counters.setdefault((row['bucket'], row['doctor_id']), {})
+            per_doctor[field] = per_doctor.get(field, 0) + row['total']
+            sitewide = counters.setdefault((row['bucket'], None), {})
+            sitewide[field] = sitewide.get(field, 0) + row['total']
+
+    return counters
+
+
+def rebuild_buckets(granularity, start, end):
+    """
+    Recompute the counters of every ``granularity`` bucket in [start, end).
+    Existing buckets without activity in the window are reset to zero.
+    Returns the number of bucket rows written.
+    """
+    start = floor_bucket(start, granularity)
+    counters = _aggregate_window(granularity, start, end)
+    recomputed = LOGIN_FIELDS + APPOINTMENT_FIELDS
+
+    with transaction.atomic():
+        existing = {
+            (bucket.bucket_start, bucket.doctor_id): bucket
+            for bucket in StatsBucket.objects.select_for_update().filter(
+                granularity=granularity, bucket_start__gte=start, bucket_start__lt=end
+            )
+        }
+        to_create, to_update = [], []
+        for key in existing.keys() | counters.keys():
+            values = counters.get(key, {})
+            bucket = existing.get(key)
+            if bucket is None:
+                bucket = StatsBucket(granularity=granularity, bucket_start=key[0], doctor_id=key[1])
+                to_create.append(bucket)
+            else:
+                to_update.append(bucket)
+            for field in recomputed:
+                setattr(bucket, field, values.get(field, 0))
+        StatsBucket.objects.bulk_create(to_create)
+        StatsBucket.objects.bulk_update(to_update, recomputed)
+        if granularity == 'day':
+            _rebuild_daily_users(start, end)
+    return len(to_create) + len(to_update)
+
+
+def _rebuild_daily_users(start, end):
+    window = {'bucket_start__gte': start, 'bucket_start__lt': end}
+    StatsDailyUser.objects.filter(**window).delete()
+    rows = (
+        LoginInfo.objects.filter(login_time__gte=start, login_time__lt=end)
+        .annotate(bucket_start=TruncDay('login_time'))
+        .values_list('bucket_start', 'user_id')
+        .distinct()
+        .order_by()
+    )
+    StatsDailyUser.objects.bulk_create(
+        (StatsDailyUser(bucket_start=day, user_id=user_id) for day, user_id in rows.iterator()), batch_size=2000
+    )
+
+
+def rollup_range(start, end):
+    """Refresh the hourly and daily buckets that overlap [start, end)."""
+    hour_end = floor_bucket(end, 'hour') + GRANULARITY_STEP['hour']
+    day_end = floor_bucket(end, 'day') + GRANULARITY_STEP['day']
+    return rebuild_buckets('hour', start, hour_end) + rebuild_buckets('day', start, day_end)
+
+
+def parse_range(params):
+    """
+    Parse ``start``/``end`` query params (ISO dates or datetimes) into an
+    aware [start, end) window.  A plain ``end`` date is inclusive.
+    Raises ValueError on malformed input.
+    """
+    bounds = []
+    for name in ('start', 'end'):
+        raw = params.get(name)
+        if not raw:
+            bounds.append(None)
+            continue
+        value = parse_datetime(raw)
+        if value is None:
+            day = parse_date(raw)
+            if day is None:
+                raise ValueError(f"Invalid '{name}': expected YYYY-MM-DD or an ISO datetime")
+            if name == 'end':
+                day += timedelta(days=1)
+            value = datetime.combine(day, time.min)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        bounds.append(value)
+    if bounds[0] and bounds[1] and bounds[0] >= bounds[1]:
+        raise ValueError("'start' must be before 'end'")
+    return bounds
+
+
+def bucket_queryset(granularity, start=None, end=None, doctor_id=None):
+    buckets = StatsBucket.objects.filter(granularity=granularity)
+    if doctor_id is None:
+        buckets = buckets.filter(doctor__isnull=True)
+    else:
+        buckets = buckets.filter(doctor_id=doctor_id)
+    if start:
+        buckets = buckets.filter(bucket_start__gte=start)
+    if end:
+        buckets = buckets.filter(bucket_start__lt=end)
+    return buckets
+
+
+def summarize(fields, granularity='day', start=None, end=None, doctor_id=None):
+    """Sum ``fields`` over the buckets in [start, end)."""
+    totals = bucket_queryset(granularity, start, end, doctor_id).aggregate(
+        **{field: Sum(field) for field in fields}
+    )
+    return {field: totals[field] or 0 for field in fields}
+
+
+def distinct_users(start=None, end=None):
+    """
+    Users who logged in or registered on the days [start, end) touches, from
+    the daily user sets; a partial first or last day counts whole.
+    """
+    users = StatsDailyUser.objects.all()
+    if start:
+        users = users.filter(bucket_start__gte=floor_bucket(start, 'day'))
+    if end:
+        users = users.filter(bucket_start__lt=end)
+    return users.values('user').distinct().count()
+
+
+def doctor_breakdown(fields, granularity='day', start=None, end=None, doctor_id=None):
+    """Per-doctor sums of ``fields`` over the buckets in [start, end), optionally for one doctor."""
+    buckets = StatsBucket.objects.filter(granularity=granularity, doctor__isnull=False)
+    if doctor_id is not None:
+        buckets = buckets.filter(doctor_id=doctor_id)
+    if start:
+        buckets = buckets.filter(bucket_start__gte=start)
+    if end:
+        buckets = buckets.filter(bucket_start__lt=end)
+    return (
+        buckets.values('doctor_id', 'doctor__name')
+        .annotate(**{field: Sum(field) for field in fields})
+        .order_by('doctor_id')
+    )
+
+
+def series(fields, granularity='day', start=None, end=None, doctor_id=None):
+    rows = bucket_queryset(granularity, start, end, doctor_id).values('bucket_start', *fields)
+    return list(rows)
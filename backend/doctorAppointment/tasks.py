@@ -1,23 +1,30 @@
+from datetime import timedelta
+
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from .idempotency import purge_expired
 from .models import Log, User, LoginInfo
+from .notifications import deliver_due_emails, queue_email, welcome_email
+from .reminders import queue_reminders, sweep_reminders
+from .retention import ensure_partitions
+from .stats import rollup_range
+from .waitlist import expire_offers
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_welcome_email_and_log_registration(user_id):
     """
-    Sends a welcome email to the user and logs the registration event.
+    Queues a welcome email for the user and logs the registration event.
+    Delivery happens in batches through send_queued_emails.
     """
     try:
         user = User.objects.get(id=user_id)
-        subject = 'Welcome to Our Doctor Appointment Platform'
-        message = f'Hi {user.username},\n\nThank you for registering on our platform.'
-        from_email = settings.DEFAULT_FROM_EMAIL
-        recipient_list = [user.email]
-        send_mail(subject, message, from_email, recipient_list)
+        subject, message = welcome_email(user)
+        queue_email('welcome', user.email, subject, message, user=user)
         Log.objects.create(
             level='INFO',
-            message=f'User {user.username} registered successfully and welcome email sent.',
+            message=f'User {user.username} registered successfully and welcome email queued.',
             user=user
         )
     except User.DoesNotExist:
@@ -28,10 +35,10 @@ def send_welcome_email_and_log_registration(user_id):
     except Exception as e:
         Log.objects.create(
             level='ERROR',
-            message=f'Failed to send welcome email to user with id {user_id}: {e}'
+            message=f'Failed to queue welcome email for user with id {user_id}: {e}'
         )
 
-@shared_task
+@shared_task(ignore_result=True)
 def log_login_info(user_id, ip_address=None, user_agent=None, login_type='login'):
     """
     Logs user login information to the database.
@@ -59,3 +66,84 @@ def log_login_info(user_id, ip_address=None, user_agent=None, login_type='login'
             level='ERROR',
             message=f'Failed to log login info for user {user_id}: {e}'
         )
+
+@shared_task
+def rollup_stats(lookback_hours=None):
+    """
+    Refreshes the hourly/daily statistics buckets covering the recent window.
+    Scheduled by Celery beat; the lookback overlaps previous runs so late
+    writes are still picked up.
+    """
+    lookback_hours = lookback_hours or getattr(settings, 'STATS_ROLLUP_LOOKBACK_HOURS', 2)
+    now = timezone.now()
+    return rollup_range(now - timedelta(hours=lookback_hours), now)
+
+@shared_task(ignore_result=True)
+def expire_waitlist_offers():
+    """
+    Expires unclaimed waitlist offers and hands their slots to the next
+    patient in line. Scheduled by Celery beat.
+    """
+    return expire_offers()
+
+@shared_task(ignore_result=True, acks_late=True)
+def send_queued_emails(max_batches=10):
+    """
+    Delivers due outbox emails in batches, one SMTP connection per batch.
+    Triggered after emails are queued and by Celery beat for retries.
+    """
+    totals = {'sent': 0, 'failed': 0}
+    for _ in range(max_batches):
+        result = deliver_due_emails()
+        totals['sent'] += result['sent']
+        totals['failed'] += result['failed']
+        if not result['sent'] and not result['failed']:
+            break
+    return totals
+
+@shared_task(ignore_result=True, acks_late=True)
+def sweep_appointment_reminders():
+    """
+    Finds appointments due a 24h or 1h reminder and fans them out to
+    send_appointment_reminders, one task per page. Scheduled by Celery beat.
+    """
+    return sweep_reminders(dispatch=lambda lead, ids: send_appointment_reminders.delay(lead, ids))
+
+@shared_task(ignore_result=True, acks_late=True)
+def send_appointment_reminders(lead, appointment_ids):
+    """
+    Queues the reminder emails for one page of appointments; reminders that
+    were already queued are skipped.
+    """
+    return queue_reminders(lead, appointment_ids)
+
+@shared_task(ignore_result=True)
+def purge_task_results(batch_size=5000):
+    """
+    Deletes stored task results older than CELERY_RESULT_EXPIRES in small
+    batches, so the purge never holds a long lock on the results table.
+    Scheduled by Celery beat.
+    """
+    cutoff = timezone.now() - settings.CELERY_RESULT_EXPIRES
+    expired = TaskResult.objects.filter(date_done__lt=cutoff).order_by('id').values_list('id', flat=True)
+    while True:
+        ids = list(expired[:batch_size])
+        if not ids:
+            break
+        TaskResult.objects.filter(id__in=ids).delete()
+
+@shared_task(ignore_result=True)
+def ensure_login_partitions():
+    """
+    Creates the upcoming monthly LoginInfo partitions when the table has been
+    partitioned (PostgreSQL); does nothing otherwise. Scheduled by Celery beat.
+    """
+    ensure_partitions(LoginInfo)
+
+@shared_task(ignore_result=True)
+def purge_idempotency_keys():
+    """
+    Deletes Idempotency-Key rows older than IDEMPOTENCY_KEY_TTL. Scheduled by
+    Celery beat.
+    """
+    return purge_expired()
@@ -1,3 +1,1243 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import gzip
+import json
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.celery import app as celery_app
+
+from . import knowledge, prompting, tasks
+from .audit import AuditWriter
+from .compression import CompressionMiddleware, preferred_encoding
+from .events import ALL_CHANNEL, InProcessBroker, doctor_channel, publish_event, specialization_channel
+from .intents import IntentRouter, clinic_now
+from .knowledge import KnowledgeBaseCache
+from .loadtest import compare, percentile
+from .projections import DOCTOR_ROWS, Computed, Projection
+from .reminders import queue_reminders, sweep_reminders
+from .prompting import ChatSession, build_messages, count_tokens
+from .replicas import ReplicaPinMiddleware, use_replica
+from .retention import archive_before, ensure_partitions
+from .models import (Appointment, AppointmentSlot, Doctor, EmailNotification, IdempotencyKey, User, Patient,
+                     Log, LoginInfo, StatsDailyUser, WaitlistEntry)
+from .notifications import deliver_due_emails
+from .serializers import DoctorSerializer
+from .specializations import normalize, resolve
+from .stats import rollup_range
+from .waitlist import expire_offers
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationTests(TestCase):
+    payload = {
+        'username': 'ann',
+        'first_name': 'Ann',
+        'email': 'ann@example.com',
+        'password': 'secret123',
+        'password_confirm': 'secret123',
+        'role': 'patient',
+        'phone_number': '5550100',
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_signup_query_count(self):
+        # Username check, savepoint, user, patient, outstanding token, release
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(6):
+                response = self.client.post('/api/signup/', self.payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['name'], 'Ann')
+        # Registration audit and welcome email are deferred until commit
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse(LoginInfo.objects.exists())
+        callbacks[0]()
+        self.assertEqual(LoginInfo.objects.get().login_type, 'registration')
+        self.assertEqual(Log.objects.get().message, 'User ann registration logged at 127.0.0.1')
+
+    def test_signup_is_atomic(self):
+        with mock.patch.object(Patient.objects, 'create', side_effect=DatabaseError('boom')):
+            with self.captureOnCommitCallbacks() as callbacks:
+                with self.assertRaises(DatabaseError):
+                    self.client.post('/api/signup/', self.payload, format='json')
+        self.assertFalse(User.objects.filter(username='ann').exists())
+        self.assertFalse(LoginInfo.objects.exists())
+        self.assertEqual(callbacks, [])
+
+
+class OverlapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        other = Doctor.objects.create(
+            user=User.objects.create(username='doc2', role='doctor'), name='Doc 2'
+        )
+        self.patient_user = User.objects.create(username='pat', role='patient')
+        Patient.objects.create(user=self.patient_user, name='Pat', phone_number='5550100')
+        self.slots = [
+            AppointmentSlot.objects.create(doctor=doctor, date='2030-01-01', start_time='09:00', end_time='09:30')
+            for doctor in (self.doctor, other)
+        ]
+
+    def create_slot(self, start_time, end_time):
+        self.client.force_authenticate(self.doctor.user)
+        return self.client.post('/api/slots/create/', {
+            'date': '2030-01-01', 'start_time': start_time, 'end_time': end_time,
+        }, format='json')
+
+    def test_overlapping_slot_is_rejected_with_409(self):
+        self.assertEqual(self.create_slot('09:15', '09:45').status_code, 409)
+        self.assertEqual(self.create_slot('08:00', '08:30').status_code, 201)
+        self.assertEqual(self.create_slot('09:30', '10:00').status_code, 201)
+
+    def test_inverted_slot_is_rejected(self):
+        self.assertEqual(self.create_slot('11:00', '10:00').status_code, 400)
+
+    def test_patient_cannot_hold_overlapping_appointments(self):
+        self.client.force_authenticate(self.patient_user)
+        book = lambda slot: self.client.post('/api/appointments/book/', {'slot_id': slot.id}, format='json')
+        response = book(self.slots[0])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['appointment_id'], Appointment.objects.get(slot=self.slots[0]).id)
+        self.assertEqual(book(self.slots[1]).status_code, 409)
+        self.assertFalse(AppointmentSlot.objects.get(pk=self.slots[1].pk).is_booked)
+
+
+class BatchBookingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        user = User.objects.create(username='pat', role='patient', email='pat@example.com')
+        Patient.objects.create(user=user, name='Pat', phone_number='5550100')
+        self.client.force_authenticate(user)
+        self.slots = [
+            AppointmentSlot.objects.create(doctor=doctor, date=f'2030-01-{day:02}', start_time='09:00',
+                                           end_time='09:30')
+            for day in range(1, 5)
+        ]
+
+    def book(self, slots):
+        return self.client.post('/api/appointments/book/batch/', {'slot_ids': [slot.id for slot in slots]},
+                                format='json')
+
+    def test_books_all_slots_in_one_go(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.book(self.slots[:3])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['appointment_ids']), 3)
+        self.assertEqual(AppointmentSlot.objects.filter(is_booked=True).count(), 3)
+        self.assertEqual(Appointment.objects.exclude(starts_at=None).count(), 3)
+        self.assertEqual(EmailNotification.objects.count(), 1)
+
+    def test_books_nothing_if_any_slot_is_taken(self):
+        self.slots[2].is_booked = True
+        self.slots[2].save()
+        response = self.book(self.slots)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['unavailable_slot_ids'], [self.slots[2].id])
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(AppointmentSlot.objects.filter(is_booked=True).count(), 1)
+
+
+class CancelTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        self.patients = [
+            Patient.objects.create(user=User.objects.create(username=name, role='patient',
+                                                            email=f'{name}@example.com'),
+                                   name=name.title(), phone_number='5550100')
+            for name in ('ann', 'bob')
+        ]
+        self.slot = AppointmentSlot.objects.create(doctor=doctor, date='2030-01-01', start_time='09:00',
+                                                   end_time='09:30')
+
+    def post(self, patient, url, data=None):
+        self.client.force_authenticate(patient.user)
+        with self.captureOnCommitCallbacks(execute=False):
+            return self.client.post(url, data, format='json')
+
+    def test_cancel_keeps_the_row_and_frees_the_slot_once(self):
+        self.assertEqual(self.post(self.patients[0], '/api/appointments/book/', {'slot_id': self.slot.id}).status_code,
+                         201)
+        appointment_id = Appointment.objects.get().id
+        self.assertEqual(self.post(self.patients[0], f'/api/appointments/{appointment_id}/cancel/').status_code, 200)
+
+        appointment = Appointment.objects.get(pk=appointment_id)
+        self.assertEqual(appointment.status, 'Canceled')
+        self.assertIsNotNone(appointment.canceled_at)
+        self.assertFalse(AppointmentSlot.objects.get(pk=self.slot.pk).is_booked)
+        self.assertEqual(self.post(self.patients[0], f'/api/appointments/{appointment_id}/cancel/').status_code, 400)
+        self.assertFalse(appointment.cancel())
+
+        # The canceled row does not block the slot for the next patient
+        self.assertEqual(self.post(self.patients[1], '/api/appointments/book/', {'slot_id': self.slot.id}).status_code,
+                         201)
+        self.assertEqual(list(Appointment.objects.order_by('id').values_list('status', flat=True)),
+                         ['Canceled', 'Booked'])
+
+
+class EventBrokerTests(TestCase):
+    def test_fan_out_reaches_each_matching_subscriber_once(self):
+        async def scenario():
+            broker = InProcessBroker(queue_size=2)
+            subscriptions = [
+                broker.subscribe([doctor_channel(1)]),
+                broker.subscribe([specialization_channel(5)]),
+                broker.subscribe([doctor_channel(1), ALL_CHANNEL]),
+                broker.subscribe([doctor_channel(2)]),
+            ]
+            sent = broker.fan_out([ALL_CHANNEL, doctor_channel(1), specialization_channel(5)], 'one')
+            received = [await subscription.get(timeout=0.1) for subscription in subscriptions]
+            # A slow client keeps only the newest queue_size events
+            for message in ('two', 'three', 'four'):
+                broker.fan_out([doctor_channel(1)], message)
+            await asyncio.sleep(0)
+            backlog = [await subscriptions[0].get(timeout=0.1) for _ in range(3)]
+            for subscription in subscriptions:
+                subscription.close()
+            return sent, received, backlog, broker.subscriber_count()
+
+        sent, received, backlog, remaining = asyncio.run(scenario())
+        self.assertEqual(sent, 3)
+        self.assertEqual(received, ['one', 'one', 'one', None])
+        self.assertEqual(backlog, ['three', 'four', None])
+        self.assertEqual(remaining, 0)
+
+    def test_events_are_published_on_commit_to_doctor_and_specialization_channels(self):
+        broker = mock.Mock()
+        with mock.patch('doctorAppointment.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                publish_event('slot.created', doctor_id=1, specialization_id=5, slot_id=9)
+                broker.publish.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+        channels, message = broker.publish.call_args.args
+        self.assertEqual(channels, [ALL_CHANNEL, doctor_channel(1), specialization_channel(5)])
+        self.assertEqual(message, 'event: slot.created\ndata: {"type": "slot.created", "doctor_id": 1, "slot_id": 9, "specialization_id": 5}\n\n')
+
+    def test_slot_events_take_the_specialization_from_the_loaded_doctor(self):
+        doctor = Doctor.objects.create(user=User.objects.create(username='doc', role='doctor'), name='Doc',
+                                       specialization=resolve('cardiologist'))
+        slot = AppointmentSlot.objects.create(doctor=doctor, date='2030-01-01', start_time='09:00', end_time='09:30')
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='doc'))
+        broker = mock.Mock()
+        # The event only goes out once the row is gone
+        broker.publish.side_effect = lambda *args: self.assertFalse(AppointmentSlot.objects.exists())
+        with mock.patch('doctorAppointment.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                # Doctor profile, slot joined with its doctor, savepoint, free slot, two SET_NULL updates,
+                # delete, release
+                with self.assertNumQueries(8):
+                    self.assertEqual(client.delete(f'/api/doctor/slots/{slot.id}/delete/').status_code, 204)
+        self.assertIn(specialization_channel(doctor.specialization_id), broker.publish.call_args.args[0])
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_cancel_publishes_the_released_slot_row(self):
+        doctor = Doctor.objects.create(user=User.objects.create(username='doc', role='doctor'), name='Doc')
+        doctor.user.set_password('secret123')
+        doctor.user.save()
+        patient = Patient.objects.create(user=User.objects.create(username='pat', role='patient'), name='Pat',
+                                         phone_number='5550100')
+        slot = AppointmentSlot.objects.create(doctor=doctor, date=date(2030, 1, 1), start_time=time(9),
+                                              end_time=time(9, 30))
+        appointment = Appointment.objects.create(patient=patient, doctor=doctor, slot=slot, appointment_date=slot.date,
+                                                 start_time=slot.start_time, end_time=slot.end_time)
+        client = APIClient()
+        client.force_authenticate(patient.user)
+        broker = mock.Mock()
+        with mock.patch('doctorAppointment.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(f'/api/appointments/{appointment.id}/cancel/')
+        events = {event['type']: event for event in
+                  (json.loads(call.args[1].split('data: ', 1)[1]) for call in broker.publish.call_args_list)}
+        self.assertEqual(events['slot.released'], {
+            'type': 'slot.released', 'doctor_id': doctor.id, 'slot_id': slot.id, 'doctor_name': 'Doc',
+            'date': '2030-01-01', 'start_time': '09:00:00', 'end_time': '09:30:00',
+        })
+        # Doctors learn their channel at login
+        response = APIClient().post('/api/login/', {'username': 'doc', 'password': 'secret123'}, format='json')
+        self.assertEqual(response.data['doctor_id'], doctor.id)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   DEFAULT_FROM_EMAIL='clinic@example.com', EMAIL_MAX_ATTEMPTS=3, EMAIL_RETRY_BASE_SECONDS=60, EMAIL_CLAIM_LEASE_SECONDS=600)
+class EmailOutboxTests(TestCase):
+    def queue(self, to_email, **fields):
+        return EmailNotification.objects.create(kind='welcome', to_email=to_email, subject='Hi', body='Hello', **fields)
+
+    def test_due_emails_are_sent_once(self):
+        self.queue('a@example.com')
+        self.queue('b@example.com')
+        later = self.queue('c@example.com', next_attempt_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(deliver_due_emails(), {'sent': 2, 'failed': 0})
+        self.assertEqual(deliver_due_emails(), {'sent': 0, 'failed': 0})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(EmailNotification.objects.get(pk=later.pk).status, 'pending')
+        self.assertEqual(EmailNotification.objects.filter(status='sent', attempts=1).count(), 2)
+
+    def test_failures_back_off_exponentially_until_max_attempts(self):
+        notification = self.queue('a@example.com')
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError('mailbox unavailable')
+        delays = []
+        for _ in range(3):
+            EmailNotification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+            started = timezone.now()
+            self.assertEqual(deliver_due_emails(connection=connection), {'sent': 0, 'failed': 1})
+            notification.refresh_from_db()
+            delays.append(round((notification.next_attempt_at - started).total_seconds()))
+        self.assertEqual(delays[:2], [60, 120])
+        self.assertEqual((notification.status, notification.attempts), ('failed', 3))
+        self.assertEqual(notification.last_error, 'mailbox unavailable')
+
+    def test_rows_are_marked_sent_as_they_go_out(self):
+        first = self.queue('a@example.com')
+        second = self.queue('b@example.com')
+        connection = mock.Mock()
+        # The worker is killed while sending the second message
+        connection.send_messages.side_effect = [None, SystemExit()]
+        with self.assertRaises(SystemExit):
+            deliver_due_emails(connection=connection)
+        self.assertEqual(EmailNotification.objects.get(pk=first.pk).status, 'sent')
+        self.assertEqual(EmailNotification.objects.get(pk=second.pk).status, 'sending')
+
+        EmailNotification.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_due_emails(), {'sent': 1, 'failed': 0})
+        self.assertEqual([message.to[0] for message in mail.outbox], ['b@example.com'])
+
+    def test_claimed_rows_are_leased_until_the_lease_runs_out(self):
+        notification = self.queue('a@example.com')
+        # A worker claimed the row and then died before sending it
+        with mock.patch('doctorAppointment.notifications.get_connection', side_effect=RuntimeError('worker died')):
+            with self.assertRaises(RuntimeError):
+                deliver_due_emails()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'sending')
+        self.assertAlmostEqual((notification.next_attempt_at - timezone.now()).total_seconds(), 600, delta=5)
+        self.assertEqual(deliver_due_emails(), {'sent': 0, 'failed': 0})
+
+        EmailNotification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_due_emails(), {'sent': 1, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        self.patient = Patient.objects.create(
+            user=User.objects.create(username='pat', role='patient', email='pat@example.com'),
+            name='Pat', phone_number='5550100'
+        )
+        self.now = timezone.make_aware(datetime(2030, 1, 1, 6), ZoneInfo(settings.APPOINTMENT_TIME_ZONE))
+
+    def book(self, hours_ahead, status='Booked', booked_hours_before=None):
+        start = self.now + timedelta(hours=hours_ahead)
+        end = start + timedelta(minutes=15)
+        slot = AppointmentSlot.objects.create(doctor=self.doctor, date=start.date(), start_time=start.time(),
+                                              end_time=end.time())
+        booked_at = start - timedelta(hours=booked_hours_before) if booked_hours_before else self.now - timedelta(days=7)
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, slot=slot, appointment_date=start.date(),
+            start_time=start.time(), end_time=end.time(), status=status, booked_at=booked_at
+        ).id
+
+    def sweep(self, now=None):
+        pages = []
+        result = sweep_reminders(lambda lead, ids: pages.append((lead, ids)), now=now or self.now, page_size=1)
+        return result, pages
+
+    def test_each_reminder_is_queued_once_for_its_lead(self):
+        soon, tomorrow, later = self.book(0.5), self.book(5), self.book(20)
+        self.book(30)
+        self.book(2, status='Canceled')
+
+        result, pages = self.sweep()
+        self.assertEqual(result, {'24h': {'appointments': 2, 'pages': 2}, '1h': {'appointments': 1, 'pages': 1}})
+        self.assertEqual(pages, [('24h', [tomorrow]), ('24h', [later]), ('1h', [soon])])
+
+        with self.captureOnCommitCallbacks(execute=False):
+            results = [queue_reminders(lead, ids, now=self.now) for lead, ids in pages]
+            # A page dispatched twice queues nothing more
+            results.append(queue_reminders('1h', [soon], now=self.now))
+        self.assertEqual([r['queued'] for r in results], [1, 1, 1, 0])
+        self.assertEqual(self.sweep()[1], [])
+        self.assertEqual(EmailNotification.objects.filter(kind='appointment_reminder').count(), 3)
+        self.assertEqual(EmailNotification.objects.get(appointment_id=soon).subject, 'Reminder: appointment in 1 hour')
+
+    def test_late_booking_only_gets_the_one_hour_reminder(self):
+        late = self.book(5, booked_hours_before=5)
+        self.assertEqual(self.sweep()[1], [])
+        _, pages = self.sweep(now=self.now + timedelta(hours=4, minutes=30))
+        self.assertEqual(pages, [('1h', [late])])
+
+    def test_canceled_after_dispatch_is_skipped(self):
+        appointment_id = self.book(5)
+        _, pages = self.sweep()
+        Appointment.objects.get(pk=appointment_id).cancel()
+        self.assertEqual(queue_reminders(*pages[0], now=self.now), {'queued': 0, 'skipped': 1})
+        self.assertFalse(EmailNotification.objects.exists())
+        self.assertEqual(self.sweep()[1], [])
+
+
+class CeleryTaskTests(TestCase):
+    def test_only_the_rollup_keeps_results(self):
+        keeping = {name for name, task in celery_app.tasks.items()
+                   if name.startswith('doctorAppointment.') and not task.ignore_result}
+        self.assertEqual(keeping, {'doctorAppointment.tasks.rollup_stats'})
+
+    def test_email_and_logging_tasks_are_routed_to_their_queues(self):
+        queue = lambda task: celery_app.amqp.router.route({}, task.name)['queue'].name
+        self.assertEqual(queue(tasks.send_queued_emails), 'email')
+        self.assertEqual(queue(tasks.send_appointment_reminders), 'email')
+        self.assertEqual(queue(tasks.log_login_info), 'logging')
+        self.assertEqual(queue(tasks.rollup_stats), 'default')
+
+    def test_purge_deletes_only_expired_results_in_batches(self):
+        now = timezone.now()
+        for i, age in enumerate([48, 30, 25, 1]):
+            result = TaskResult.objects.create(task_id=f'task-{i}', status='SUCCESS')
+            TaskResult.objects.filter(pk=result.pk).update(date_done=now - timedelta(hours=age))
+        with override_settings(CELERY_RESULT_EXPIRES=timedelta(hours=24)):
+            tasks.purge_task_results(batch_size=2)
+        self.assertEqual(list(TaskResult.objects.values_list('task_id', flat=True)), ['task-3'])
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for days in [200, 120, 95, 10, 1]:
+            log = Log.objects.create(message=f'{days} days old')
+            Log.objects.filter(pk=log.pk).update(timestamp=now - timedelta(days=days))
+        self.cutoff = now - timedelta(days=90)
+
+    def test_old_rows_are_archived_then_deleted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(archive_before('log', self.cutoff, directory=directory, dry_run=True)['archived'], 3)
+            self.assertEqual(Log.objects.count(), 5)
+
+            result = archive_before('log', self.cutoff, directory=directory, batch_size=2)
+            with gzip.open(result['path'], 'rt') as archive:
+                archived = [json.loads(line)['message'] for line in archive]
+            self.assertEqual(archive_before('log', self.cutoff, directory=directory)['path'], None)
+        self.assertEqual(result['archived'], 3)
+        self.assertEqual(archived, ['200 days old', '120 days old', '95 days old'])
+        self.assertEqual(sorted(Log.objects.values_list('message', flat=True)), ['1 days old', '10 days old'])
+
+    def test_only_missing_partitions_are_created_and_counted(self):
+        table = LoginInfo._meta.db_table
+        now = datetime(2030, 3, 15, tzinfo=dt_timezone.utc)
+        months = [datetime(2030, month, 1, tzinfo=dt_timezone.utc) for month in range(2, 7)]
+        # February and March exist, April is missing, May exists, June is missing
+        existing = [(f'{table}_p{lower:%Y%m}', lower, upper) for lower, upper in zip(months, months[1:])
+                    if lower.month != 4]
+        connection = mock.MagicMock()
+        connection.ops.quote_name = lambda name: name
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with mock.patch('doctorAppointment.retention.partitions', return_value=existing), \
+                mock.patch('doctorAppointment.retention.connection', connection), \
+                mock.patch('doctorAppointment.retention.timezone.now', return_value=now):
+            self.assertEqual(ensure_partitions(LoginInfo, months_ahead=3), 2)
+        created = [call.args[0].split()[5] for call in cursor.execute.call_args_list]
+        self.assertEqual(created, [f'{table}_p203004', f'{table}_p203006'])
+
+
+class AuditWriterTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ann', role='patient')
+
+    def rows(self):
+        return [LoginInfo(user=self.user, ip_address='10.0.0.1', login_type='login'),
+                Log(level='INFO', message='User ann logged in', user=self.user)]
+
+    def test_queued_rows_are_written_by_the_background_thread(self):
+        writer = AuditWriter()
+        with override_settings(AUDIT_LOG_QUEUE=True):
+            for row in self.rows():
+                writer.submit(row)
+            writer.flush()
+        self.assertTrue(writer._thread.is_alive())
+        self.assertEqual(LoginInfo.objects.get().ip_address, '10.0.0.1')
+        self.assertEqual(Log.objects.get().message, 'User ann logged in')
+
+    def test_rows_are_written_inline_when_the_queue_is_off(self):
+        writer = AuditWriter()
+        for row in self.rows():
+            writer.submit(row)
+        self.assertIsNone(writer._thread)
+        self.assertEqual((LoginInfo.objects.count(), Log.objects.count()), (1, 1))
+
+    def test_rows_that_keep_failing_are_logged(self):
+        with mock.patch.object(Log.objects, 'bulk_create', side_effect=DatabaseError('disk I/O error')), \
+                mock.patch('doctorAppointment.audit.time.sleep') as sleep, \
+                self.assertLogs('doctorAppointment.audit', 'ERROR') as logs:
+            self.assertFalse(AuditWriter()._write(self.rows()))
+        self.assertEqual(sleep.call_count, 2)
+        self.assertFalse(LoginInfo.objects.exists())
+        dropped = [line for line in logs.output if 'Dropped audit row' in line]
+        self.assertEqual(len(dropped), 2)
+        self.assertIn("message='User ann logged in'", dropped[1])
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        self.client.force_authenticate(self.doctor.user)
+        self.slot = AppointmentSlot.objects.create(doctor=self.doctor, date='2030-01-01', start_time='09:00',
+                                                   end_time='09:30')
+
+    def etag(self):
+        response = self.client.get('/api/doctor/slots/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def test_repeated_get_with_matching_etag_is_304(self):
+        etag = self.etag()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/doctor/slots/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.etag(), etag)
+
+    def test_etag_changes_after_create_update_and_delete(self):
+        seen = [self.etag()]
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post('/api/slots/create/', {'date': '2030-01-01', 'start_time': '10:00',
+                                                    'end_time': '10:30'}, format='json')
+        seen.append(self.etag())
+        AppointmentSlot.objects.filter(pk=self.slot.pk).update(is_booked=True, updated_at=timezone.now())
+        seen.append(self.etag())
+        new_slot = AppointmentSlot.objects.get(start_time=time(10))
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertEqual(self.client.delete(f'/api/doctor/slots/{new_slot.id}/delete/').status_code, 204)
+        seen.append(self.etag())
+        self.assertEqual(len(set(seen)), 4)
+        self.assertEqual(self.client.get('/api/doctor/slots/', HTTP_IF_NONE_MATCH=seen[0]).status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRoutingTests(SimpleTestCase):
+    user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def serve(self, view_method):
+        """Runs ``view_method`` as a request through ReplicaPinMiddleware; returns what it returned."""
+        result = []
+        view = use_replica(lambda view, request: result.append(view_method()))
+        ReplicaPinMiddleware(lambda request: view(None, request))(SimpleNamespace(user=self.user))
+        return result[0]
+
+    def test_replica_views_read_from_the_replica_and_write_to_default(self):
+        self.assertEqual(self.serve(lambda: (Doctor.objects.all().db, router.db_for_write(Doctor))),
+                         ('replica_0', 'default'))
+        self.assertEqual(router.db_for_read(Doctor), 'default')
+
+    def test_reads_after_a_write_stay_on_default(self):
+        self.assertEqual(self.serve(lambda: (router.db_for_write(AppointmentSlot), AppointmentSlot.objects.all().db)),
+                         ('default', 'default'))
+        # The writer is pinned to the primary on later requests too
+        self.assertEqual(self.serve(lambda: router.db_for_read(Doctor)), 'default')
+        self.user = SimpleNamespace(pk=2, is_authenticated=True)
+        self.assertEqual(self.serve(lambda: router.db_for_read(Doctor)), 'replica_0')
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        self.patients = [
+            Patient.objects.create(user=User.objects.create(username=name, role='patient',
+                                                            email=f'{name}@example.com'),
+                                   name=name.title(), phone_number='5550100')
+            for name in ('ann', 'bob', 'cy')
+        ]
+        self.slot = AppointmentSlot.objects.create(doctor=self.doctor, date='2030-01-01', start_time='09:00',
+                                                   end_time='09:30', is_booked=True)
+        self.appointment = Appointment.objects.create(
+            patient=self.patients[0], doctor=self.doctor, slot=self.slot, appointment_date=date(2030, 1, 1),
+            start_time=time(9), end_time=time(9, 30)
+        )
+
+    def join(self, patient, day='2030-01-01'):
+        self.client.force_authenticate(patient.user)
+        return self.client.post('/api/waitlist/', {'doctor_id': self.doctor.id, 'date': day}, format='json')
+
+    def cancel(self):
+        self.client.force_authenticate(self.patients[0].user)
+        with self.captureOnCommitCallbacks(execute=False):
+            return self.client.post(f'/api/appointments/{self.appointment.id}/cancel/')
+
+    def claim(self, patient, entry_id):
+        self.client.force_authenticate(patient.user)
+        with self.captureOnCommitCallbacks(execute=False):
+            return self.client.post(f'/api/waitlist/{entry_id}/claim/')
+
+    def test_join_rejects_duplicates_and_past_dates(self):
+        self.assertEqual(self.join(self.patients[1]).status_code, 201)
+        self.assertEqual(self.join(self.patients[1]).status_code, 400)
+        past = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.join(self.patients[2], past).status_code, 400)
+        self.assertEqual(WaitlistEntry.objects.count(), 1)
+
+    def test_freed_slot_is_offered_to_the_oldest_entry_and_claimed(self):
+        first = self.join(self.patients[1]).data['id']
+        self.join(self.patients[2])
+        self.assertEqual(self.cancel().status_code, 200)
+
+        entry = WaitlistEntry.objects.get(pk=first)
+        self.assertEqual((entry.status, entry.offered_slot_id), ('Offered', self.slot.id))
+        self.assertTrue(AppointmentSlot.objects.get(pk=self.slot.pk).is_booked)
+        # Only the patient holding the offer can claim it
+        second = WaitlistEntry.objects.get(patient=self.patients[2])
+        self.assertEqual(self.claim(self.patients[2], second.id).status_code, 409)
+
+        response = self.claim(self.patients[1], first)
+        self.assertEqual(response.status_code, 201)
+        appointment = Appointment.objects.get(pk=response.data['appointment_id'])
+        self.assertEqual((appointment.patient, appointment.slot), (self.patients[1], self.slot))
+        self.assertEqual(WaitlistEntry.objects.get(pk=first).status, 'Claimed')
+
+    def test_offer_is_emailed_and_published(self):
+        entry_id = self.join(self.patients[1]).data['id']
+        broker = mock.Mock()
+        self.client.force_authenticate(self.patients[0].user)
+        with mock.patch('doctorAppointment.events.get_broker', return_value=broker), \
+                mock.patch.object(tasks.send_queued_emails, 'delay') as flush, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/appointments/{self.appointment.id}/cancel/')
+        flush.assert_called()
+        email = EmailNotification.objects.get(kind='waitlist_offer')
+        self.assertEqual((email.to_email, email.subject), ('bob@example.com', 'A slot opened up for you'))
+        self.assertIn('Dr. Doc on 01 Jan 2030 at 09:00 is held for you', email.body)
+        events = [json.loads(call.args[1].split('data: ', 1)[1]) for call in broker.publish.call_args_list]
+        offered = next(event for event in events if event['type'] == 'waitlist.offered')
+        self.assertEqual((offered['entry_id'], offered['slot_id']), (entry_id, self.slot.id))
+
+    def test_lapsed_offer_passes_to_the_next_entry_then_releases_the_slot(self):
+        first = self.join(self.patients[1]).data['id']
+        second = self.join(self.patients[2]).data['id']
+        self.cancel()
+
+        for entry_id in (first, second):
+            WaitlistEntry.objects.filter(pk=entry_id).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+            with self.captureOnCommitCallbacks(execute=False):
+                self.assertEqual(expire_offers(), 1)
+            self.assertEqual(WaitlistEntry.objects.get(pk=entry_id).status, 'Expired')
+        self.assertEqual(WaitlistEntry.objects.get(pk=second).offered_slot_id, self.slot.id)
+        self.assertFalse(AppointmentSlot.objects.get(pk=self.slot.pk).is_booked)
+        self.assertEqual(self.claim(self.patients[2], second).status_code, 409)
+
+    def test_claim_after_the_slot_was_booked_directly_returns_409(self):
+        entry_id = self.join(self.patients[1]).data['id']
+        self.cancel()
+        Appointment.objects.create(patient=self.patients[2], doctor=self.doctor, slot=self.slot,
+                                   appointment_date=date(2030, 1, 1), start_time=time(9), end_time=time(9, 30))
+
+        response = self.claim(self.patients[1], entry_id)
+        self.assertEqual(response.status_code, 409)
+        entry = WaitlistEntry.objects.get(pk=entry_id)
+        self.assertEqual((entry.status, entry.offered_slot_id), ('Waiting', None))
+        self.assertEqual(Appointment.objects.filter(slot=self.slot, status='Booked').count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        doctor = Doctor.objects.create(user=User.objects.create(username='doc', role='doctor'), name='Doc')
+        user = User.objects.create(username='pat', role='patient', email='pat@example.com')
+        Patient.objects.create(user=user, name='Pat', phone_number='5550100')
+        self.client.force_authenticate(user)
+        self.slots = [
+            AppointmentSlot.objects.create(doctor=doctor, date=date(2030, 1, day), start_time=time(9),
+                                           end_time=time(9, 30))
+            for day in (1, 2)
+        ]
+
+    def book(self, slot, key='key-1'):
+        return self.client.post('/api/appointments/book/', {'slot_id': slot.id}, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_booking_replays_the_stored_response(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.book(self.slots[0])
+        self.assertEqual(first.status_code, 201)
+        # One indexed read of the key row; no slot, appointment or outbox queries
+        with self.assertNumQueries(1):
+            retry = self.book(self.slots[0])
+        self.assertEqual((retry.status_code, retry.data, retry['Idempotent-Replayed']),
+                         (201, first.data, 'true'))
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(EmailNotification.objects.count(), 1)
+        self.assertEqual(self.book(self.slots[1]).status_code, 422)
+        self.assertEqual(self.book(self.slots[1], key='key-2').status_code, 201)
+
+    def test_retried_cancel_and_signup(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.book(self.slots[0])
+        appointment = Appointment.objects.get()
+        url = f'/api/appointments/{appointment.id}/cancel/'
+        responses = [self.client.post(url, HTTP_IDEMPOTENCY_KEY='cancel') for _ in range(2)]
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+
+        self.client.force_authenticate(None)
+        payload = {'username': 'ann', 'first_name': 'Ann', 'email': 'ann@example.com', 'password': 'secret123',
+                   'password_confirm': 'secret123', 'role': 'patient', 'phone_number': '5550101'}
+        with self.captureOnCommitCallbacks(execute=False):
+            responses = [self.client.post('/api/signup/', payload, format='json', HTTP_IDEMPOTENCY_KEY='signup')
+                         for _ in range(2)]
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(User.objects.filter(username='ann').count(), 1)
+        # The token is not kept in the key row; the replay gets a fresh one for the same user
+        record = IdempotencyKey.objects.get(key='signup')
+        self.assertEqual(record.response_body, {'role': 'patient', 'name': 'Ann'})
+        self.assertEqual({**responses[1].data, 'access_token': None}, {**responses[0].data, 'access_token': None})
+        tokens = [AccessToken(response.data['access_token']) for response in responses]
+        self.assertEqual({token['user_id'] for token in tokens}, {str(User.objects.get(username='ann').id)})
+
+    def test_server_errors_are_not_stored(self):
+        with mock.patch.object(Appointment.objects, 'create', side_effect=DatabaseError('boom')):
+            with self.assertRaises(DatabaseError):
+                self.book(self.slots[0])
+        self.assertFalse(IdempotencyKey.objects.exists())
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertEqual(self.book(self.slots[0]).status_code, 201)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher',
+                                     'doctorAppointment.hashers.ImportedPBKDF2PasswordHasher'])
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', role='admin'))
+        User.objects.create(username='taken', role='patient')
+
+    def test_import_reports_invalid_rows_and_creates_the_rest(self):
+        body = (
+            'username,email,first_name,password,phone_number\n'
+            'ann,ann@example.com,Ann,secret123,5550100\n'
+            ',nobody@example.com,,,\n'
+            'bob,not-an-email,Bob,,\n'
+            'ann,ann2@example.com,Ann,,5550100\n'
+            'taken,,,,5550100\n'
+            'cy,,Cy,,5550100555501005550100\n'
+            'dee,,Dee,,(555) 010-0100\n'
+            'eve,,Eve,,\n'
+            'fay,,Fay,,call me\n'
+        )
+        response = self.client.post('/api/admin/import/patients/?batch_size=2', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 7))
+        self.assertEqual([(error['row'], error['errors']) for error in response.data['errors']], [
+            (2, ['username is required', 'phone_number is required']),
+            (3, ['invalid email', 'phone_number is required']),
+            (4, ['duplicate username in import']),
+            (5, ['username already exists']),
+            (6, ['phone_number must be at most 15 characters']),
+            (8, ['phone_number is required']),
+            (9, ['invalid phone_number']),
+        ])
+        self.assertEqual(sorted(Patient.objects.values_list('user__username', 'name')), [('ann', 'Ann'), ('dee', 'Dee')])
+        self.assertFalse(User.objects.get(username='dee').has_usable_password())
+
+    def test_concurrent_username_rejects_the_batch_without_database_details(self):
+        def race(users):
+            User.objects.create(username='bob', role='patient')
+            raise IntegrityError('UNIQUE constraint failed: doctorAppointment_user.username')
+
+        body = 'username,phone_number\nann,5550100\nbob,5550101\n'
+        # Without the batch's own atomic block, so the racing account outlives the failed insert
+        with mock.patch('doctorAppointment.bulk_import.transaction', SimpleNamespace(atomic=contextlib.nullcontext)), \
+                mock.patch.object(User.objects, 'bulk_create', side_effect=race), \
+                self.assertLogs('doctorAppointment.bulk_import', 'WARNING'):
+            response = self.client.post('/api/admin/import/patients/', body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([error['errors'] for error in response.data['errors']], [
+            ['not imported: another row in its batch was rejected; import it again'],
+            ['username already exists'],
+        ])
+        self.assertNotIn('doctorAppointment_user', json.dumps(response.data))
+
+    def test_login_upgrades_the_imported_hash(self):
+        self.client.post('/api/admin/import/patients/', 'username,password,phone_number\nann,secret123,5550100\n',
+                         content_type='text/csv')
+        self.assertTrue(User.objects.get(username='ann').password.startswith('pbkdf2_sha256_import$'))
+
+        response = APIClient().post('/api/login/', {'username': 'ann', 'password': 'secret123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(username='ann')
+        self.assertTrue(user.password.startswith('md5$'))
+        self.assertTrue(user.check_password('secret123'))
+
+
+class AdminOverviewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', role='admin'))
+        doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', role='doctor'), name='Doc'
+        )
+        patient = Patient.objects.create(user=User.objects.create(username='pat', role='patient'), name='Pat')
+        for day in range(1, 6):
+            slot = AppointmentSlot.objects.create(doctor=doctor, date=date(2030, 1, day), start_time=time(9),
+                                                  end_time=time(9, 30))
+            Appointment.objects.create(patient=patient, doctor=doctor, slot=slot, appointment_date=slot.date,
+                                       start_time=slot.start_time, end_time=slot.end_time,
+                                       status='Visited' if day <= 2 else 'Booked')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        response = self.client.get('/api/admin/appointments/', {'limit': 2})
+        self.assertEqual(response.data['counts']['total'], 5)
+        self.assertEqual(response.data['counts']['by_status'], {'Booked': 3, 'Visited': 2, 'Canceled': 0})
+        self.assertEqual(response.data['counts']['by_doctor'][0]['Visited'], 2)
+        dates = [row['date'] for row in response.data['results']]
+        while response.data['next_cursor']:
+            response = self.client.get('/api/admin/appointments/', {'limit': 2, 'cursor': response.data['next_cursor']})
+            self.assertNotIn('counts', response.data)
+            dates += [row['date'] for row in response.data['results']]
+        self.assertEqual([str(d) for d in dates], [f'2030-01-{day:02}' for day in range(5, 0, -1)])
+
+    def test_filters_and_export(self):
+        response = self.client.get('/api/admin/appointments/', {'status': 'Visited', 'date_to': '2030-01-01'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.client.get('/api/admin/appointments/', {'status': 'Lost'}).status_code, 400)
+        response = self.client.get('/api/admin/appointments/export/', {'status': 'Booked'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,patient,doctor,date,time,status')
+        self.assertEqual(len(lines), 4)
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', role='admin'))
+        self.doctors = [Doctor.objects.create(user=User.objects.create(username=f'doc{i}', role='doctor'),
+                                              name=f'Doc {i}') for i in range(2)]
+        patient = Patient.objects.create(user=User.objects.create(username='pat', role='patient'), name='Pat',
+                                         phone_number='5550100')
+        self.start = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=3)
+        for day in range(3):
+            LoginInfo.objects.filter(pk=LoginInfo.objects.create(user=patient.user).pk).update(
+                login_time=self.start + timedelta(days=day))
+        for day, doctor in enumerate(self.doctors):
+            slot = AppointmentSlot.objects.create(doctor=doctor, date=date(2030, 1, 1 + day), start_time=time(9),
+                                                  end_time=time(9, 30))
+            Appointment.objects.create(patient=patient, doctor=doctor, slot=slot, appointment_date=slot.date,
+                                       start_time=slot.start_time, end_time=slot.end_time,
+                                       booked_at=self.start + timedelta(days=day))
+        rollup_range(self.start, self.start + timedelta(days=3))
+
+    def test_unique_users_counts_each_user_once_over_the_range(self):
+        response = self.client.get('/api/login-stats/', {'series': 1})
+        self.assertEqual((response.data['total_logins'], response.data['unique_users']), (3, 1))
+        self.assertEqual([row['unique_users'] for row in response.data['series']], [1, 1, 1])
+
+    def test_unique_users_outlive_archived_logins(self):
+        LoginInfo.objects.all().delete()
+        with self.assertNumQueries(3):
+            # logins/registrations sums, distinct daily users, series
+            response = self.client.get('/api/login-stats/', {'series': 1})
+        self.assertEqual((response.data['total_logins'], response.data['unique_users']), (3, 1))
+        self.assertEqual(StatsDailyUser.objects.count(), 3)
+
+    def test_doctor_id_restricts_every_section(self):
+        url = '/api/admin/appointments/stats/'
+        self.assertEqual(self.client.get(url).data['totals']['bookings'], 2)
+        response = self.client.get(url, {'doctor_id': self.doctors[1].id, 'series': 1})
+        self.assertEqual(response.data['totals']['bookings'], 1)
+        self.assertEqual([row['doctor_id'] for row in response.data['doctors']], [self.doctors[1].id])
+        self.assertEqual(len(response.data['series']), 1)
+        self.assertEqual(self.client.get(url, {'doctor_id': 'abc', 'series': 1}).status_code, 400)
+
+
+class ProjectionTests(TestCase):
+    def test_rows_match_the_serializer(self):
+        for i, text in enumerate(['cardiologist', None]):
+            Doctor.objects.create(user=User.objects.create(username=f'doc{i}', role='doctor', email=f'd{i}@example.com'),
+                                  name=f'Doc {i}', specialization=resolve(text) if text else None)
+        doctors = Doctor.objects.order_by('id')
+        self.assertEqual(DOCTOR_ROWS.rows(doctors), DoctorSerializer(doctors.select_related('user', 'specialization'),
+                                                                     many=True).data)
+
+    def test_computed_values_share_columns(self):
+        rows = Projection(start='start_time', time=Computed(lambda a, b: f'{a}-{b}', 'start_time', 'end_time'))
+        self.assertEqual(rows.columns, ('start_time', 'end_time'))
+        self.assertEqual(rows.to_dict((time(9), time(9, 30))), {'start': time(9), 'time': '09:00:00-09:30:00'})
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', role='admin'))
+        self.doctor = Doctor.objects.create(
+            user=User.objects.create(username='doc', email='house@clinic.org', role='doctor'),
+            name='Gregory House', specialization=resolve('diagnostician'),
+        )
+        self.patient = Patient.objects.create(
+            user=User.objects.create(username='pat', email='jane@example.com', role='patient'),
+            name='Jane Müller', phone_number='555-0100',
+        )
+        slot = AppointmentSlot.objects.create(doctor=self.doctor, date=date(2030, 1, 1), start_time=time(9),
+                                              end_time=time(9, 30))
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, slot=slot, appointment_date=slot.date,
+                                   start_time=slot.start_time, end_time=slot.end_time)
+
+    def names(self, text, kind):
+        response = self.client.get('/api/admin/search/', {'q': text, 'type': kind})
+        return [row['name'] for row in response.data[f'{kind}s']]
+
+    def test_prefix_matches_names_phones_emails_and_specializations(self):
+        self.assertEqual(self.names('jan mu', 'patient'), ['Jane Müller'])
+        self.assertEqual(self.names('5550', 'patient'), ['Jane Müller'])
+        self.assertEqual(self.names('555-01', 'patient'), ['Jane Müller'])
+        self.assertEqual(self.names('jane@exa', 'patient'), ['Jane Müller'])
+        self.assertEqual(self.names('diag', 'doctor'), ['Gregory House'])
+        self.assertEqual(self.names('jane house', 'patient'), [])
+        response = self.client.get('/api/admin/search/', {'q': 'greg'})
+        self.assertEqual(len(response.data['appointments']), 1)
+        self.assertEqual(response.data['patients'], [])
+
+    def test_index_follows_writes(self):
+        self.patient.user.email = 'jdoe@example.com'
+        self.patient.user.save()
+        Patient.objects.filter(pk=self.patient.pk).update(name='Janet Doe')
+        Patient.objects.bulk_create([
+            Patient(user=User.objects.create(username='p2', role='patient'), name='Janek Nowak', phone_number='1')
+        ])
+        self.assertEqual(self.names('jdoe', 'patient'), ['Janet Doe'])
+        self.assertEqual(sorted(self.names('jane', 'patient')), ['Janek Nowak', 'Janet Doe'])
+        self.patient.delete()
+        self.assertEqual(self.names('jane', 'patient'), ['Janek Nowak'])
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.patient.user)
+        self.assertEqual(self.client.get('/api/admin/search/', {'q': 'jane'}).status_code, 403)
+
+
+class SpecializationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', role='admin'))
+
+    def test_spellings_share_one_row(self):
+        self.assertEqual({normalize(text) for text in ['Cardiology', 'cardiology ', ' Cardiologist']}, {'Cardiology'})
+        self.assertEqual(normalize('ear,  nose and throat'), 'Ear, Nose and Throat')
+        self.assertIsNone(resolve('  '))
+        for i, text in enumerate(['Cardiology', 'cardiologist']):
+            user = User.objects.create(username=f'doc{i}', role='doctor')
+            self.client.post('/api/admin/doctors/', {'user_id': user.id, 'name': f'Doc {i}', 'specialization': text},
+                             format='json')
+        self.assertEqual(list(Doctor.objects.values_list('specialization__name', flat=True).distinct()),
+                         ['Cardiology'])
+
+    def test_facets_and_slot_filter(self):
+        doctors = [
+            Doctor.objects.create(user=User.objects.create(username=f'doc{i}', role='doctor'), name=f'Doc {i}',
+                                  specialization=resolve(text))
+            for i, text in enumerate(['Cardiology', 'Dermatology', 'Cardiology'])
+        ]
+        for doctor in doctors:
+            AppointmentSlot.objects.create(doctor=doctor, date=date(2099, 1, 1), start_time=time(9),
+                                           end_time=time(9, 30))
+        AppointmentSlot.objects.create(doctor=doctors[0], date=date(2099, 1, 1), start_time=time(10),
+                                       end_time=time(10, 30), is_booked=True)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/specializations/')
+        self.assertEqual([(row['name'], row['doctors'], row['free_slots']) for row in response.data],
+                         [('Cardiology', 2, 2), ('Dermatology', 1, 1)])
+        with self.assertNumQueries(0):
+            self.client.get('/api/specializations/')
+        cardiology = response.data[0]['id']
+        response = self.client.get('/api/slots/', {'specialization_id': cardiology})
+        self.assertEqual({row['doctor_name'] for row in response.data}, {'Doc 0', 'Doc 2'})
+        self.assertEqual({row['specialization'] for row in response.data}, {'Cardiology'})
+
+
+class ChatbotIntentTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tomorrow = clinic_now().date() + timedelta(days=1)
+        self.doctors = [
+            Doctor.objects.create(user=User.objects.create(username=f'doc{i}', role='doctor'), name=name,
+                                  specialization=resolve(field))
+            for i, (name, field) in enumerate([('Rao', 'Cardiology'), ('Shah', 'Dermatology')])
+        ]
+        for doctor in self.doctors:
+            AppointmentSlot.objects.create(doctor=doctor, date=self.tomorrow, start_time=time(9), end_time=time(9, 30))
+
+    def ask(self, query):
+        return self.client.post('/api/bot/chat/', {'query': query}, format='json').json()
+
+    def test_availability_and_doctors_come_from_the_database(self):
+        result = self.ask('Which cardiologists are available tomorrow?')
+        self.assertEqual(result['intent'], 'availability')
+        self.assertIn('Dr. Rao: 09:00', result['response'])
+        self.assertNotIn('Shah', result['response'])
+        self.assertIn('Dr. Shah', self.ask('Who are your dermatologists?')['response'])
+        self.assertNotIn('intent', self.ask('What are the visiting hours?'))
+
+    def test_doctor_called_by_name(self):
+        result = self.ask('Is there a doctor called Rao?')
+        self.assertEqual(result['intent'], 'doctor_lookup')
+        self.assertEqual(result['response'], 'Matching doctors: Dr. Rao (Cardiology).')
+        self.assertIn('Dr. Shah', self.ask('Do you have a doctor named Shah')['response'])
+        self.assertIn('no doctor called Mehta', self.ask('is there a doctor called mehta?')['response'])
+
+    def test_my_appointments_needs_a_patient(self):
+        self.assertIn('log in', self.ask('When is my next appointment?')['response'])
+        user = User.objects.create(username='pat', role='patient')
+        patient = Patient.objects.create(user=user, name='Pat', phone_number='5550100')
+        slot = AppointmentSlot.objects.get(doctor=self.doctors[0])
+        Appointment.objects.create(patient=patient, doctor=slot.doctor, slot=slot, appointment_date=slot.date,
+                                   start_time=slot.start_time, end_time=slot.end_time)
+        self.client.force_authenticate(user)
+        self.assertIn(f'Dr. Rao (Cardiology) on {self.tomorrow:%A %d %B} at 09:00',
+                      self.ask('when is my next appointment')['response'])
+
+    def test_embedding_fallback_uses_intent_centroids(self):
+        vocabulary = ['see', 'dermatologist', 'visiting', 'hours', 'remind', 'upcoming', 'skin']
+
+        def embed(texts):
+            vectors = np.array([[float(word in text.lower()) for word in vocabulary] + [0.01] for text in texts],
+                               dtype='float32')
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        router = IntentRouter(embed=embed)
+        # A bag of seven words can't reach the threshold meant for sentence embeddings
+        with mock.patch('doctorAppointment.intents.INTENT_THRESHOLD', 0.15):
+            self.assertEqual(router.classify('Could I see a dermatologist?'), 'availability')
+            self.assertEqual(router.classify('remind me what is upcoming'), 'my_appointments')
+            self.assertIsNone(router.classify('visiting hours please'))
+
+    def test_procedural_questions_reach_the_knowledge_base(self):
+        router = IntentRouter()
+        for query in ['How do I cancel my appointment?', 'Can I reschedule my appointment?',
+                      'What should I bring to my visit?', 'What documents do I need for my first appointment?',
+                      'Do you have free parking for patients with appointments?',
+                      'What is the fee for a cardiologist consultation?']:
+            with self.subTest(query=query):
+                self.assertIsNone(router.classify(query))
+
+    def test_information_centroid_overrides_keyword_matches(self):
+        vocabulary = ['fee', 'consultation', 'specialize']
+
+        def embed(texts):
+            vectors = np.array([[float(word in text.lower()) for word in vocabulary] + [0.01] for text in texts],
+                               dtype='float32')
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        self.assertEqual(IntentRouter().classify('What is the consultation fee for Dr. Rao?'), 'doctor_lookup')
+        router = IntentRouter(embed=embed)
+        self.assertIsNone(router.classify('What is the consultation fee for Dr. Rao?'))
+        self.assertEqual(router.classify('What does Dr. Rao specialize in?'), 'doctor_lookup')
+
+    def test_embedding_errors_are_logged(self):
+        router = IntentRouter(embed=mock.Mock(side_effect=RuntimeError('model unavailable')))
+        with self.assertLogs('doctorAppointment.intents', 'ERROR') as logs:
+            self.assertIsNone(router.classify('visiting hours please'))
+        self.assertIn('model unavailable', logs.output[0])
+
+
+@override_settings(CHATBOT_PROMPT_TOKEN_BUDGET=400, CHATBOT_HISTORY_MESSAGES=4, CHATBOT_SUMMARY_TOKENS=60,
+                   CHATBOT_MIN_CHUNK_SCORE=0.2)
+class PromptBuilderTests(SimpleTestCase):
+    def chunks(self):
+        words = [f'filler{i}' for i in range(1400)]
+        words[100:104] = ['Visiting', 'hours', 'are', '4-7pm.']
+        # Two 700-word chunks sharing 120 words, like knowledge.chunk_text makes them
+        return [(' '.join(words[:700]), 0.6), (' '.join(words[580:1280]), 0.5), ('Parking is free.', 0.1)]
+
+    def test_prompt_fits_the_budget_and_keeps_relevant_text(self):
+        messages, stats = build_messages('What are the visiting hours?', self.chunks())
+        self.assertLessEqual(stats['prompt_tokens'], 400)
+        self.assertEqual(stats['prompt_tokens'], sum(count_tokens(m['content']) + 4 for m in messages))
+        self.assertIn('Visiting hours are 4-7pm.', messages[0]['content'])
+        self.assertNotIn('Parking', messages[0]['content'])
+        self.assertEqual(len(messages), 2)
+
+    def test_overlapping_chunks_are_not_repeated(self):
+        messages, _ = build_messages('filler600 filler650', self.chunks(), budget=5000)
+        self.assertEqual(messages[0]['content'].count('filler600 '), 1)
+
+    def test_older_turns_become_a_rolling_summary(self):
+        session = ChatSession()
+        for turn in range(6):
+            session.add_turn(f'question {turn} ' + 'detail ' * 50, f'answer {turn}')
+        self.assertEqual([m['content'] for m in session.history()][1::2], ['answer 4', 'answer 5'])
+        self.assertNotIn('question 0', session.summary)
+        self.assertIn('question 3', session.summary)
+        self.assertLessEqual(count_tokens(session.summary), 60)
+        messages, stats = build_messages('and then?', [], session)
+        self.assertIn('Earlier in this conversation', messages[0]['content'])
+        self.assertLessEqual(stats['prompt_tokens'], 400)
+
+    def test_oversized_question_is_cut_to_fit_the_budget(self):
+        query = 'Where do I park? ' + 'please ' * 2000
+        messages, stats = build_messages(query, self.chunks())
+        self.assertLessEqual(stats['prompt_tokens'], 400)
+        self.assertTrue(messages[-1]['content'].startswith('Where do I park? please'))
+        self.assertTrue(messages[-1]['content'].endswith(' …'))
+        self.assertLessEqual(count_tokens(messages[-1]['content']), 100)
+        _, stats = build_messages('x' * 5000, [])
+        self.assertLessEqual(stats['prompt_tokens'], 400)
+
+    def test_missing_tokenizer_is_logged(self):
+        prompting._encoding.cache_clear()
+        self.addCleanup(prompting._encoding.cache_clear)
+        with mock.patch.dict('sys.modules', {'tiktoken': None}), \
+                self.assertLogs('doctorAppointment.prompting', 'WARNING') as logs:
+            self.assertGreater(count_tokens('Visiting hours are 4-7pm.'), 0)
+        self.assertIn('falls back to an estimate', logs.output[0])
+
+
+class KnowledgeBaseTests(SimpleTestCase):
+    def cache(self, max_bytes, loads):
+        def load(name):
+            loads.append(name)
+            return SimpleNamespace(name=name, nbytes=40)
+        return KnowledgeBaseCache(load, max_bytes)
+
+    def test_least_recently_used_is_evicted_past_the_cap(self):
+        loads = []
+        cache = self.cache(100, loads)
+        for name in ['a', 'b', 'a', 'c', 'a', 'b']:
+            self.assertEqual(cache.get(name).name, name)
+        # 'b' was evicted for 'c', then 'c' for 'b'; 'a' stayed hot
+        self.assertEqual(loads, ['a', 'b', 'c', 'b'])
+        stats = cache.stats()
+        self.assertEqual(stats['bytes'], 80)
+        self.assertEqual(stats['knowledge_bases']['a']['hit_rate'], 0.667)
+        self.assertEqual(stats['knowledge_bases']['b']['evictions'], 1)
+        self.assertFalse(stats['knowledge_bases']['c']['loaded'])
+        self.assertIsNotNone(stats['knowledge_bases']['c']['load_ms_mean'])
+
+    def test_concurrent_requests_load_once(self):
+        loads = []
+        cache = self.cache(100, loads)
+        threads = [threading.Thread(target=cache.get, args=('a',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(loads, ['a'])
+        self.assertEqual(cache.stats()['knowledge_bases']['a']['hits'], 7)
+
+    def test_names_resolve_inside_the_data_directory(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            (Path(data_dir) / 'hospital.txt').write_text('Main campus.')
+            (Path(data_dir) / 'knowledge_bases' / 'eastside').mkdir(parents=True)
+            (Path(data_dir) / 'knowledge_bases' / 'eastside' / 'hospital.txt').write_text('East campus.')
+            self.assertEqual(knowledge.names(data_dir), ['default', 'eastside'])
+            self.assertEqual(knowledge.find(data_dir, 'eastside').knowledge_file.read_text(), 'East campus.')
+            for name in ['westside', '../eastside', 'knowledge_bases/eastside', None]:
+                self.assertIsNone(knowledge.find(data_dir, name))
+
+    def test_chat_rejects_an_unknown_knowledge_base(self):
+        response = APIClient().post('/api/bot/chat/', {'query': 'Visiting hours?', 'knowledge_base': '../etc'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionTests(SimpleTestCase):
+    body = b'{"id": 1, "doctor_name": "Doc"}' * 20
+
+    def respond(self, response, accept='gzip'):
+        request = RequestFactory().get('/api/slots/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_accept_encoding_weights(self):
+        self.assertEqual(preferred_encoding('gzip;q=1, br;q=0.5'), 'gzip')
+        self.assertEqual(preferred_encoding('identity'), None)
+        self.assertEqual(preferred_encoding('*;q=0'), None)
+        self.assertEqual(preferred_encoding('gzip;q=0, deflate'), None)
+
+    def test_compresses_large_json_only(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self.respond(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual((response['ETag'], response['Vary']), ('W/"abc"', 'Accept-Encoding'))
+        small = self.respond(HttpResponse(b'{}', content_type='application/json'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        image = self.respond(HttpResponse(self.body, content_type='image/png'))
+        self.assertFalse(image.has_header('Content-Encoding'))
+        identity = self.respond(HttpResponse(self.body, content_type='application/json'), accept='identity')
+        self.assertEqual((identity.content, identity['Vary']), (self.body, 'Accept-Encoding'))
+
+    def test_streams_exports_but_not_events(self):
+        response = self.respond(StreamingHttpResponse(iter([self.body] * 3), content_type='text/csv'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body * 3)
+        events = self.respond(StreamingHttpResponse(iter([self.body]), content_type='text/event-stream'))
+        self.assertFalse(events.has_header('Content-Encoding'))
+
+    def test_gzip_length_is_randomly_padded(self):
+        bodies = [self.respond(HttpResponse(self.body, content_type='application/json')).content for _ in range(20)]
+        self.assertGreater(len({len(body) for body in bodies}), 1)
+        self.assertTrue(all(gzip.decompress(body) == self.body for body in bodies))
+        with override_settings(COMPRESSION_MAX_RANDOM_BYTES=0):
+            self.assertEqual(gzip.decompress(self.respond(HttpResponse(self.body, content_type='text/csv')).content),
+                             self.body)
+
+    def test_static_files_are_served_before_compression(self):
+        middleware = settings.MIDDLEWARE
+        self.assertLess(middleware.index('doctorAppointment.staticfiles.FrontendWhiteNoiseMiddleware'),
+                        middleware.index('doctorAppointment.compression.CompressionMiddleware'))
+
+
+class LoadTestCompareTests(SimpleTestCase):
+    def result(self, p95, rps, error_rate=0.0):
+        request = {'rps': rps, 'error_rate': error_rate, 'latency_ms': {'p95': p95}}
+        return {'scenarios': {'browse_slots': {'requests': {'slots': request}}}}
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 95))
+
+    def test_flags_only_regressions_beyond_thresholds(self):
+        baseline = self.result(p95=100, rps=50)
+        self.assertEqual(compare(baseline, self.result(p95=108, rps=47))['regressions'], [])
+        report = compare(baseline, self.result(p95=130, rps=40, error_rate=0.05))
+        self.assertEqual(report['regressions'][0]['flags'], ['latency', 'throughput', 'errors'])
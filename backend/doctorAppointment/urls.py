@@ -3,16 +3,25 @@ from .viewss.auth_views import RegisterAPIView, LoginAPIView
 from .viewss.doctor_registration import DoctorCreateView, DoctorListView
 from .viewss.patient_registration import PatientCreateView, PatientListView
 from .viewss.slot_management import SlotCreateView, SlotListView, DoctorSlotsView, SlotDeleteView
-from .viewss.appointment_booking import AppointmentBookView, PatientAppointmentsView, DoctorAppointmentsView, CancelAppointmentView
-from .viewss.admin_appointment_overview import AdminAppointmentOverviewView
+from .viewss.appointment_booking import AppointmentBookView, AppointmentBatchBookView, PatientAppointmentsView, DoctorAppointmentsView, CancelAppointmentView
+from .viewss.admin_appointment_overview import (
+    AdminAppointmentOverviewView,
+    AdminAppointmentExportView,
+    AdminAppointmentStatsView,
+)
 from .viewss.appointment_status import UpdateAppointmentStatusView, DoctorAppointmentStatusView
 from .viewss.admin_management import (
     AdminDoctorListCreateView,
     AdminDoctorDetailView,
     AdminPatientListCreateView,
     AdminPatientDetailView,
+    AdminSearchView,
 )
+from .viewss.bulk_admin import AdminBulkImportView, AdminBulkExportView
+from .viewss.waitlist import WaitlistView, WaitlistEntryView, WaitlistClaimView
 from .viewss.login_history import LoginHistoryView, UserLoginStatsView
+from .viewss.live_updates import EventStreamView
+from .viewss.specializations import SpecializationListView
 from .chatbot import ChatbotAPIView
 from .views import KeepAliveView
 
@@ -24,6 +33,7 @@ urlpatterns = [
     # Doctor
     path('doctor/create/', DoctorCreateView.as_view(), name='doctor-create'),
     path('doctors/', DoctorListView.as_view(), name='doctor-list'),
+    path('specializations/', SpecializationListView.as_view(), name='specialization-list'),
     
     # Patient
     path('patient/create/', PatientCreateView.as_view(), name='patient-create'),
@@ -37,21 +47,35 @@ urlpatterns = [
     
     # Appointments
     path('appointments/book/', AppointmentBookView.as_view(), name='appointment-book'),
+    path('appointments/book/batch/', AppointmentBatchBookView.as_view(), name='appointment-book-batch'),
     path('patient/appointments/', PatientAppointmentsView.as_view(), name='patient-appointments'),
     path('appointments/<int:appointment_id>/cancel/', CancelAppointmentView.as_view(), name='appointment-cancel'),
     path('doctor/appointments/', DoctorAppointmentsView.as_view(), name='doctor-appointments'),
+
+    # Waitlist
+    path('waitlist/', WaitlistView.as_view(), name='waitlist'),
+    path('waitlist/<int:entry_id>/', WaitlistEntryView.as_view(), name='waitlist-entry'),
+    path('waitlist/<int:entry_id>/claim/', WaitlistClaimView.as_view(), name='waitlist-claim'),
     
     # Admin
     path('admin/appointments/', AdminAppointmentOverviewView.as_view(), name='admin-appointments'),
+    path('admin/appointments/export/', AdminAppointmentExportView.as_view(), name='admin-appointment-export'),
+    path('admin/appointments/stats/', AdminAppointmentStatsView.as_view(), name='admin-appointment-stats'),
     path('admin/doctors/', AdminDoctorListCreateView.as_view(), name='admin-doctor-list-create'),
     path('admin/doctors/<int:doctor_id>/', AdminDoctorDetailView.as_view(), name='admin-doctor-detail'),
     path('admin/patients/', AdminPatientListCreateView.as_view(), name='admin-patient-list-create'),
     path('admin/patients/<int:patient_id>/', AdminPatientDetailView.as_view(), name='admin-patient-detail'),
+    path('admin/search/', AdminSearchView.as_view(), name='admin-search'),
+    path('admin/import/<str:role>s/', AdminBulkImportView.as_view(), name='admin-bulk-import'),
+    path('admin/export/<str:role>s/', AdminBulkExportView.as_view(), name='admin-bulk-export'),
     
     # Appointment Status
     path('appointments/<int:appointment_id>/status/', UpdateAppointmentStatusView.as_view(), name='update-appointment-status'),
     path('doctor/appointments/status/', DoctorAppointmentStatusView.as_view(), name='doctor-appointment-status'),
 
+    # Live updates (Server-Sent Events, ASGI only)
+    path('events/', EventStreamView.as_view(), name='event-stream'),
+
     # Chatbot
     path('bot/chat/', ChatbotAPIView.as_view(), name='bot-chat'),
     
@@ -1,24 +1,109 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from ..models import Appointment
+from django.http import StreamingHttpResponse
+from ..replicas import use_replica
+from ..overview import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, counts, export_rows, filter_appointments, page
+from ..stats import APPOINTMENT_FIELDS, GRANULARITY_STEP, doctor_breakdown, parse_range, series, summarize
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
 
 class AdminAppointmentOverviewView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    
+
+    @use_replica
     def get(self, request):
+        """
+        One page of appointments, newest first. Filters: doctor_id, status,
+        date_from, date_to. Pass next_cursor back as cursor for the next page;
+        the first page also carries counts per status and doctor.
+        """
         if request.user.role != 'admin':
             return Response({'error': 'Only admins can view appointment overview'}, 
                           status=status.HTTP_403_FORBIDDEN)
-        
-        appointments = Appointment.objects.all().select_related('patient__user', 'doctor__user')
-        data = [{
-            'id': appointment.id,
-            'patient': appointment.patient.name,
-            'doctor': appointment.doctor.name,
-            'date': appointment.appointment_date,
-            'time': f"{appointment.start_time}-{appointment.end_time}",
-            'status': appointment.status
-        } for appointment in appointments]
-        
-        return Response(data)
\ No newline at end of file
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.query_params.get('cursor')
+        try:
+            queryset = filter_appointments(request.query_params)
+            rows, next_cursor = page(queryset, cursor, limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {'results': rows, 'next_cursor': next_cursor}
+        if not cursor:
+            data['counts'] = counts(queryset)
+        return Response(data)
+
+
+class AdminAppointmentExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @use_replica
+    def get(self, request):
+        """Stream every appointment matching the overview filters as CSV or JSON lines."""
+        if request.user.role != 'admin':
+            return Response({'error': 'Only admins can export appointments'},
+                            status=status.HTTP_403_FORBIDDEN)
+        fmt = request.query_params.get('data_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'error': "data_format must be 'csv' or 'jsonl'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = filter_appointments(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The body is produced after this method returns; keep reading from the alias chosen now
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(export_rows(queryset, fmt), content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="appointments.{fmt}"'
+        return response
+
+
+class AdminAppointmentStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @use_replica
+    def get(self, request):
+        """
+        Booking, cancellation and visit counts from the StatsBucket rollups,
+        site-wide plus a per-doctor breakdown. Accepts the same start, end,
+        granularity and series params as the login stats endpoint, and
+        doctor_id to restrict totals, breakdown and series to one doctor.
+        """
+        if request.user.role != 'admin':
+            return Response({'error': 'Only admins can view appointment statistics'},
+                          status=status.HTTP_403_FORBIDDEN)
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITY_STEP:
+            return Response({'error': "granularity must be 'day' or 'hour'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        doctor_id = request.query_params.get('doctor_id') or None
+        if doctor_id is not None:
+            try:
+                doctor_id = int(doctor_id)
+            except ValueError:
+                return Response({'error': 'doctor_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        per_doctor = doctor_breakdown(APPOINTMENT_FIELDS, granularity, start, end, doctor_id)
+        data = {
+            'totals': summarize(APPOINTMENT_FIELDS, granularity, start, end, doctor_id),
+            'doctors': [{
+                'doctor_id': row['doctor_id'],
+                'doctor': row['doctor__name'],
+                **{field: row[field] for field in APPOINTMENT_FIELDS},
+            } for row in per_doctor],
+        }
+        if request.query_params.get('series'):
+            data['series'] = series(APPOINTMENT_FIELDS, granularity, start, end, doctor_id)
+        return Response(data)
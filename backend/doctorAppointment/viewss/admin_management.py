@@ -4,6 +4,15 @@ from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from ..models import User, Doctor, Patient
 from ..serializers import DoctorSerializer, PatientSerializer
+from ..projections import DOCTOR_ROWS, PATIENT_ROWS
+from ..replicas import use_replica
+from ..specializations import resolve
+from ..search import (
+    DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT,
+    KINDS as SEARCH_KINDS,
+    MAX_LIMIT as MAX_SEARCH_LIMIT,
+    search,
+)
 
 class IsAdminRole(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -12,9 +21,9 @@ class IsAdminRole(permissions.BasePermission):
 class AdminDoctorListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminRole]
 
+    @use_replica
     def get(self, request):
-        doctors = Doctor.objects.select_related('user').all()
-        data = DoctorSerializer(doctors, many=True).data
+        data = DOCTOR_ROWS.rows(Doctor.objects.all())
         return Response(data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -31,7 +40,7 @@ class AdminDoctorListCreateView(APIView):
         if hasattr(user, 'doctor_profile'):
             return Response({'error': 'Doctor profile already exists for this user'}, status=status.HTTP_400_BAD_REQUEST)
 
-        doctor = Doctor.objects.create(user=user, name=name, specialization=specialization)
+        doctor = Doctor.objects.create(user=user, name=name, specialization=resolve(specialization))
         return Response(DoctorSerializer(doctor).data, status=status.HTTP_201_CREATED)
 
 class AdminDoctorDetailView(APIView):
@@ -44,7 +53,7 @@ class AdminDoctorDetailView(APIView):
         if name is not None:
             doctor.name = name
         if specialization is not None:
-            doctor.specialization = specialization
+            doctor.specialization = resolve(specialization)
         doctor.save()
         return Response(DoctorSerializer(doctor).data, status=status.HTTP_200_OK)
 
@@ -56,9 +65,9 @@ class AdminDoctorDetailView(APIView):
 class AdminPatientListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminRole]
 
+    @use_replica
     def get(self, request):
-        patients = Patient.objects.select_related('user').all()
-        data = PatientSerializer(patients, many=True).data
+        data = PATIENT_ROWS.rows(Patient.objects.all())
         return Response(data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -96,3 +105,25 @@ class AdminPatientDetailView(APIView):
         patient = get_object_or_404(Patient, id=patient_id)
         patient.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+class AdminSearchView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsAdminRole]
+
+    @use_replica
+    def get(self, request):
+        """
+        Autocomplete over patients, doctors and appointments. q is matched
+        against names, phone numbers, specializations and emails; type limits
+        the result to patient, doctor or appointment (default: all).
+        """
+        text = request.query_params.get('q', '')
+        kind = request.query_params.get('type')
+        if kind and kind not in SEARCH_KINDS:
+            return Response({'error': f'type must be one of {", ".join(SEARCH_KINDS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT)), MAX_SEARCH_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search(text, kinds=[kind] if kind else SEARCH_KINDS, limit=limit)
+        return Response(results, status=status.HTTP_200_OK)
@@ -1,12 +1,50 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from ..models import Appointment, Patient, AppointmentSlot
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from ..models import Appointment, Doctor, Patient, AppointmentSlot
+from ..conditional import conditional_list
 from ..serializers import AppointmentSerializer
+from ..events import publish_event, publish_slot_event
+from ..notifications import queue_appointment_confirmation
+from ..projections import Computed, Projection, time_range
+from ..waitlist import offer_slot
+from ..overlaps import PATIENT_OVERLAP, violated_constraint
+from ..batch_booking import book_slots
+from ..idempotency import idempotent
+
+PATIENT_APPOINTMENT_ROWS = Projection(
+    id='id', doctor_name='doctor__name', date='appointment_date',
+    time=Computed(time_range, 'start_time', 'end_time'), status='status',
+)
+DOCTOR_APPOINTMENT_ROWS = Projection(
+    id='id', patient_name='patient__name', date='appointment_date',
+    time=Computed(time_range, 'start_time', 'end_time'), status='status',
+)
+
+
+def patient_appointments(request, *args, **kwargs):
+    if request.user.role != 'patient':
+        return None
+    try:
+        return Appointment.objects.filter(patient=request.user.patient_profile)
+    except Patient.DoesNotExist:
+        return None
+
+
+def doctor_appointments(request, *args, **kwargs):
+    if request.user.role != 'doctor':
+        return None
+    try:
+        return Appointment.objects.filter(doctor=request.user.doctor_profile)
+    except Doctor.DoesNotExist:
+        return None
 
 class AppointmentBookView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         if request.user.role != 'patient':
             return Response({'error': 'Only patients can book appointments'}, 
@@ -20,26 +58,80 @@ class AppointmentBookView(APIView):
         
         slot_id = request.data.get('slot_id')
         try:
-            slot = AppointmentSlot.objects.get(id=slot_id, is_booked=False)
+            slot = AppointmentSlot.objects.select_related('doctor').get(id=slot_id, is_booked=False)
         except AppointmentSlot.DoesNotExist:
             return Response({'error': 'Slot not available'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        Appointment.objects.create(
-            patient=patient,
-            doctor=slot.doctor,
-            slot=slot,
-            appointment_date=slot.date,
-            start_time=slot.start_time,
-            end_time=slot.end_time
-        )
-        slot.is_booked = True
-        slot.save()
-        return Response({'message': 'Appointment booked'}, status=status.HTTP_201_CREATED)
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    patient=patient,
+                    doctor=slot.doctor,
+                    slot=slot,
+                    appointment_date=slot.date,
+                    start_time=slot.start_time,
+                    end_time=slot.end_time
+                )
+                queue_appointment_confirmation(appointment)
+                publish_slot_event('slot.booked', slot)
+        except IntegrityError as e:
+            if violated_constraint(e) == PATIENT_OVERLAP:
+                return Response({'error': 'You already have an appointment at this time'},
+                                status=status.HTTP_409_CONFLICT)
+            # Another active appointment already holds this slot
+            return Response({'error': 'Slot not available'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Appointment booked', 'appointment_id': appointment.id},
+                        status=status.HTTP_201_CREATED)
+
+class AppointmentBatchBookView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        """Book several slots at once; either all of them are booked or none."""
+        if request.user.role != 'patient':
+            return Response({'error': 'Only patients can book appointments'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            patient = request.user.patient_profile
+        except Patient.DoesNotExist:
+            return Response({'error': 'Patient profile not found. Please create patient profile first using /patient/create/ endpoint'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        slot_ids = request.data.get('slot_ids')
+        if not isinstance(slot_ids, list) or not slot_ids or \
+                not all(isinstance(slot_id, int) and not isinstance(slot_id, bool) for slot_id in slot_ids):
+            return Response({'error': 'slot_ids must be a non-empty list of slot ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(set(slot_ids)) != len(slot_ids):
+            return Response({'error': 'slot_ids contains duplicates'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(slot_ids) > settings.BOOKING_BATCH_MAX_SLOTS:
+            return Response({'error': f'At most {settings.BOOKING_BATCH_MAX_SLOTS} slots can be booked at once'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            appointments, unavailable = book_slots(patient, slot_ids)
+        except IntegrityError as e:
+            if violated_constraint(e) == PATIENT_OVERLAP:
+                return Response({'error': 'These slots overlap each other or one of your appointments'},
+                                status=status.HTTP_409_CONFLICT)
+            # Another active appointment took one of the slots
+            return Response({'error': 'Slots not available'}, status=status.HTTP_400_BAD_REQUEST)
+        if unavailable:
+            return Response({'error': 'Slots not available', 'unavailable_slot_ids': unavailable},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'message': f'{len(appointments)} appointments booked',
+            'appointment_ids': [appointment.id for appointment in appointments],
+        }, status=status.HTTP_201_CREATED)
 
 class PatientAppointmentsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional_list(patient_appointments)
     def get(self, request):
         if request.user.role != 'patient':
             return Response({'error': 'Only patients can view their appointments'}, 
@@ -47,14 +139,7 @@ class PatientAppointmentsView(APIView):
         
         try:
             patient = request.user.patient_profile
-            appointments = Appointment.objects.filter(patient=patient).select_related('doctor__user')
-            data = [{
-                'id': appointment.id,
-                'doctor_name': appointment.doctor.name,
-                'date': appointment.appointment_date,
-                'time': f"{appointment.start_time}-{appointment.end_time}",
-                'status': appointment.status
-            } for appointment in appointments]
+            data = PATIENT_APPOINTMENT_ROWS.rows(Appointment.objects.filter(patient=patient))
             return Response(data)
         except Patient.DoesNotExist:
             return Response({'error': 'Patient profile not found'}, 
@@ -63,6 +148,7 @@ class PatientAppointmentsView(APIView):
 class DoctorAppointmentsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional_list(doctor_appointments)
     def get(self, request):
         if request.user.role != 'doctor':
             return Response({'error': 'Only doctors can view their appointments'}, 
@@ -70,14 +156,7 @@ class DoctorAppointmentsView(APIView):
         
         try:
             doctor = request.user.doctor_profile
-            appointments = Appointment.objects.filter(doctor=doctor).select_related('patient__user')
-            data = [{
-                'id': appointment.id,
-                'patient_name': appointment.patient.name,
-                'date': appointment.appointment_date,
-                'time': f"{appointment.start_time}-{appointment.end_time}",
-                'status': appointment.status
-            } for appointment in appointments]
+            data = DOCTOR_APPOINTMENT_ROWS.rows(Appointment.objects.filter(doctor=doctor))
             return Response(data)
         except:
             return Response({'error': 'Doctor profile not found'}, 
@@ -87,6 +166,7 @@ class DoctorAppointmentsView(APIView):
 class CancelAppointmentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def post(self, request, appointment_id):
         # Only patients can cancel their own appointments if not visited
         if request.user.role != 'patient':
@@ -100,7 +180,9 @@ class CancelAppointmentView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            appointment = Appointment.objects.select_related('slot').get(id=appointment_id, patient=patient)
+            appointment = Appointment.objects.select_related('doctor', 'slot__doctor').get(
+                id=appointment_id, patient=patient
+            )
         except Appointment.DoesNotExist:
             return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -109,10 +191,19 @@ class CancelAppointmentView(APIView):
             return Response({'error': 'Only non-visited (Booked) appointments can be canceled'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Free the slot and delete the appointment (since no Canceled status is defined)
-        slot = appointment.slot
-        appointment.delete()
-        slot.is_booked = False
-        slot.save()
+        # Mark canceled and free the slot in one transaction; the row is kept for history.
+        # The freed slot goes to the head of the doctor's waitlist for that date, if any.
+        with transaction.atomic():
+            if not appointment.cancel():
+                return Response({'error': 'Only non-visited (Booked) appointments can be canceled'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            offered = offer_slot(appointment.slot) if appointment.slot_id else None
+            publish_event('appointment.canceled', doctor_id=appointment.doctor_id,
+                          specialization_id=appointment.doctor.specialization_id,
+                          appointment_id=appointment.id, slot_id=appointment.slot_id,
+                          date=appointment.appointment_date,
+                          slot_available=bool(appointment.slot_id) and offered is None)
+            if appointment.slot_id and offered is None:
+                publish_slot_event('slot.released', appointment.slot)
 
         return Response({'message': 'Appointment canceled'}, status=status.HTTP_200_OK)
\ No newline at end of file
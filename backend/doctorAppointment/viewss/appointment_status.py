@@ -1,7 +1,17 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.utils import timezone
 from ..models import Appointment
+from ..events import publish_event
+from ..conditional import conditional_list
+from ..projections import Computed, Projection, time_range
+from .appointment_booking import doctor_appointments
+
+DOCTOR_APPOINTMENT_STATUS_ROWS = Projection(
+    id='id', patient='patient__name', date='appointment_date',
+    time=Computed(time_range, 'start_time', 'end_time'), status='status',
+)
 
 class UpdateAppointmentStatusView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -18,19 +28,28 @@ class UpdateAppointmentStatusView(APIView):
             return Response({'error': 'Appointment not found or not authorized'}, 
                           status=status.HTTP_404_NOT_FOUND)
         
+        if appointment.status == 'Canceled':
+            return Response({'error': 'Canceled appointments cannot be updated'},
+                          status=status.HTTP_400_BAD_REQUEST)
+
         new_status = request.data.get('status')
         if new_status not in ['Booked', 'Visited']:
             return Response({'error': 'Invalid status. Must be "Booked" or "Visited"'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        if new_status != appointment.status:
+            appointment.visited_at = timezone.now() if new_status == 'Visited' else None
         appointment.status = new_status
         appointment.save()
+        publish_event('appointment.status', doctor_id=doctor.id, specialization_id=doctor.specialization_id,
+                      appointment_id=appointment.id, status=new_status)
         
         return Response({'message': 'Status updated'})
 
 class DoctorAppointmentStatusView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional_list(doctor_appointments)
     def get(self, request):
         if request.user.role != 'doctor':
             return Response({'error': 'Only doctors can view their appointments'}, 
@@ -38,14 +57,7 @@ class DoctorAppointmentStatusView(APIView):
         
         try:
             doctor = request.user.doctor_profile
-            appointments = Appointment.objects.filter(doctor=doctor).select_related('patient__user')
-            data = [{
-                'id': appointment.id,
-                'patient': appointment.patient.name,
-                'date': appointment.appointment_date,
-                'time': f"{appointment.start_time}-{appointment.end_time}",
-                'status': appointment.status
-            } for appointment in appointments]
+            data = DOCTOR_APPOINTMENT_STATUS_ROWS.rows(Appointment.objects.filter(doctor=doctor))
             return Response(data)
         except:
             return Response({'error': 'Doctor profile not found'}, 
@@ -2,53 +2,45 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework_simplejwt.tokens import RefreshToken
-from ..models import User, LoginInfo, Log
+from ..models import User
+from ..audit import record_log, record_login
+from ..idempotency import idempotent
 from ..serializers import UserSerializer, RegisterSerializer
+from ..tasks import send_welcome_email_and_log_registration
+
+def _reissue_access_token(request):
+    # A replay has the same body as the signup that created the user; DRF strips the username
+    user = User.objects.get(username=str(request.data.get('username', '')).strip())
+    return {'access_token': str(RefreshToken.for_user(user).access_token)}
+
 
 class RegisterAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
+    @idempotent(secret_fields=('access_token',), reissue=_reissue_access_token)
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            refresh = RefreshToken.for_user(user)
-            
             # Get client info for login tracking
             ip_address = self.get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')
-            
-            # Log registration as login info (synchronously)
-            try:
-                LoginInfo.objects.create(
-                    user=user,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    login_type='registration'
-                )
-                Log.objects.create(
-                    level='INFO',
-                    message=f'User {user.username} registration logged at {ip_address}',
-                    user=user
+
+            # User, profile and token are written in one transaction; the registration
+            # audit rows and the welcome email are dispatched once it commits.
+            with transaction.atomic():
+                user = serializer.save()
+                refresh = RefreshToken.for_user(user)
+                transaction.on_commit(
+                    lambda: self.record_registration(user, ip_address, user_agent), robust=True
                 )
-            except Exception as e:
-                Log.objects.create(
-                    level='ERROR',
-                    message=f'Failed to log registration info for user {user.id}: {e}'
+                transaction.on_commit(
+                    lambda: send_welcome_email_and_log_registration.delay(user.id), robust=True
                 )
-            
-            # Determine display name based on role/profile if available
-            display_name = user.username
-            try:
-                if hasattr(user, 'doctor_profile') and user.doctor_profile and user.doctor_profile.name:
-                    display_name = user.doctor_profile.name
-                elif hasattr(user, 'patient_profile') and user.patient_profile and user.patient_profile.name:
-                    display_name = user.patient_profile.name
-                elif user.get_full_name():
-                    display_name = user.get_full_name()
-            except Exception:
-                pass
+
+            # The profile name is the submitted first name, so no profile lookup is needed
+            display_name = serializer.validated_data.get('first_name') or user.username
 
             return Response({
                 'access_token': str(refresh.access_token),
@@ -56,6 +48,11 @@ class RegisterAPIView(APIView):
                 'name': display_name
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def record_registration(self, user, ip_address, user_agent):
+        # Through the audit writer, like logins (batched off the request path on SQLite)
+        record_login(user, ip_address, user_agent, 'registration')
+        record_log('INFO', f'User {user.username} registration logged at {ip_address}', user=user)
     
     def get_client_ip(self, request):
         """Extract client IP address from request"""
@@ -84,29 +81,21 @@ class LoginAPIView(APIView):
             ip_address = self.get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')
             
-            # Log login info (synchronously)
+            # Log login info through the audit writer (batched off the request path on SQLite)
             try:
-                LoginInfo.objects.create(
-                    user=user,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    login_type='login'
-                )
-                Log.objects.create(
-                    level='INFO',
-                    message=f'User {user.username} login logged at {ip_address}',
-                    user=user
-                )
+                record_login(user, ip_address, user_agent, 'login')
+                record_log('INFO', f'User {user.username} login logged at {ip_address}', user=user)
             except Exception as e:
-                Log.objects.create(
-                    level='ERROR',
-                    message=f'Failed to log login info for user {user.id}: {e}'
-                )
+                record_log('ERROR', f'Failed to log login info for user {user.id}: {e}')
 
             # Determine display name based on role/profile if available
             display_name = user.username
+            doctor_id = None
             try:
-                if hasattr(user, 'doctor_profile') and user.doctor_profile and user.doctor_profile.name:
+                if hasattr(user, 'doctor_profile') and user.doctor_profile:
+                    # Doctors subscribe to their own channel of the live updates feed
+                    doctor_id = user.doctor_profile.id
+                if doctor_id and user.doctor_profile.name:
                     display_name = user.doctor_profile.name
                 elif hasattr(user, 'patient_profile') and user.patient_profile and user.patient_profile.name:
                     display_name = user.patient_profile.name
@@ -115,11 +104,14 @@ class LoginAPIView(APIView):
             except Exception:
                 pass
 
-            return Response({
+            data = {
                 'access_token': str(refresh.access_token),
                 'role': user.role,
                 'name': display_name
-            }, status=status.HTTP_200_OK)
+            }
+            if doctor_id:
+                data['doctor_id'] = doctor_id
+            return Response(data, status=status.HTTP_200_OK)
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
     
     def get_client_ip(self, request):
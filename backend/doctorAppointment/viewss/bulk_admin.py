@@ -0,0 +1,73 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+from django.http import StreamingHttpResponse
+from .admin_management import IsAdminRole
+from ..bulk_import import DEFAULT_BATCH_SIZE, PROFILE_SPECS, decode_lines, export_accounts, import_accounts, read_rows
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _request_format(request, default='csv'):
+    fmt = request.query_params.get('data_format')
+    if fmt:
+        return fmt
+    content_type = request.content_type or ''
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return default
+
+
+class AdminBulkImportView(APIView):
+    """
+    POST a CSV or JSON-lines body (or a multipart 'file') to create accounts
+    in bulk. Columns: username, email, first_name, name, password and
+    specialization (doctors) or phone_number (patients, required). Rows
+    without a password get an unusable one and must reset it before logging in.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminRole]
+
+    def post(self, request, role):
+        if role not in PROFILE_SPECS:
+            return Response({'error': 'Unknown account type'}, status=status.HTTP_404_NOT_FOUND)
+        fmt = _request_format(request)
+        if fmt not in FORMATS:
+            return Response({'error': "data_format must be 'csv' or 'jsonl'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            batch_size = max(1, min(int(request.query_params.get('batch_size', DEFAULT_BATCH_SIZE)), 5000))
+        except ValueError:
+            return Response({'error': 'batch_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if (request.content_type or '').startswith('multipart/form-data'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': "Upload the data as 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+            chunks = upload.chunks()
+        else:
+            # Read the raw body incrementally instead of going through a parser
+            chunks = iter(lambda: request._request.read(64 * 1024), b'')
+
+        try:
+            report = import_accounts(read_rows(decode_lines(chunks), fmt), role, batch_size=batch_size)
+        except UnicodeDecodeError:
+            return Response({'error': 'Input must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+
+class AdminBulkExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsAdminRole]
+
+    def get(self, request, role):
+        if role not in PROFILE_SPECS:
+            return Response({'error': 'Unknown account type'}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('data_format', 'csv')
+        if fmt not in FORMATS:
+            return Response({'error': "data_format must be 'csv' or 'jsonl'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export_accounts(role, fmt), content_type=FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{role}s.{fmt}"'
+        return response
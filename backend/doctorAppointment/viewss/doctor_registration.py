@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from ..models import Doctor
 from ..serializers import DoctorSerializer
+from ..specializations import resolve
 from ..tasks import send_welcome_email_and_log_registration
 
 class DoctorCreateView(APIView):
@@ -20,17 +21,18 @@ class DoctorCreateView(APIView):
         doctor = Doctor.objects.create(
             user=request.user,
             name=request.data.get('name', ''),
-            specialization=request.data.get('specialization', '')
+            specialization=resolve(request.data.get('specialization', ''))
         )
         send_welcome_email_and_log_registration.delay(request.user.id)
         return Response({'message': 'Doctor profile created'}, status=status.HTTP_201_CREATED)
 
 class DoctorListView(APIView):
     def get(self, request):
-        doctors = Doctor.objects.select_related('user').all()
+        doctors = Doctor.objects.select_related('specialization').all()
         data = [{
             'id': doctor.id,
             'name': doctor.name,
-            'specialization': doctor.specialization
+            'specialization': doctor.specialization.name if doctor.specialization else None,
+            'specialization_id': doctor.specialization_id,
         } for doctor in doctors]
         return Response(data)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from ..events import ALL_CHANNEL, doctor_channel, get_broker, specialization_channel
+
+
+class EventStreamView(View):
+    """
+    Server-Sent Events feed of slot and appointment changes.
+
+    Subscribe with ?doctor_id=<id> and/or ?specialization_id=<id> (both may be
+    repeated); with neither, the client receives every event. Events only
+    carry ids and dates, so the feed is public like the slot list. Needs the
+    ASGI server (backend.asgi) since each client holds its connection open.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'error': 'Live updates require the ASGI server (backend.asgi).'}, status=501)
+
+        channels = [doctor_channel(doctor_id) for doctor_id in request.GET.getlist('doctor_id') if doctor_id.isdigit()]
+        channels += [specialization_channel(specialization_id)
+                     for specialization_id in request.GET.getlist('specialization_id') if specialization_id.isdigit()]
+        if not channels:
+            channels = [ALL_CHANNEL]
+
+        subscription = get_broker().subscribe(channels)
+        heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+
+        async def stream():
+            try:
+                # Tell EventSource how long to wait before reconnecting
+                yield 'retry: 3000\n\n'
+                while True:
+                    message = await subscription.get(timeout=heartbeat)
+                    yield message if message is not None else ': keep-alive\n\n'
+            finally:
+                subscription.close()
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -3,10 +3,13 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from ..models import LoginInfo, User
 from django.shortcuts import get_object_or_404
+from ..replicas import use_replica
+from ..stats import GRANULARITY_STEP, LOGIN_FIELDS, distinct_users, parse_range, series, summarize
 
 class LoginHistoryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @use_replica
     def get(self, request):
         # Admin can view all login history, users can view their own
         if request.user.role == 'admin':
@@ -33,17 +36,33 @@ class LoginHistoryView(APIView):
 class UserLoginStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @use_replica
     def get(self, request):
+        """
+        Login statistics read from the pre-aggregated StatsBucket rollups.
+        Optional query params: start, end (ISO date/datetime, end date inclusive),
+        granularity ('day' or 'hour') and series=1 to include per-bucket counts.
+        unique_users counts each user once over the whole days the range
+        touches; in the series it is per bucket.
+        """
         # Admin only view for login statistics
         if request.user.role != 'admin':
             return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-        
-        total_logins = LoginInfo.objects.filter(login_type='login').count()
-        total_registrations = LoginInfo.objects.filter(login_type='registration').count()
-        unique_users = LoginInfo.objects.values('user').distinct().count()
-        
-        return Response({
-            'total_logins': total_logins,
-            'total_registrations': total_registrations,
-            'unique_users': unique_users
-        }, status=status.HTTP_200_OK)
+
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITY_STEP:
+            return Response({'error': "granularity must be 'day' or 'hour'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        totals = summarize(LOGIN_FIELDS, granularity, start, end)
+        data = {
+            'total_logins': totals['logins'],
+            'total_registrations': totals['registrations'],
+            'unique_users': distinct_users(start, end),
+        }
+        if request.query_params.get('series'):
+            data['series'] = series(LOGIN_FIELDS, granularity, start, end)
+        return Response(data, status=status.HTTP_200_OK)
@@ -1,8 +1,31 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.db import IntegrityError, transaction
 from ..models import AppointmentSlot, Doctor
 from ..serializers import AppointmentSlotSerializer
+from ..events import publish_slot_event
+from ..conditional import conditional_list
+from ..replicas import use_replica
+from ..projections import Projection
+from ..overlaps import SLOT_OVERLAP, SLOT_TIME_ORDER, violated_constraint
+
+OPEN_SLOT_ROWS = Projection(
+    id='id', doctor_name='doctor__name', specialization='doctor__specialization__name',
+    specialization_id='doctor__specialization_id', date='date', start_time='start_time', end_time='end_time',
+)
+DOCTOR_SLOT_ROWS = Projection(
+    id='id', date='date', start_time='start_time', end_time='end_time', is_booked='is_booked',
+)
+
+
+def doctor_slots(request, *args, **kwargs):
+    if request.user.role != 'doctor':
+        return None
+    try:
+        return AppointmentSlot.objects.filter(doctor=request.user.doctor_profile)
+    except Doctor.DoesNotExist:
+        return None
 
 
 class SlotCreateView(APIView):
@@ -19,32 +42,47 @@ class SlotCreateView(APIView):
             return Response({'error': 'Doctor profile not found'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        AppointmentSlot.objects.create(
-            doctor=doctor,
-            date=request.data.get('date'),
-            start_time=request.data.get('start_time'),
-            end_time=request.data.get('end_time')
-        )
+        try:
+            with transaction.atomic():
+                slot = AppointmentSlot.objects.create(
+                    doctor=doctor,
+                    date=request.data.get('date'),
+                    start_time=request.data.get('start_time'),
+                    end_time=request.data.get('end_time')
+                )
+        except IntegrityError as e:
+            constraint = violated_constraint(e)
+            if constraint == SLOT_OVERLAP:
+                return Response({'error': 'Slot overlaps one of your existing slots'},
+                                status=status.HTTP_409_CONFLICT)
+            if constraint == SLOT_TIME_ORDER:
+                return Response({'error': 'end_time must be after start_time'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            raise
+        publish_slot_event('slot.created', slot)
         return Response({'message': 'Slot created'}, status=status.HTTP_201_CREATED)
 
 
 class SlotListView(APIView):
+    @use_replica
     def get(self, request):
-        slots = AppointmentSlot.objects.filter(is_booked=False).select_related('doctor__user')
-        data = [{
-            'id': slot.id,
-            'doctor_name': slot.doctor.name,
-            'specialization': slot.doctor.specialization,
-            'date': slot.date,
-            'start_time': slot.start_time,
-            'end_time': slot.end_time
-        } for slot in slots]
+        """Open slots; ?specialization_id=<id> narrows them to one specialty."""
+        slots = AppointmentSlot.objects.filter(is_booked=False)
+        specialization_id = request.query_params.get('specialization_id')
+        if specialization_id:
+            if not specialization_id.isdigit():
+                return Response({'error': 'specialization_id must be an integer'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            slots = slots.filter(doctor__specialization_id=int(specialization_id))
+        data = OPEN_SLOT_ROWS.rows(slots)
         return Response(data)
 
 
 class DoctorSlotsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @use_replica
+    @conditional_list(doctor_slots)
     def get(self, request):
         if request.user.role != 'doctor':
             return Response({'error': 'Only doctors can view their slots'},
@@ -52,14 +90,7 @@ class DoctorSlotsView(APIView):
 
         try:
             doctor = request.user.doctor_profile
-            slots = AppointmentSlot.objects.filter(doctor=doctor)
-            data = [{
-                'id': slot.id,
-                'date': slot.date,
-                'start_time': slot.start_time,
-                'end_time': slot.end_time,
-                'is_booked': slot.is_booked
-            } for slot in slots]
+            data = DOCTOR_SLOT_ROWS.rows(AppointmentSlot.objects.filter(doctor=doctor))
             return Response(data)
         except Doctor.DoesNotExist:
             return Response({'error': 'Doctor profile not found'},
@@ -82,7 +113,7 @@ class SlotDeleteView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            slot = AppointmentSlot.objects.get(id=slot_id, doctor=doctor)
+            slot = AppointmentSlot.objects.select_related('doctor').get(id=slot_id, doctor=doctor)
         except AppointmentSlot.DoesNotExist:
             return Response({'error': 'Slot not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -90,5 +121,11 @@ class SlotDeleteView(APIView):
             return Response({'error': 'Cannot delete a booked slot'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        slot.delete()
+        # Conditional on the slot still being free; clients only hear of the delete once it committed
+        with transaction.atomic():
+            deleted, _ = AppointmentSlot.objects.filter(pk=slot.pk, is_booked=False).delete()
+        if not deleted:
+            return Response({'error': 'Cannot delete a booked slot'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        publish_slot_event('slot.deleted', slot)
         return Response({'message': 'Slot deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
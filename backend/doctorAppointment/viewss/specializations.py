@@ -0,0 +1,11 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from ..replicas import use_replica
+from ..specializations import facets
+
+
+class SpecializationListView(APIView):
+    @use_replica
+    def get(self, request):
+        """Specializations with doctor and open-slot counts, for the slot filter. Cached briefly."""
+        return Response(facets())
@@ -0,0 +1,131 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from ..models import Doctor, Patient, WaitlistEntry
+from ..waitlist import SlotTaken, claim_offer, withdraw_offer
+from ..overlaps import PATIENT_OVERLAP, violated_constraint
+
+
+def _entry_data(entry):
+    return {
+        'id': entry.id,
+        'doctor_id': entry.doctor_id,
+        'doctor_name': entry.doctor.name,
+        'date': entry.date,
+        'status': entry.status,
+        'offered_slot_id': entry.offered_slot_id,
+        'offer_expires_at': entry.offer_expires_at,
+    }
+
+
+class WaitlistView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """List the patient's open waitlist entries, including pending offers."""
+        if request.user.role != 'patient':
+            return Response({'error': 'Only patients can view their waitlist'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            patient = request.user.patient_profile
+        except Patient.DoesNotExist:
+            return Response({'error': 'Patient profile not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        entries = WaitlistEntry.objects.filter(
+            patient=patient, status__in=['Waiting', 'Offered']
+        ).select_related('doctor')
+        return Response([_entry_data(entry) for entry in entries])
+
+    def post(self, request):
+        """Join the waitlist for a doctor's slots on a date."""
+        if request.user.role != 'patient':
+            return Response({'error': 'Only patients can join a waitlist'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            patient = request.user.patient_profile
+        except Patient.DoesNotExist:
+            return Response({'error': 'Patient profile not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        date = parse_date(str(request.data.get('date', '')))
+        if date is None:
+            return Response({'error': 'date is required (YYYY-MM-DD)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # Waits for past dates would only be expired by the next sweep
+        if date < timezone.localdate():
+            return Response({'error': 'date must not be in the past'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            doctor = Doctor.objects.get(id=request.data.get('doctor_id'))
+        except (Doctor.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            with transaction.atomic():
+                entry = WaitlistEntry.objects.create(patient=patient, doctor=doctor, date=date)
+        except IntegrityError:
+            return Response({'error': 'Already on the waitlist for this doctor and date'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(_entry_data(entry), status=status.HTTP_201_CREATED)
+
+
+class WaitlistEntryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def delete(self, request, entry_id):
+        """Leave the waitlist; a pending offer is passed to the next patient."""
+        if request.user.role != 'patient':
+            return Response({'error': 'Only patients can leave a waitlist'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            entry = WaitlistEntry.objects.select_related('offered_slot__doctor').get(
+                id=entry_id, patient__user=request.user, status__in=['Waiting', 'Offered']
+            )
+        except WaitlistEntry.DoesNotExist:
+            return Response({'error': 'Waitlist entry not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if entry.status == 'Offered':
+            withdraw_offer(entry, 'Left')
+        else:
+            WaitlistEntry.objects.filter(pk=entry.pk, status='Waiting').update(status='Left')
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class WaitlistClaimView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, entry_id):
+        """Book the slot offered to this waitlist entry."""
+        if request.user.role != 'patient':
+            return Response({'error': 'Only patients can claim waitlist offers'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            entry = WaitlistEntry.objects.select_related('offered_slot__doctor').get(
+                id=entry_id, patient__user=request.user
+            )
+        except WaitlistEntry.DoesNotExist:
+            return Response({'error': 'Waitlist entry not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            appointment = claim_offer(entry)
+        except IntegrityError as e:
+            if violated_constraint(e) != PATIENT_OVERLAP:
+                raise
+            return Response({'error': 'You already have an appointment at this time'},
+                            status=status.HTTP_409_CONFLICT)
+        except SlotTaken:
+            return Response({'error': 'The offered slot was booked by someone else; you are back on the waitlist'},
+                            status=status.HTTP_409_CONFLICT)
+        if appointment is None:
+            return Response({'error': 'No open offer for this waitlist entry'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({'message': 'Appointment booked', 'appointment_id': appointment.id},
+                        status=status.HTTP_201_CREATED)
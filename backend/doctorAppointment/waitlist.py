@@ -0,0 +1,129 @@
+"""
+Waitlist backfill: freed slots are held and offered to the oldest waiting
+patient for the same doctor and date instead of going back to the public
+slot list. Every state change is a conditional UPDATE inside a transaction,
+so an offer can only be claimed, declined or expired once. Each offer is
+emailed to the patient and published on the change feed when it commits.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .events import publish_event, publish_slot_event
+from .models import Appointment, AppointmentSlot, WaitlistEntry
+from .notifications import queue_appointment_confirmation, queue_waitlist_offer
+from .overlaps import PATIENT_OVERLAP, violated_constraint
+
+
+class SlotTaken(Exception):
+    """The held slot got an appointment some other way while the offer was open."""
+
+
+def _next_in_queue(doctor_id, date):
+    return (
+        WaitlistEntry.objects.select_for_update(skip_locked=True, of=('self',))
+        .select_related('patient__user', 'doctor')
+        .filter(doctor_id=doctor_id, date=date, status='Waiting')
+        .order_by('created_at', 'id')
+        .first()
+    )
+
+
+def _make_offer(entry, slot):
+    entry.status = 'Offered'
+    entry.offered_slot = slot
+    entry.offer_expires_at = timezone.now() + timedelta(minutes=settings.WAITLIST_OFFER_MINUTES)
+    entry.save(update_fields=['status', 'offered_slot', 'offer_expires_at'])
+    queue_waitlist_offer(entry)
+    publish_event('waitlist.offered', doctor_id=entry.doctor_id, specialization_id=entry.doctor.specialization_id,
+                  entry_id=entry.id, slot_id=slot.id, date=slot.date, offer_expires_at=entry.offer_expires_at)
+    return entry
+
+
+def offer_slot(slot):
+    """
+    Hold a freshly freed slot for the next waiting patient.
+    Returns the offered entry, or None if nobody is waiting or the slot was
+    already taken again.
+    """
+    with transaction.atomic():
+        entry = _next_in_queue(slot.doctor_id, slot.date)
+        if entry is None:
+            return None
+        if not AppointmentSlot.objects.filter(pk=slot.pk, is_booked=False).update(is_booked=True, updated_at=timezone.now()):
+            return None
+        return _make_offer(entry, slot)
+
+
+def withdraw_offer(entry, new_status):
+    """
+    Close an open offer ('Expired' or 'Left') and pass the held slot to the
+    next patient in line, or release it to the public slot list.
+    Returns the next offered entry, if any.
+    """
+    with transaction.atomic():
+        if not WaitlistEntry.objects.filter(pk=entry.pk, status='Offered').update(status=new_status):
+            return None
+        slot = entry.offered_slot
+        if slot is None:
+            return None
+        next_entry = _next_in_queue(slot.doctor_id, slot.date)
+        if next_entry is None:
+            AppointmentSlot.objects.filter(pk=slot.pk).update(is_booked=False, updated_at=timezone.now())
+            publish_slot_event('slot.released', slot)
+            return None
+        return _make_offer(next_entry, slot)
+
+
+def claim_offer(entry):
+    """
+    Turn an unexpired offer into an appointment. Returns None if the offer is
+    gone. Raises SlotTaken if the held slot was booked directly meanwhile; the
+    entry then goes back to waiting, keeping its place in the queue.
+    """
+    with transaction.atomic():
+        claimed = WaitlistEntry.objects.filter(
+            pk=entry.pk, status='Offered', offer_expires_at__gt=timezone.now()
+        ).update(status='Claimed')
+        if not claimed or entry.offered_slot is None:
+            return None
+        slot = entry.offered_slot
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    patient_id=entry.patient_id,
+                    doctor=slot.doctor,
+                    slot=slot,
+                    appointment_date=slot.date,
+                    start_time=slot.start_time,
+                    end_time=slot.end_time
+                )
+        except IntegrityError as e:
+            if violated_constraint(e) == PATIENT_OVERLAP:
+                raise
+            # unique_active_appointment_per_slot: the slot is no longer ours to offer
+            WaitlistEntry.objects.filter(pk=entry.pk).update(status='Waiting', offered_slot=None,
+                                                              offer_expires_at=None)
+        else:
+            queue_appointment_confirmation(appointment)
+            publish_slot_event('slot.booked', slot)
+            return appointment
+    raise SlotTaken()
+
+
+def expire_offers():
+    """Expire lapsed offers (passing their slots on) and waits for past dates."""
+    now = timezone.now()
+    lapsed = WaitlistEntry.objects.filter(
+        status='Offered', offer_expires_at__lte=now
+    ).select_related('offered_slot__doctor')
+    expired = 0
+    for entry in lapsed:
+        withdraw_offer(entry, 'Expired')
+        expired += 1
+    expired += WaitlistEntry.objects.filter(
+        status='Waiting', date__lt=timezone.localdate()
+    ).update(status='Expired')
+    return expired
@@ -14,7 +14,15 @@ python -m pip install -r backend/requirements.txt
 echo "Running migrations..."
 python backend/manage.py migrate
 
-# Collect static files
+# Build the React frontend, served by Django from frontend/dist (same origin, so the API is /api)
+if [ -z "$SKIP_FRONTEND_BUILD" ] && command -v npm >/dev/null 2>&1; then
+    echo "Building frontend..."
+    (cd frontend && npm ci && VITE_API_BASE_URL="${VITE_API_BASE_URL:-/api}" npx vite build)
+    # Brotli and gzip copies next to each file; WhiteNoise serves whichever the client accepts
+    python -m whitenoise.compress frontend/dist
+fi
+
+# Collect (and precompress) static files
 echo "Collecting static files..."
 python backend/manage.py collectstatic --noinput
 
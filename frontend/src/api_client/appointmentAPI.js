@@ -1,8 +1,15 @@
 import apiClient from './apiClient';
 
 export const appointmentAPI = {
-  getAvailableSlots: async () => {
-    const response = await apiClient.get('/slots/');
+  // params: { specialization_id } to show one specialty only
+  getAvailableSlots: async (params = {}) => {
+    const response = await apiClient.get('/slots/', { params });
+    return response.data;
+  },
+
+  // [{ id, name, doctors, free_slots }]
+  getSpecializations: async () => {
+    const response = await apiClient.get('/specializations/');
     return response.data;
   },
 
@@ -11,8 +18,9 @@ export const appointmentAPI = {
     return response.data;
   },
 
-  getAllAppointments: async () => {
-    const response = await apiClient.get('/admin/appointments/');
+  // One page of the admin overview: { results, next_cursor, counts (first page only) }
+  getAllAppointments: async (params = {}) => {
+    const response = await apiClient.get('/admin/appointments/', { params });
     return response.data;
   },
 
@@ -0,0 +1,28 @@
+import apiClient from './apiClient';
+
+export const eventsAPI = {
+  /**
+   * Subscribe to live slot/appointment updates (Server-Sent Events).
+   * filters: { doctorIds: [], specializationIds: [] }; empty means all events.
+   * Returns an unsubscribe function.
+   */
+  subscribe: (onEvent, filters = {}) => {
+    const params = new URLSearchParams();
+    (filters.doctorIds || []).forEach((id) => params.append('doctor_id', id));
+    (filters.specializationIds || []).forEach((id) => params.append('specialization_id', id));
+    const query = params.toString();
+    const source = new EventSource(`${apiClient.defaults.baseURL}/events/${query ? `?${query}` : ''}`);
+
+    const handler = (event) => {
+      try {
+        onEvent(JSON.parse(event.data));
+      } catch (error) {
+        console.warn('Ignoring malformed live update:', error.message);
+      }
+    };
+    ['slot.created', 'slot.deleted', 'slot.booked', 'slot.released', 'appointment.canceled', 'appointment.status']
+      .forEach((type) => source.addEventListener(type, handler));
+
+    return () => source.close();
+  },
+};
@@ -8,7 +8,7 @@ import LoadingSpinner from '../../components/Common/LoadingSpinner';
 
 const AdminDashboard = () => {
   const dispatch = useDispatch();
-  const { allAppointments, isLoading } = useSelector((state) => state.appointment);
+  const { allAppointments, appointmentCounts, appointmentsCursor, isLoading, isLoadingMore } = useSelector((state) => state.appointment);
   const { doctors, patients } = useSelector((state) => state.admin);
 
   const [openDoctorDialog, setOpenDoctorDialog] = useState(false);
@@ -26,9 +26,10 @@ const AdminDashboard = () => {
 
   if (isLoading) return <LoadingSpinner />;
 
-  const totalAppointments = allAppointments.length;
-  const bookedAppointments = allAppointments.filter(app => app.status === 'Booked').length;
-  const visitedAppointments = allAppointments.filter(app => app.status === 'Visited').length;
+  // Counts come from the server; the table below only holds the pages loaded so far
+  const totalAppointments = appointmentCounts?.total ?? 0;
+  const bookedAppointments = appointmentCounts?.by_status?.Booked ?? 0;
+  const visitedAppointments = appointmentCounts?.by_status?.Visited ?? 0;
 
   return (
     <Box>
@@ -112,7 +113,7 @@ const AdminDashboard = () => {
                       <TableCell>
                         <Chip 
                           label={appointment.status} 
-                          color={appointment.status === 'Visited' ? 'success' : 'warning'}
+                          color={appointment.status === 'Visited' ? 'success' : appointment.status === 'Canceled' ? 'default' : 'warning'}
                           size="small"
                         />
                       </TableCell>
@@ -122,6 +123,17 @@ const AdminDashboard = () => {
               </Table>
             </TableContainer>
           )}
+          {appointmentsCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+              <Button
+                variant="outlined"
+                disabled={isLoadingMore}
+                onClick={() => dispatch(fetchAllAppointments({ cursor: appointmentsCursor }))}
+              >
+                {isLoadingMore ? 'Loading...' : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </CardContent>
       </Card>
 
@@ -4,6 +4,7 @@ import { ArrowBack } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
 import { doctorAPI } from '../../api_client/doctorAPI';
 import { appointmentAPI } from '../../api_client/appointmentAPI';
+import { eventsAPI } from '../../api_client/eventsAPI';
 import LoadingSpinner from '../../components/Common/LoadingSpinner';
 import ErrorAlert from '../../components/Common/ErrorAlert';
 import SuccessAlert from '../../components/Common/SuccessAlert';
@@ -22,9 +23,25 @@ const DoctorAppointments = () => {
     fetchAppointments();
   }, []);
 
-  const fetchAppointments = async () => {
+  // Reload quietly when one of this doctor's appointments is booked, canceled or updated elsewhere
+  useEffect(() => {
+    const doctorId = localStorage.getItem('doctorId');
+    if (!doctorId) return undefined;
+    let timer = null;
+    const unsubscribe = eventsAPI.subscribe((event) => {
+      if (event.type !== 'slot.booked' && !event.type.startsWith('appointment.')) return;
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchAppointments({ quiet: true }), 300);
+    }, { doctorIds: [doctorId] });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
+  const fetchAppointments = async ({ quiet = false } = {}) => {
     try {
-      setLoading(true);
+      if (!quiet) setLoading(true);
       const data = await doctorAPI.getDoctorAppointments();
       setAppointments(data);
     } catch (err) {
@@ -102,7 +119,7 @@ const DoctorAppointments = () => {
                       <TableCell>
                         <Chip 
                           label={appointment.status} 
-                          color={appointment.status === 'Visited' ? 'success' : 'warning'}
+                          color={appointment.status === 'Visited' ? 'success' : appointment.status === 'Canceled' ? 'default' : 'warning'}
                           size="small"
                         />
                       </TableCell>
@@ -111,7 +128,7 @@ const DoctorAppointments = () => {
                           variant="outlined"
                           size="small"
                           onClick={() => handleStatusUpdate(appointment)}
-                          disabled={appointment.status === 'Visited'}
+                          disabled={appointment.status !== 'Booked'}
                         >
                           Update Status
                         </Button>
@@ -1,25 +1,48 @@
 import React, { useState, useEffect } from 'react';
-import { Card, CardContent, Typography, Box, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Paper, Button, Dialog, DialogTitle, DialogContent, DialogActions, IconButton } from '@mui/material';
+import { Card, CardContent, Typography, Box, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Paper, Button, Dialog, DialogTitle, DialogContent, DialogActions, IconButton, TextField, MenuItem } from '@mui/material';
 import { ArrowBack } from '@mui/icons-material';
 import { useDispatch, useSelector } from 'react-redux';
 import { useNavigate } from 'react-router-dom';
-import { fetchAvailableSlots, bookAppointment, clearError } from '../../reducer/appointmentSlice';
+import { fetchAvailableSlots, bookAppointment, clearError, applySlotEvent } from '../../reducer/appointmentSlice';
+import { eventsAPI } from '../../api_client/eventsAPI';
+import { appointmentAPI } from '../../api_client/appointmentAPI';
 import LoadingSpinner from '../../components/Common/LoadingSpinner';
 import ErrorAlert from '../../components/Common/ErrorAlert';
 import SuccessAlert from '../../components/Common/SuccessAlert';
 
+// Slot list query for the selected specialization ('' = all)
+const slotFilter = (specializationId) => (specializationId ? { specialization_id: specializationId } : {});
+
 const BookAppointment = () => {
   const [selectedSlot, setSelectedSlot] = useState(null);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [success, setSuccess] = useState(false);
+  const [specializations, setSpecializations] = useState([]);
+  const [specializationId, setSpecializationId] = useState('');
 
   const dispatch = useDispatch();
   const navigate = useNavigate();
   const { availableSlots, isLoading, error } = useSelector((state) => state.appointment);
 
   useEffect(() => {
-    dispatch(fetchAvailableSlots());
-  }, [dispatch]);
+    appointmentAPI.getSpecializations()
+      .then(setSpecializations)
+      .catch(() => setSpecializations([]));
+  }, []);
+
+  useEffect(() => {
+    dispatch(fetchAvailableSlots(slotFilter(specializationId)));
+  }, [dispatch, specializationId]);
+
+  // Patch the slot list from the server's change events; slot events carry the whole row
+  useEffect(() => {
+    const unsubscribe = eventsAPI.subscribe((event) => {
+      if (!event.type.startsWith('slot.')) return;
+      const specialization = specializations.find((item) => item.id === event.specialization_id);
+      dispatch(applySlotEvent({ ...event, specialization: specialization ? specialization.name : null }));
+    }, { specializationIds: specializationId ? [specializationId] : [] });
+    return unsubscribe;
+  }, [dispatch, specializationId, specializations]);
 
   const handleBookSlot = (slot) => {
     setSelectedSlot(slot);
@@ -31,7 +54,7 @@ const BookAppointment = () => {
       await dispatch(bookAppointment(selectedSlot.id)).unwrap();
       setSuccess(true);
       setDialogOpen(false);
-      dispatch(fetchAvailableSlots()); // Refresh slots
+      dispatch(fetchAvailableSlots(slotFilter(specializationId))); // Refresh slots
       setTimeout(() => setSuccess(false), 3000);
     } catch (err) {
       setDialogOpen(false);
@@ -56,9 +79,26 @@ const BookAppointment = () => {
 
       <Card>
         <CardContent>
-          <Typography variant="h6" gutterBottom>
-            Available Slots
-          </Typography>
+          <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between', mb: 1 }}>
+            <Typography variant="h6" gutterBottom>
+              Available Slots
+            </Typography>
+            <TextField
+              select
+              size="small"
+              label="Specialization"
+              value={specializationId}
+              onChange={(e) => setSpecializationId(e.target.value)}
+              sx={{ minWidth: 220 }}
+            >
+              <MenuItem value="">All</MenuItem>
+              {specializations.map((item) => (
+                <MenuItem key={item.id} value={item.id}>
+                  {item.name} ({item.free_slots})
+                </MenuItem>
+              ))}
+            </TextField>
+          </Box>
           
           <ErrorAlert error={error} onClose={() => dispatch(clearError())} />
           <SuccessAlert 
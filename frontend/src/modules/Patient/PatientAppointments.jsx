@@ -75,7 +75,7 @@ const PatientAppointments = () => {
                       <TableCell>
                         <Chip 
                           label={appointment.status} 
-                          color={appointment.status === 'Visited' ? 'success' : 'warning'}
+                          color={appointment.status === 'Visited' ? 'success' : appointment.status === 'Canceled' ? 'default' : 'warning'}
                           size="small"
                         />
                       </TableCell>
@@ -3,9 +3,9 @@ import { appointmentAPI } from '../api_client/appointmentAPI';
 
 export const fetchAvailableSlots = createAsyncThunk(
   'appointment/fetchSlots',
-  async (_, { rejectWithValue }) => {
+  async (params = {}, { rejectWithValue }) => {
     try {
-      const response = await appointmentAPI.getAvailableSlots();
+      const response = await appointmentAPI.getAvailableSlots(params);
       return response;
     } catch (error) {
       return rejectWithValue(error.response?.data?.error || 'Failed to fetch slots');
@@ -27,9 +27,9 @@ export const bookAppointment = createAsyncThunk(
 
 export const fetchAllAppointments = createAsyncThunk(
   'appointment/fetchAll',
-  async (_, { rejectWithValue }) => {
+  async (params = {}, { rejectWithValue }) => {
     try {
-      const response = await appointmentAPI.getAllAppointments();
+      const response = await appointmentAPI.getAllAppointments(params);
       return response;
     } catch (error) {
       return rejectWithValue(error.response?.data?.error || 'Failed to fetch appointments');
@@ -54,13 +54,25 @@ const appointmentSlice = createSlice({
   initialState: {
     availableSlots: [],
     allAppointments: [],
+    appointmentCounts: null,
+    appointmentsCursor: null,
     isLoading: false,
+    // "Load more" on the admin overview; kept apart so it never blanks the page behind the spinner
+    isLoadingMore: false,
     error: null,
   },
   reducers: {
     clearError: (state) => {
       state.error = null;
     },
+    // Patches one open slot from a live update (eventsAPI) instead of refetching the list
+    applySlotEvent: (state, action) => {
+      const { type, slot_id: id, doctor_name, specialization, specialization_id, date, start_time, end_time } = action.payload;
+      state.availableSlots = state.availableSlots.filter((slot) => slot.id !== id);
+      if (type === 'slot.created' || type === 'slot.released') {
+        state.availableSlots.push({ id, doctor_name, specialization, specialization_id, date, start_time, end_time });
+      }
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -78,8 +90,24 @@ const appointmentSlice = createSlice({
         state.isLoading = false;
         state.error = action.payload;
       })
+      .addCase(fetchAllAppointments.pending, (state, action) => {
+        if (action.meta.arg?.cursor) {
+          state.isLoadingMore = true;
+        }
+      })
+      .addCase(fetchAllAppointments.rejected, (state, action) => {
+        state.isLoadingMore = false;
+        state.error = action.payload;
+      })
       .addCase(fetchAllAppointments.fulfilled, (state, action) => {
-        state.allAppointments = action.payload;
+        const { results, next_cursor, counts } = action.payload;
+        state.isLoadingMore = false;
+        // A cursor request appends the next page; otherwise this is a fresh first page
+        state.allAppointments = action.meta.arg?.cursor ? [...state.allAppointments, ...results] : results;
+        state.appointmentsCursor = next_cursor;
+        if (counts) {
+          state.appointmentCounts = counts;
+        }
       })
       .addCase(updateAppointmentStatus.fulfilled, (state, action) => {
         const { appointmentId, status } = action.payload;
@@ -91,5 +119,5 @@ const appointmentSlice = createSlice({
   },
 });
 
-export const { clearError } = appointmentSlice.actions;
+export const { clearError, applySlotEvent } = appointmentSlice.actions;
 export default appointmentSlice.reducer;
\ No newline at end of file
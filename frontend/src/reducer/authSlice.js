@@ -9,6 +9,9 @@ export const loginUser = createAsyncThunk(
       localStorage.setItem('token', response.access_token);
       localStorage.setItem('role', response.role);
       if (response.name) localStorage.setItem('name', response.name);
+      // Doctors follow their own channel of the live updates feed
+      if (response.doctor_id) localStorage.setItem('doctorId', response.doctor_id);
+      else localStorage.removeItem('doctorId');
       return response;
     } catch (error) {
       return rejectWithValue(error.response?.data?.error || 'Login failed');
@@ -46,6 +49,7 @@ const authSlice = createSlice({
       localStorage.removeItem('token');
       localStorage.removeItem('role');
       localStorage.removeItem('name');
+      localStorage.removeItem('doctorId');
       state.user = null;
       state.token = null;
       state.role = null;
@@ -48,7 +48,9 @@ const patientSlice = createSlice({
       })
       .addCase(cancelPatientAppointment.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.appointments = state.appointments.filter((a) => a.id !== action.payload);
+        state.appointments = state.appointments.map((a) =>
+          a.id === action.payload ? { ...a, status: 'Canceled' } : a
+        );
       })
       .addCase(cancelPatientAppointment.rejected, (state, action) => {
         state.isLoading = false;